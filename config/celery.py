@@ -0,0 +1,16 @@
+"""
+Celery application for the project.
+
+Tasks are discovered from each app's tasks.py; periodic tasks are stored with
+django_celery_beat (seeded from CELERY_BEAT_SCHEDULE).
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.production')
+
+app = Celery('config')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
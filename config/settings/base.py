@@ -65,6 +65,7 @@ INSTALLED_APPS = [
     'core.users',
     'core.otp_reset',
     'core.notifications',
+    'core.dashboards',
 ]
 SITE_ID = 1
 
@@ -148,6 +149,138 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# Cache: set CACHE_URL=rediscache://host:6379/1 in deployed environments so
+# invalidations are shared across workers
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# Seconds a beacon's resolved ad payload stays cached (signals invalidate it earlier)
+BEACON_ADS_CACHE_TIMEOUT = env.int('BEACON_ADS_CACHE_TIMEOUT', default=300)
+
+# Nearby beacon search: cell size of the in-memory grid and the largest radius served, in metres
+BEACON_INDEX_CELL_METRES = env.int('BEACON_INDEX_CELL_METRES', default=500)
+BEACON_NEARBY_MAX_RADIUS = env.int('BEACON_NEARBY_MAX_RADIUS', default=5000)
+
+# Celery
+CELERY_BROKER_URL = env('CELERY_BROKER_URL', default='redis://localhost:6379/0')
+CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+CELERY_TIMEZONE = 'UTC'
+
+# AdView impressions: 'sync' writes each view in the request, 'buffered' queues views
+# and writes them in bulk upserts (write-behind)
+AD_VIEW_WRITE_MODE = env('AD_VIEW_WRITE_MODE', default='sync')
+# Buffer backend for buffered mode: 'memory' (per process, flushed by a timer thread and at exit)
+# or 'redis' (needs CACHE_URL on redis, flushed by the beat task)
+AD_VIEW_BUFFER_BACKEND = env('AD_VIEW_BUFFER_BACKEND', default='memory')
+# Flush once this many views are queued ...
+AD_VIEW_FLUSH_SIZE = env.int('AD_VIEW_FLUSH_SIZE', default=500)
+# ... or at the latest after this many seconds (durability window)
+AD_VIEW_FLUSH_INTERVAL = env.int('AD_VIEW_FLUSH_INTERVAL', default=10)
+
+# Per-user daily ad frequency cap: 'redis' (atomic set per user and day, needs CACHE_URL on
+# redis) or 'memory' (Django cache entry, not atomic across concurrent requests)
+AD_FREQUENCY_BACKEND = env('AD_FREQUENCY_BACKEND', default='memory')
+
+# Beacon telemetry: latest reading per beacon is buffered ('memory' per process, flushed by a
+# timer thread and at exit, or 'redis' flushed by the beat task)
+# and written to Beacon rows once this many beacons are pending or after this many seconds
+BEACON_TELEMETRY_BUFFER_BACKEND = env('BEACON_TELEMETRY_BUFFER_BACKEND', default='memory')
+BEACON_TELEMETRY_FLUSH_SIZE = env.int('BEACON_TELEMETRY_FLUSH_SIZE', default=200)
+BEACON_TELEMETRY_FLUSH_INTERVAL = env.int('BEACON_TELEMETRY_FLUSH_INTERVAL', default=30)
+# Telemetry downsampling into 5-minute and hourly buckets: refresh period and how far behind
+# now it stays (seconds), and days 5-minute buckets are kept (hourly ones are kept forever)
+TELEMETRY_DOWNSAMPLE_INTERVAL = env.int('TELEMETRY_DOWNSAMPLE_INTERVAL', default=300)
+TELEMETRY_DOWNSAMPLE_LAG = env.int('TELEMETRY_DOWNSAMPLE_LAG', default=60)
+TELEMETRY_5M_RETENTION_DAYS = env.int('TELEMETRY_5M_RETENTION_DAYS', default=30)
+# Longest span a beacon health query may cover
+TELEMETRY_QUERY_MAX_DAYS = env.int('TELEMETRY_QUERY_MAX_DAYS', default=366)
+
+# Text search configuration of the advertisement full-text index (Postgres)
+ADVERTISEMENT_SEARCH_CONFIG = env('ADVERTISEMENT_SEARCH_CONFIG', default='english')
+# Beacon name/location and ad title filters also match similar words through the pg_trgm
+# GIN indexes (Postgres); off means plain substring matching
+TRIGRAM_SEARCH = env.bool('TRIGRAM_SEARCH', default=True)
+
+# Beacon ad ranking: engagement counts views plus clicks times this weight over the last
+# days, reloaded by each worker every RANKING_ENGAGEMENT_TTL seconds
+RANKING_ENGAGEMENT_DAYS = env.int('RANKING_ENGAGEMENT_DAYS', default=7)
+RANKING_CLICK_WEIGHT = env.int('RANKING_CLICK_WEIGHT', default=5)
+RANKING_ENGAGEMENT_TTL = env.int('RANKING_ENGAGEMENT_TTL', default=300)
+
+# Dashboard rollups: refresh period and how far behind now they stay, both in seconds
+DASHBOARD_ROLLUP_INTERVAL = env.int('DASHBOARD_ROLLUP_INTERVAL', default=300)
+DASHBOARD_ROLLUP_LAG = env.int('DASHBOARD_ROLLUP_LAG', default=60)
+# Seconds between recounts of the per-ad engagement counters (AdStats); also how late
+# views drop out of the 7-day count
+AD_STATS_RECONCILE_INTERVAL = env.int('AD_STATS_RECONCILE_INTERVAL', default=600)
+
+# Trending ads (hot-ads endpoint): hourly engagement of the last TRENDING_WINDOW_HOURS,
+# weighted per interaction and halved every TRENDING_HALF_LIFE_HOURS of age. The top
+# TRENDING_TOP_K overall and per location are refreshed every TRENDING_REFRESH_INTERVAL seconds
+TRENDING_WINDOW_HOURS = env.int('TRENDING_WINDOW_HOURS', default=168)
+TRENDING_HALF_LIFE_HOURS = env.float('TRENDING_HALF_LIFE_HOURS', default=24)
+TRENDING_WEIGHTS = {'views': 1, 'clicks': 5, 'likes': 3, 'saves': 4}
+TRENDING_TOP_K = env.int('TRENDING_TOP_K', default=50)
+TRENDING_REFRESH_INTERVAL = env.int('TRENDING_REFRESH_INTERVAL', default=300)
+
+# Rows fetched per round trip by the streaming log export
+LOG_EXPORT_CHUNK_SIZE = env.int('LOG_EXPORT_CHUNK_SIZE', default=2000)
+# Rows per INSERT statement of the bulk log endpoint
+LOG_INGEST_BATCH_SIZE = env.int('LOG_INGEST_BATCH_SIZE', default=1000)
+
+# Monthly Postgres partitions of the log and message tables: months created ahead of the
+# current one, and full months kept before older partitions are detached
+PARTITION_MONTHS_AHEAD = env.int('PARTITION_MONTHS_AHEAD', default=3)
+PARTITION_RETENTION_MONTHS = env.int('PARTITION_RETENTION_MONTHS', default=24)
+
+# Raw event retention: days a row is kept before it is archived and deleted (0 keeps it forever).
+# AdView/AdClick are left out: they are per-user interaction state that is upserted, not an event log
+RETENTION_DAYS = {
+    'logs.AdvertisementLog': env.int('LOG_RETENTION_DAYS', default=730),
+    'beacon_messages.BeaconMessage': env.int('MESSAGE_RETENTION_DAYS', default=365),
+    'notifications.Notification': env.int('NOTIFICATION_RETENTION_DAYS', default=180),
+    'beacons.BeaconTelemetry': env.int('TELEMETRY_RETENTION_DAYS', default=90),
+}
+# Where expired rows are archived (gzip NDJSON, one directory per model) and rows per delete batch
+ARCHIVE_DIR = env('ARCHIVE_DIR', default=os.path.join(BASE_DIR, 'archives'))
+RETENTION_BATCH_SIZE = env.int('RETENTION_BATCH_SIZE', default=5000)
+
+CELERY_BEAT_SCHEDULE = {
+    'flush-ad-view-buffer': {
+        'task': 'core.advertisements.tasks.flush_ad_view_buffer',
+        'schedule': AD_VIEW_FLUSH_INTERVAL,
+    },
+    'flush-beacon-telemetry': {
+        'task': 'core.beacons.tasks.flush_beacon_telemetry',
+        'schedule': BEACON_TELEMETRY_FLUSH_INTERVAL,
+    },
+    'downsample-beacon-telemetry': {
+        'task': 'core.beacons.tasks.downsample_beacon_telemetry',
+        'schedule': TELEMETRY_DOWNSAMPLE_INTERVAL,
+    },
+    'refresh-dashboard-rollups': {
+        'task': 'core.dashboards.tasks.refresh_dashboard_rollups',
+        'schedule': DASHBOARD_ROLLUP_INTERVAL,
+    },
+    'reconcile-ad-stats': {
+        'task': 'core.dashboards.tasks.reconcile_ad_stat_counters',
+        'schedule': AD_STATS_RECONCILE_INTERVAL,
+    },
+    'refresh-trending-ads': {
+        'task': 'core.dashboards.tasks.refresh_trending_ads',
+        'schedule': TRENDING_REFRESH_INTERVAL,
+    },
+    'maintain-partitions': {
+        'task': 'core.logs.tasks.maintain_partitions',
+        'schedule': 24 * 60 * 60,
+    },
+    'archive-expired-rows': {
+        'task': 'core.logs.tasks.archive_expired_rows',
+        'schedule': 24 * 60 * 60,
+    },
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -195,6 +328,20 @@ print("Cloudinary API Secret:", env("CLOUDINARY_API_SECRET", default="MISSING"))
 
 DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 
+# Responsive variants of advertisement images: name -> Cloudinary transformation.
+# URLs are built when an image changes and stored on the advertisement
+AD_IMAGE_VARIANTS = {
+    'thumbnail': {'width': 150, 'height': 150, 'crop': 'fill', 'fetch_format': 'auto', 'quality': 'auto'},
+    'medium': {'width': 600, 'crop': 'limit', 'fetch_format': 'auto', 'quality': 'auto'},
+    'large': {'width': 1200, 'crop': 'limit', 'fetch_format': 'auto', 'quality': 'auto'},
+}
+# Where advertisement images are stored: 'cloudinary', or 'local' (MEDIA_ROOT, no network)
+AD_IMAGE_BACKEND = env('AD_IMAGE_BACKEND', default='cloudinary')
+# 'sync' uploads images inside the create request; 'async' spools them to AD_IMAGE_SPOOL_DIR
+# (must be shared with the Celery workers) and uploads them in a task
+AD_IMAGE_UPLOAD_MODE = env('AD_IMAGE_UPLOAD_MODE', default='sync')
+AD_IMAGE_SPOOL_DIR = env('AD_IMAGE_SPOOL_DIR', default=os.path.join(BASE_DIR, 'spool', 'ad_images'))
+
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
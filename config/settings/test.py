@@ -15,3 +15,7 @@ ALLOWED_HOSTS = ["*"]
 PASSWORD_HASHERS = [
     'django.contrib.auth.hashers.MD5PasswordHasher',
 ]
+
+# Run Celery tasks inline and record impressions synchronously
+CELERY_TASK_ALWAYS_EAGER = True
+AD_VIEW_WRITE_MODE = 'sync'
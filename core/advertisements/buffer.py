@@ -0,0 +1,129 @@
+import threading
+import time
+from uuid import UUID
+from django.conf import settings
+from django_redis import get_redis_connection
+from core.flushing import FlushTimer
+from .models import Advertisement, AdView
+
+REDIS_KEY = 'ad_view_buffer'
+
+class MemoryViewBuffer:
+    """Per-process buffer of (user_id, ad_id) views.
+
+    Celery workers cannot see it, so the request that fills it up flushes it inline,
+    and flush_timer writes it out once it is AD_VIEW_FLUSH_INTERVAL old or the process exits.
+    """
+    shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = []
+        self._since = None
+
+    def push(self, user_id, ad_id):
+        with self._lock:
+            if not self._views:
+                self._since = time.monotonic()
+            self._views.append((user_id, ad_id))
+            return len(self._views)
+
+    def age(self):
+        since = self._since
+        return time.monotonic() - since if since is not None else 0
+
+    def drain(self, limit):
+        with self._lock:
+            views, self._views = self._views[:limit], self._views[limit:]
+            self._since = time.monotonic() if self._views else None
+            return views
+
+    def requeue(self, views):
+        with self._lock:
+            self._views[:0] = views
+            self._since = self._since or time.monotonic()
+
+class RedisViewBuffer:
+    """Buffer shared by all workers in the cache's Redis list, drained by the Celery task."""
+    shared = True
+
+    def connection(self):
+        return get_redis_connection('default')
+
+    def push(self, user_id, ad_id):
+        return self.connection().rpush(REDIS_KEY, f'{user_id}:{ad_id}')
+
+    def age(self):
+        # the periodic flush task enforces the durability window
+        return 0
+
+    def drain(self, limit):
+        pipe = self.connection().pipeline()
+        pipe.lrange(REDIS_KEY, 0, limit - 1)
+        pipe.ltrim(REDIS_KEY, limit, -1)
+        entries, _ = pipe.execute()
+        views = []
+        for entry in entries:
+            user_id, ad_id = entry.decode().split(':', 1)
+            views.append((int(user_id), UUID(ad_id)))
+        return views
+
+    def requeue(self, views):
+        if views:
+            self.connection().lpush(REDIS_KEY, *[f'{user_id}:{ad_id}' for user_id, ad_id in reversed(views)])
+
+BUFFERS = {'memory': MemoryViewBuffer, 'redis': RedisViewBuffer}
+_buffers = {}
+
+def get_view_buffer():
+    backend = settings.AD_VIEW_BUFFER_BACKEND
+    if backend not in _buffers:
+        _buffers[backend] = BUFFERS[backend]()
+    return _buffers[backend]
+
+def is_buffered():
+    return settings.AD_VIEW_WRITE_MODE == 'buffered'
+
+def buffer_ad_view(user_id, ad_id):
+    """Queue a view and trigger a flush when the buffer is full or too old."""
+    buffer = get_view_buffer()
+    size = buffer.push(user_id, ad_id)
+    if not buffer.shared:
+        flush_timer.start()
+    if size < settings.AD_VIEW_FLUSH_SIZE and buffer.age() < settings.AD_VIEW_FLUSH_INTERVAL:
+        return
+
+    if buffer.shared:
+        from .tasks import flush_ad_view_buffer
+        flush_ad_view_buffer.delay()
+    else:
+        flush_ad_views()
+
+def write_ad_views(views):
+    """Bulk upsert (user_id, ad_id) views; views of deleted ads are dropped."""
+    pairs = sorted(set(views), key=lambda view: (view[0], str(view[1])))  # stable lock order
+    ad_ids = {ad_id for _, ad_id in pairs}
+    known = set(Advertisement.objects.filter(advertisement_id__in=ad_ids).values_list('advertisement_id', flat=True))
+    rows = [AdView(user_id=user_id, ad_id=ad_id, viewed=True) for user_id, ad_id in pairs if ad_id in known]
+    AdView.objects.bulk_create(rows, update_conflicts=True, unique_fields=['user', 'ad'], update_fields=['viewed', 'last_viewed_at'])
+    return len(rows)
+
+def flush_ad_views():
+    """Drain the buffer in batches of AD_VIEW_FLUSH_SIZE. Returns the number of rows written."""
+    buffer = get_view_buffer()
+    limit = settings.AD_VIEW_FLUSH_SIZE
+    written = 0
+    while True:
+        views = buffer.drain(limit)
+        if not views:
+            break
+        try:
+            written += write_ad_views(views)
+        except Exception:
+            buffer.requeue(views)
+            raise
+        if len(views) < limit:
+            break
+    return written
+
+flush_timer = FlushTimer(flush_ad_views, lambda: settings.AD_VIEW_FLUSH_INTERVAL)
@@ -0,0 +1,172 @@
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.timezone import localdate, make_aware, now
+from django_redis import get_redis_connection
+from .models import AdView
+from .preferences import cached_preferences
+
+DELIVERED_KEY = 'ad_delivered:{}:{}'
+# marks a seeded set, so a day without deliveries still exists in Redis; not an ad id
+SEEDED = '-'
+
+# KEYS[1]: set of ad ids delivered today. ARGV: limit, expiry (unix time), 1 if seed ids
+# follow, number of seed ids, the seed ids, then the candidate ids in ranked order.
+# Returns the allowed candidates, or nil when the set is missing and no seed was given.
+FILTER_SCRIPT = """
+local key = KEYS[1]
+local seeds = tonumber(ARGV[4])
+if redis.call('EXISTS', key) == 0 then
+    if ARGV[3] == '0' then
+        return false
+    end
+    redis.call('SADD', key, '""" + SEEDED + """')
+    for i = 5, 4 + seeds do
+        redis.call('SADD', key, ARGV[i])
+    end
+end
+local limit = tonumber(ARGV[1])
+local count = redis.call('SCARD', key) - 1
+local allowed = {}
+for i = 5 + seeds, #ARGV do
+    local ad_id = ARGV[i]
+    if redis.call('SISMEMBER', key, ad_id) == 1 then
+        table.insert(allowed, ad_id)
+    elseif count < limit then
+        redis.call('SADD', key, ad_id)
+        count = count + 1
+        table.insert(allowed, ad_id)
+    end
+end
+redis.call('EXPIREAT', key, ARGV[2])
+return allowed
+"""
+
+def daily_limit(user_id):
+    """The user's ad_frequency, or None when they have not set preferences."""
+    preferences = cached_preferences(user_id)
+    return None if preferences is None else max(preferences['ad_frequency'], 0)
+
+def viewed_today(user_id, today):
+    """Ids of the ads the user viewed today, the seed of a missing delivered set."""
+    start = make_aware(datetime.combine(today, time.min))
+    return [str(ad_id) for ad_id in AdView.objects.filter(
+        user_id=user_id, last_viewed_at__gte=start
+    ).values_list('ad_id', flat=True)]
+
+def within_limit(ads, delivered, limit):
+    """Ads already in `delivered`, and new ones while it holds fewer than `limit`; adds those to it."""
+    allowed = []
+    for ad in ads:
+        ad_id = str(ad['advertisement_id'])
+        if ad_id not in delivered:
+            if len(delivered) >= limit:
+                continue
+            delivered.add(ad_id)
+        allowed.append(ad)
+    return allowed
+
+def expiry(today):
+    """An hour after the coming midnight."""
+    return make_aware(datetime.combine(today + timedelta(days=1), time.min)) + timedelta(hours=1)
+
+class Uncapped:
+    """Frequency cap of anonymous users and users without preferences: lets everything through."""
+
+    def filter(self, ads):
+        return ads
+
+    def preview(self, ads):
+        return ads
+
+    def save(self):
+        pass
+
+class RedisDailyCap:
+    """Distinct ads delivered to one user today, in a Redis set checked against their ad_frequency.
+
+    Each filter() is one script run: membership test, SCARD against the limit and SADD
+    of the new ids happen atomically, so concurrent requests of the same user cannot
+    exceed the limit together. The set expires an hour after midnight. Only when it is
+    missing are today's AdView rows read, and the script runs again with them as seed.
+    """
+
+    def __init__(self, user_id, limit, today=None):
+        self.user_id = user_id
+        self.limit = limit
+        self.today = today or localdate()
+        self.key = DELIVERED_KEY.format(user_id, self.today.isoformat())
+        self.connection = get_redis_connection('default')
+        self.script = self.connection.register_script(FILTER_SCRIPT)
+
+    def run(self, ad_ids, seed=None):
+        args = [self.limit, int(expiry(self.today).timestamp()), int(seed is not None), len(seed or ())]
+        return self.script(keys=[self.key], args=[*args, *(seed or ()), *ad_ids])
+
+    def filter(self, ads):
+        if not ads:
+            return ads
+        ad_ids = [str(ad['advertisement_id']) for ad in ads]
+        allowed = self.run(ad_ids)
+        if allowed is None:
+            allowed = self.run(ad_ids, viewed_today(self.user_id, self.today))
+        allowed = {ad_id.decode() for ad_id in allowed}
+        return [ad for ad in ads if str(ad['advertisement_id']) in allowed]
+
+    def preview(self, ads):
+        """The ads filter() would allow, without recording them as delivered."""
+        members = self.connection.smembers(self.key)
+        if members:
+            delivered = {ad_id.decode() for ad_id in members} - {SEEDED}
+        else:
+            delivered = set(viewed_today(self.user_id, self.today))
+        return within_limit(ads, delivered, self.limit)
+
+    def save(self):
+        pass  # filter() already stored the deliveries
+
+class MemoryDailyCap:
+    """Fallback without Redis: the delivered ids as one entry of the Django cache.
+
+    The entry is read when the cap is created and written back by save(), so requests
+    of the same user that overlap can each add ads and together exceed the limit.
+    Fine for a single process (development, tests); deployments use the Redis backend.
+    """
+
+    def __init__(self, user_id, limit, today=None):
+        self.limit = limit
+        self.today = today or localdate()
+        self.key = DELIVERED_KEY.format(user_id, self.today.isoformat())
+        delivered = cache.get(self.key)
+        if delivered is None:
+            delivered = viewed_today(user_id, self.today)
+            self.changed = True
+        else:
+            self.changed = False
+        self.delivered = set(delivered)
+
+    def filter(self, ads):
+        """Keep ads already delivered today, and new ones while the limit allows."""
+        delivered = len(self.delivered)
+        allowed = within_limit(ads, self.delivered, self.limit)
+        self.changed = self.changed or len(self.delivered) != delivered
+        return allowed
+
+    def preview(self, ads):
+        """The ads filter() would allow, without recording them as delivered."""
+        return within_limit(ads, set(self.delivered), self.limit)
+
+    def save(self):
+        if self.changed:
+            timeout = max(int((expiry(self.today) - now()).total_seconds()), 0)
+            cache.set(self.key, sorted(self.delivered), timeout)
+            self.changed = False
+
+CAPS = {'memory': MemoryDailyCap, 'redis': RedisDailyCap}
+
+def frequency_cap(user):
+    """Daily cap of an authenticated user with preferences (AD_FREQUENCY_BACKEND), otherwise Uncapped."""
+    if not user or not user.is_authenticated:
+        return Uncapped()
+    limit = daily_limit(user.pk)
+    return Uncapped() if limit is None else CAPS[settings.AD_FREQUENCY_BACKEND](user.pk, limit)
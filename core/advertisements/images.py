@@ -0,0 +1,94 @@
+from functools import lru_cache
+from pathlib import Path
+from uuid import uuid4
+import cloudinary
+import cloudinary.uploader
+from django.conf import settings
+from PIL import Image, ImageOps
+
+class CloudinaryImageBackend:
+    """Images stored on Cloudinary; variants are transformations in the delivery URL."""
+
+    def upload(self, source, eager=False):
+        """Upload a file (object or path) and return its public id.
+
+        With `eager` the variants are generated during the upload instead of on their
+        first delivery. f_auto is picked per browser at delivery, so it is left out.
+        """
+        options = {'folder': 'ads/'}
+        if eager:
+            options['eager'] = [
+                {key: value for key, value in variant.items() if key != 'fetch_format'}
+                for variant in settings.AD_IMAGE_VARIANTS.values()
+            ]
+        return cloudinary.uploader.upload(source, **options)['public_id']
+
+    def urls(self, image_id):
+        image = cloudinary.CloudinaryImage(image_id)
+        variants = {name: image.build_url(**options) for name, options in settings.AD_IMAGE_VARIANTS.items()}
+        return image.build_url(), variants
+
+class LocalImageBackend:
+    """Stand-in storing images under MEDIA_ROOT, for development and tests without network.
+
+    Every upload gets a directory holding original.jpg and one resized JPEG per
+    AD_IMAGE_VARIANTS entry ('fill' crops to the exact size, other crops only shrink).
+    """
+
+    def upload(self, source, eager=False):
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image).convert('RGB')
+        image_id = f'ads/{uuid4().hex}'
+        directory = Path(settings.MEDIA_ROOT) / image_id
+        directory.mkdir(parents=True)
+        image.save(directory / 'original.jpg', 'JPEG')
+        for name, options in settings.AD_IMAGE_VARIANTS.items():
+            width, height = options.get('width'), options.get('height')
+            if options.get('crop') == 'fill' and width and height:
+                variant = ImageOps.fit(image, (width, height))
+            else:
+                variant = image.copy()
+                variant.thumbnail((width or image.width, height or image.height))
+            variant.save(directory / f'{name}.jpg', 'JPEG')
+        return image_id
+
+    def urls(self, image_id):
+        base = f'{settings.MEDIA_URL}{image_id}'
+        return f'{base}/original.jpg', {name: f'{base}/{name}.jpg' for name in settings.AD_IMAGE_VARIANTS}
+
+BACKENDS = {'cloudinary': CloudinaryImageBackend, 'local': LocalImageBackend}
+_backends = {}
+
+def get_image_backend(backend=None):
+    backend = backend or settings.AD_IMAGE_BACKEND
+    if backend not in _backends:
+        _backends[backend] = BACKENDS[backend]()
+    return _backends[backend]
+
+def public_id(image):
+    """Public id of a CloudinaryField value (a resource or a plain string), or None."""
+    if not image:
+        return None
+    return getattr(image, 'public_id', None) or str(image)
+
+@lru_cache(maxsize=4096)
+def _build_image_urls(backend, image_id):
+    return get_image_backend(backend).urls(image_id)
+
+def build_image_urls(image_id):
+    """(delivery URL, {variant: URL}) of a stored image id; pure string building, no request."""
+    return _build_image_urls(settings.AD_IMAGE_BACKEND, image_id)
+
+def set_image_urls(ad):
+    """Store the URLs of the ad's current image on the instance (not saved)."""
+    image_id = public_id(ad.image)
+    if image_id is None:
+        ad.image_url, ad.image_variants = None, {}
+    else:
+        ad.image_url, ad.image_variants = build_image_urls(image_id)
+
+def image_urls(ad):
+    """(URL, variants) of an ad: the stored ones, or memoized ones for rows saved before they were stored."""
+    if ad.image_url or not ad.image:
+        return ad.image_url, ad.image_variants
+    return build_image_urls(public_id(ad.image))
@@ -0,0 +1,84 @@
+from django.db import transaction
+from .models import Advertisement, AdView, AdLike, AdClick, AdSaved
+
+# interaction type -> (model, boolean flag field, timestamp field)
+INTERACTIONS = {
+    'view': (AdView, 'viewed', 'viewed_at'),
+    'click': (AdClick, 'clicked', 'clicked_at'),
+    'like': (AdLike, 'liked', 'liked_at'),
+    'save': (AdSaved, 'saved', 'saved_at'),
+}
+
+def record_interactions(user, events):
+    """Upsert a batch of interaction events for one user.
+
+    All ad ids are resolved with one query and each interaction type is written with a
+    single bulk upsert on its (user, ad) unique key. When the same ad/type pair occurs
+    more than once the last event wins. Returns the number of rows written and the
+    ad ids that do not exist.
+    """
+    ad_ids = {event['ad_id'] for event in events}
+    known = set(Advertisement.objects.filter(advertisement_id__in=ad_ids).values_list('advertisement_id', flat=True))
+
+    latest = {}
+    for event in events:
+        if event['ad_id'] in known:
+            latest[(event['type'], event['ad_id'])] = event.get('value', True)
+
+    with transaction.atomic():
+        for kind, (model, flag, _) in INTERACTIONS.items():
+            rows = [
+                model(user=user, ad_id=ad_id, **{flag: value})
+                for (event_kind, ad_id), value in latest.items() if event_kind == kind
+            ]
+            if rows:
+                # auto_now columns (AdView.last_viewed_at) move with every write
+                touched = [field.name for field in model._meta.concrete_fields if getattr(field, 'auto_now', False)]
+                model.objects.bulk_create(
+                    rows, update_conflicts=True, unique_fields=['user', 'ad'], update_fields=[flag, *touched]
+                )
+
+    return len(latest), sorted(ad_ids - known, key=str)
+
+def load_interaction_states(user, ads, kinds=None):
+    """Return the user's interaction state for each ad, keyed by ad id.
+
+    Runs one query per interaction type (at most four) regardless of how many ads are
+    given. Ads without a row get the same defaults the single-ad lookups used.
+    """
+    ad_ids = [ad.pk for ad in ads]
+    states = {ad_id: {} for ad_id in ad_ids}
+    if not ad_ids:
+        return states
+
+    for kind in kinds or INTERACTIONS:
+        model, flag, timestamp = INTERACTIONS[kind]
+        rows = model.objects.filter(user=user, ad_id__in=ad_ids).values_list('ad_id', flag, timestamp)
+        rows = {ad_id: (value, at) for ad_id, value, at in rows}
+        for ad_id in ad_ids:
+            value, at = rows.get(ad_id, (False, None))
+            states[ad_id][flag] = value
+            states[ad_id][timestamp] = at
+    return states
+
+def interaction_rows(user, ads):
+    """Build AdInteractionSerializer input for a page of ads."""
+    states = load_interaction_states(user, ads)
+    return [{'ad': ad, **states[ad.pk]} for ad in ads]
+
+class InteractionContext:
+    """Interaction state of one user for the ads of a response, loaded up front.
+
+    Views build it once per page and pass it to serializers as
+    `context['interactions']`. Ads that were not preloaded are fetched on first use.
+    """
+
+    def __init__(self, user, ads=(), kinds=('like', 'save')):
+        self.user = user
+        self.kinds = kinds
+        self.states = load_interaction_states(user, ads, kinds)
+
+    def state(self, ad):
+        if ad.pk not in self.states:
+            self.states.update(load_interaction_states(self.user, [ad], self.kinds))
+        return self.states[ad.pk]
@@ -0,0 +1,85 @@
+import random
+import statistics
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from core.advertisements.models import Advertisement
+from core.advertisements.search import is_supported, similar_to
+from core.beacons.models import Beacon
+
+WORDS = ['coffee', 'soap', 'bread', 'market', 'pharmacy', 'fashion', 'phone', 'juice', 'shoes', 'bakery',
+         'garment', 'electronics', 'books', 'grocery', 'cinema', 'gym', 'salon', 'hotel', 'burger', 'pizza']
+PLACES = ['Bole', 'Piassa', 'Merkato', 'Kazanchis', 'Megenagna', 'Sarbet', 'Gerji', 'Ayat', 'Jemo', 'Lideta']
+
+class Command(BaseCommand):
+    help = ("Compare beacon and ad title search latency: icontains as a sequential scan (no usable index), "
+            "icontains served by the trigram indexes, and the trigram similarity backend. Runs on synthetic "
+            "rows inside a transaction that is rolled back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000, help="Synthetic beacons and ads to insert.")
+        parser.add_argument('--repeat', type=int, default=20, help="Timed runs per query.")
+        parser.add_argument('--page-size', type=int, default=20, help="Rows fetched per query, like a list page.")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('terms', nargs='*', default=['ole', 'Merkato', 'cofee', 'pharm'],
+                            help="Search terms; include typos to see the similarity matches.")
+
+    def handle(self, *args, **options):
+        if not is_supported():
+            raise CommandError("The trigram benchmark requires PostgreSQL.")
+
+        with transaction.atomic():
+            self.populate(options['rows'], random.Random(options['seed']))
+            cases = [
+                ('beacon name', Beacon, 'name'),
+                ('beacon location', Beacon, 'location_name'),
+                ('ad title', Advertisement, 'title'),
+            ]
+            self.stdout.write(f"{'query':<16} {'term':<10} {'matches':>8} {'seq scan':>10} {'trgm index':>11} "
+                              f"{'similarity':>11} {'sim matches':>12}   (median ms)")
+            for label, model, field in cases:
+                for term in options['terms']:
+                    contains = model.objects.filter(**{f'{field}__icontains': term})
+                    similar = similar_to(model.objects.all(), [field], term)
+                    scan = self.measure(contains, options, index=False)
+                    indexed = self.measure(contains, options)
+                    ranked = self.measure(similar, options)
+                    self.stdout.write(
+                        f"{label:<16} {term:<10} {contains.count():>8} {scan:>10.2f} {indexed:>11.2f} "
+                        f"{ranked:>11.2f} {similar.count():>12}"
+                    )
+            transaction.set_rollback(True)
+
+    def populate(self, rows, rng):
+        owner = get_user_model().objects.create(username='search-benchmark', email='search-benchmark@example.com')
+        for start in range(0, rows, 5000):
+            count = min(5000, rows - start)
+            Beacon.objects.bulk_create([
+                Beacon(name=f"{rng.choice(WORDS)} {rng.choice(WORDS)} {start + i}",
+                       location_name=f"{rng.choice(PLACES)} {rng.randint(1, 40)}")
+                for i in range(count)
+            ])
+            Advertisement.objects.bulk_create([
+                Advertisement(title=f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} offer {start + i}",
+                              content="Synthetic benchmark advertisement", created_by=owner)
+                for i in range(count)
+            ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE beacons_beacon')
+            cursor.execute('ANALYZE advertisements_advertisement')
+
+    def measure(self, queryset, options, index=True):
+        """Median wall time in ms of fetching one page of primary keys."""
+        setting = 'on' if index else 'off'
+        with connection.cursor() as cursor:
+            # with index scans off the planner falls back to the sequential scan icontains used before
+            cursor.execute(f'SET LOCAL enable_bitmapscan = {setting}')
+            cursor.execute(f'SET LOCAL enable_indexscan = {setting}')
+        page = queryset.values_list('pk', flat=True)[:options['page_size']]
+        timings = []
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            list(page)
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
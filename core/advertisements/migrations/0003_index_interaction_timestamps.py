@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-17 02:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisements', '0002_alter_advertisement_image'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='adclick',
+            name='clicked_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='adview',
+            name='viewed_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-17 03:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisements', '0003_index_interaction_timestamps'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='adclick',
+            index=models.Index(fields=['user', 'clicked_at'], name='adclick_user_clicked_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adview',
+            index=models.Index(fields=['user', 'viewed_at'], name='adview_user_viewed_at_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-17 03:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisements', '0004_user_interaction_time_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='advertisement',
+            name='categories',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
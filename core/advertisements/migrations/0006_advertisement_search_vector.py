@@ -0,0 +1,39 @@
+# Generated by Django 5.1.4 on 2026-10-17 03:17
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+def add_search_index(apps, schema_editor):
+    # full-text search is Postgres only; other databases keep substring search
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    config = settings.ADVERTISEMENT_SEARCH_CONFIG
+    schema_editor.execute("""
+        UPDATE advertisements_advertisement SET search_vector =
+            setweight(to_tsvector(%s::regconfig, coalesce(title, '')), 'A') ||
+            setweight(to_tsvector(%s::regconfig, coalesce(content, '')), 'B')
+    """, [config, config])
+    schema_editor.execute('CREATE INDEX "advertisement_search_idx" ON advertisements_advertisement USING gin (search_vector)')
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS "advertisement_search_idx"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisements', '0005_advertisement_categories'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='advertisement',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(add_search_index, remove_search_index),
+    ]
@@ -0,0 +1,29 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+def add_trigram_index(apps, schema_editor):
+    # pg_trgm is Postgres only; other databases keep the B-tree index.
+    # UPPER(title::text) is the expression Django emits for icontains.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS "advertisements_advertisement_title_trgm" '
+            'ON "advertisements_advertisement" USING gin ((UPPER("title"::text)) gin_trgm_ops)'
+        )
+
+
+def remove_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS "advertisements_advertisement_title_trgm"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisements', '0006_advertisement_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(add_trigram_index, remove_trigram_index),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.4 on 2026-10-17 03:21
+
+import cloudinary
+from django.conf import settings
+from django.db import migrations, models
+
+
+def image_urls(image):
+    """(delivery URL, {variant: URL}) of a CloudinaryField value; all images were on Cloudinary then."""
+    image = cloudinary.CloudinaryImage(getattr(image, 'public_id', None) or str(image))
+    return image.build_url(), {name: image.build_url(**options) for name, options in settings.AD_IMAGE_VARIANTS.items()}
+
+
+def store_image_urls(apps, schema_editor):
+    Advertisement = apps.get_model('advertisements', 'Advertisement')
+    ads = Advertisement.objects.exclude(image__isnull=True).exclude(image='').filter(image_url__isnull=True)
+    batch = []
+    for ad in ads.only('advertisement_id', 'image').iterator(chunk_size=1000):
+        ad.image_url, ad.image_variants = image_urls(ad.image)
+        batch.append(ad)
+        if len(batch) == 1000:
+            Advertisement.objects.bulk_update(batch, ['image_url', 'image_variants'])
+            batch = []
+    Advertisement.objects.bulk_update(batch, ['image_url', 'image_variants'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisements', '0007_title_trigram_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='advertisement',
+            name='image_url',
+            field=models.URLField(blank=True, editable=False, max_length=500, null=True),
+        ),
+        migrations.AddField(
+            model_name='advertisement',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(store_image_urls, migrations.RunPython.noop),
+    ]
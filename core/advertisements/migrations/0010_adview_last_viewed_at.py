@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-17 03:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_viewed_at(apps, schema_editor):
+    AdView = apps.get_model('advertisements', 'AdView')
+    AdView.objects.filter(last_viewed_at__isnull=True).update(last_viewed_at=models.F('viewed_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisements', '0009_advertisement_image_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adview',
+            name='last_viewed_at',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.RunPython(copy_viewed_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='adview',
+            index=models.Index(fields=['user', 'last_viewed_at'], name='adview_user_last_viewed_idx'),
+        ),
+    ]
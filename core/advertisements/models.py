@@ -1,18 +1,33 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 from cloudinary.models import CloudinaryField
+from django.contrib.postgres.search import SearchVectorField
 from uuid import uuid4
 
 User = get_user_model()
 
 class Advertisement(models.Model):
+    class ImageStatus(models.TextChoices):
+        READY = 'ready', 'Ready'
+        PROCESSING = 'processing', 'Processing'
+        FAILED = 'failed', 'Failed'
+
     advertisement_id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     title = models.CharField(max_length=200, db_index=True)
     content = models.TextField()
     image = CloudinaryField('image', null=True, blank=True)
+    # delivery URLs of `image`, built when it changes (see core.advertisements.images)
+    image_url = models.URLField(max_length=500, null=True, blank=True, editable=False)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # 'processing' while an uploaded image waits for the upload task (see core.advertisements.uploads)
+    image_status = models.CharField(max_length=10, choices=ImageStatus.choices, default=ImageStatus.READY,
+                                    editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey('users.User', on_delete=models.CASCADE, default=1)
     is_active = models.BooleanField(default=True)
+    categories = models.JSONField(default=list, blank=True)  # Example: ["soup", "food"]
+    # title + content, kept up to date on save; GIN indexed on Postgres by migration 0006
+    search_vector = SearchVectorField(null=True, editable=False)
 
     def __str__(self):
         return f"{self.title} Advertisement ({self.is_active})"
@@ -22,10 +37,16 @@ class AdView(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     ad = models.ForeignKey(Advertisement, on_delete=models.CASCADE, related_name="views")
     viewed = models.BooleanField(default=False)  # Track if the ad was seen
-    viewed_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
+    viewed_at = models.DateTimeField(auto_now_add=True, null=True, blank=True, db_index=True)
+    # moved by every write, including the bulk upserts; viewed_at keeps the first view
+    last_viewed_at = models.DateTimeField(auto_now=True, null=True, blank=True)
 
     class Meta:
         unique_together = ('user', 'ad')  # One record per user per ad
+        indexes = [
+            models.Index(fields=['user', 'viewed_at'], name='adview_user_viewed_at_idx'),
+            models.Index(fields=['user', 'last_viewed_at'], name='adview_user_last_viewed_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user} viewed {self.ad} at {self.viewed_at}"
@@ -48,10 +69,11 @@ class AdClick(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     ad = models.ForeignKey(Advertisement, on_delete=models.CASCADE, related_name="clicks")
     clicked = models.BooleanField(default=False)  # Track if the ad was clicked
-    clicked_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
+    clicked_at = models.DateTimeField(auto_now_add=True, null=True, blank=True, db_index=True)
 
     class Meta:
         unique_together = ('user', 'ad')  # One record per user per ad
+        indexes = [models.Index(fields=['user', 'clicked_at'], name='adclick_user_clicked_at_idx')]
 
 class AdSaved(models.Model):
     """Stores ads that users have saved for later"""
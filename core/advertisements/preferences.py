@@ -0,0 +1,29 @@
+from django.core.cache import cache
+from core.users.models import UserPreferences
+
+PREFERENCES_KEY = 'ad_preferences:{}'
+NO_PREFERENCES = {}  # cached for users without preferences; None would read as a cache miss
+
+def preferences_key(user_id):
+    return PREFERENCES_KEY.format(user_id)
+
+def cached_preferences(user_id):
+    """The user's ad_frequency and normalized preferred_categories, or None without preferences."""
+    preferences = cache.get(preferences_key(user_id))
+    if preferences is None:
+        row = UserPreferences.objects.filter(user_id=user_id).values('ad_frequency', 'preferred_categories').first()
+        preferences = NO_PREFERENCES if row is None else {
+            'ad_frequency': row['ad_frequency'],
+            'preferred_categories': normalize_categories(row['preferred_categories']),
+        }
+        cache.set(preferences_key(user_id), preferences, None)
+    return preferences or None
+
+def invalidate_preferences(user_id):
+    cache.delete(preferences_key(user_id))
+
+def normalize_categories(names):
+    """Lowercase, stripped, de-duplicated category names; anything but strings is dropped."""
+    if not isinstance(names, list):
+        return []
+    return sorted({name.strip().lower() for name in names if isinstance(name, str) and name.strip()})
@@ -0,0 +1,101 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Sum
+from django.utils.timezone import localdate
+from core.dashboards.models import AdDailyStats
+from core.versioned import VersionedIndex
+from .models import Advertisement
+from .preferences import cached_preferences, normalize_categories
+
+VERSION_KEY = 'ad_ranking_index_version'
+
+class AdRankingIndex:
+    """In-process category bitsets of the active ads, rebuilt after an ad changes, and their recent engagement."""
+
+    def __init__(self):
+        self._bitsets = VersionedIndex(VERSION_KEY)
+        self._engagement = None
+
+    def load(self):
+        """Every category name gets a bit; an ad's bitset has the bits of its categories set,
+        so matching it against a user's preferences is one AND and a popcount.
+        """
+        rows = [
+            (str(ad_id), normalize_categories(categories))
+            for ad_id, categories in Advertisement.objects.filter(is_active=True).values_list(
+                'advertisement_id', 'categories'
+            )
+        ]
+        names = sorted({name for _, categories in rows for name in categories})
+        bits = {name: 1 << position for position, name in enumerate(names)}
+        ads = {}
+        for ad_id, categories in rows:
+            bitset = 0
+            for name in categories:
+                bitset |= bits[name]
+            if bitset:
+                ads[ad_id] = bitset
+        return bits, ads
+
+    def bitsets(self):
+        """(category name -> bit, advertisement id -> bitset)."""
+        return self._bitsets.get(self.load)
+
+    def mask(self, categories):
+        """Bitset of the given category names; unknown names match no ad."""
+        bits, _ = self.bitsets()
+        mask = 0
+        for name in categories:
+            mask |= bits.get(name, 0)
+        return mask
+
+    def engagement(self):
+        """Advertisement id -> views + RANKING_CLICK_WEIGHT * clicks over RANKING_ENGAGEMENT_DAYS.
+
+        Read from the daily rollup and reloaded every RANKING_ENGAGEMENT_TTL seconds, and
+        with the bitsets in the invalidating worker.
+        """
+        if self._engagement is None or time.monotonic() - self._engagement[0] >= settings.RANKING_ENGAGEMENT_TTL:
+            since = localdate() - timedelta(days=settings.RANKING_ENGAGEMENT_DAYS)
+            rows = AdDailyStats.objects.filter(date__gte=since).values('advertisement_id').annotate(
+                views=Sum('views'), clicks=Sum('clicks')
+            ).values_list('advertisement_id', 'views', 'clicks')
+            scores = {str(ad_id): views + settings.RANKING_CLICK_WEIGHT * clicks for ad_id, views, clicks in rows}
+            self._engagement = (time.monotonic(), scores)
+        return self._engagement[1]
+
+    def invalidate(self):
+        self._bitsets.invalidate()
+        self._engagement = None
+
+ranking_index = AdRankingIndex()
+
+class AdRanker:
+    """Orders candidate ads by matching preferred categories, then by recent engagement.
+
+    Ads with equal scores keep their incoming order.
+    """
+
+    def __init__(self, categories=()):
+        self.mask = ranking_index.mask(categories) if categories else 0
+
+    def rank(self, ads):
+        if len(ads) < 2:
+            return ads
+        _, bitsets = ranking_index.bitsets()
+        engagement = ranking_index.engagement()
+        mask = self.mask
+
+        def score(ad):
+            ad_id = str(ad['advertisement_id'])
+            return (bitsets.get(ad_id, 0) & mask).bit_count(), engagement.get(ad_id, 0)
+
+        return sorted(ads, key=score, reverse=True)
+
+def ad_ranker(user):
+    """AdRanker for the user's preferred categories; engagement only for everybody else."""
+    if not user or not user.is_authenticated:
+        return AdRanker()
+    preferences = cached_preferences(user.pk)
+    return AdRanker(preferences['preferred_categories'] if preferences else ())
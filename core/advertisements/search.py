@@ -0,0 +1,86 @@
+import re
+from django.conf import settings
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db import connection
+from django.db.models import F, Q, TextField, Value
+from django.db.models.functions import Cast, Greatest, Upper
+
+def is_supported(conn=connection):
+    return conn.vendor == 'postgresql'
+
+def search_vector():
+    """Weighted document of an advertisement: title ranks above content."""
+    config = settings.ADVERTISEMENT_SEARCH_CONFIG
+    return SearchVector('title', weight='A', config=config) + SearchVector('content', weight='B', config=config)
+
+def update_search_vector(queryset):
+    """Recompute the stored search_vector of the given advertisements."""
+    if is_supported():
+        queryset.update(search_vector=search_vector())
+
+def search_query(text):
+    """tsquery matching every word of `text`, the last ones as prefixes, like the old substring search.
+
+    Only word characters reach the raw query, so user input cannot inject tsquery syntax.
+    Returns None when `text` has no words.
+    """
+    terms = re.findall(r'\w+', text)
+    if not terms:
+        return None
+    return SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw',
+                       config=settings.ADVERTISEMENT_SEARCH_CONFIG)
+
+def search_ads(queryset, text, prefix='', rank=True):
+    """Filter `queryset` to the advertisements matching `text`.
+
+    `prefix` is the lookup path to the advertisement ('ad__' for interaction rows). On
+    Postgres the GIN-indexed search_vector is matched and, with `rank`, rows come best
+    match first (annotated as `search_rank`); views with an ordering of their own pass
+    rank=False. Other databases fall back to case-insensitive substring matching.
+    """
+    if not text:
+        return queryset
+    if not is_supported():
+        return queryset.filter(Q(**{f'{prefix}title__icontains': text}) | Q(**{f'{prefix}content__icontains': text}))
+
+    query = search_query(text)
+    if query is None:
+        return queryset.none()
+    queryset = queryset.filter(**{f'{prefix}search_vector': query})
+    if rank:
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        queryset = queryset.annotate(search_rank=SearchRank(F(f'{prefix}search_vector'), query)).order_by(
+            '-search_rank', *ordering
+        )
+    return queryset
+
+def similar_to(queryset, fields, text, rank=True):
+    """Filter `queryset` to rows where any of `fields` contains or closely resembles `text`.
+
+    With TRIGRAM_SEARCH on Postgres a row matches when a field contains `text` or
+    word-similarity passes pg_trgm's threshold, so typos and partial words still match;
+    both conditions are served by the trigram indexes. With `rank`, the most similar
+    rows come first (annotated as `similarity`). Elsewhere, or with TRIGRAM_SEARCH off,
+    only the substring filter applies.
+    """
+    if not text:
+        return queryset
+    contains = Q()
+    for field in fields:
+        contains |= Q(**{f'{field}__icontains': text})
+    if not (settings.TRIGRAM_SEARCH and is_supported()):
+        return queryset.filter(contains)
+
+    # UPPER(field::text), the expression the indexes are built on
+    upper = [Upper(Cast(field, TextField())) for field in fields]
+    similar = Q()
+    for expression in upper:
+        similar |= Q(TrigramWordSimilar(expression, Value(text.upper())))
+    queryset = queryset.filter(contains | similar)
+    if rank:
+        scores = [TrigramWordSimilarity(Value(text.upper()), expression) for expression in upper]
+        similarity = Greatest(*scores) if len(scores) > 1 else scores[0]
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        queryset = queryset.annotate(similarity=similarity).order_by('-similarity', *ordering)
+    return queryset
@@ -1,30 +1,46 @@
 from rest_framework import serializers
 from core.advertisements.models import Advertisement
 from .models import AdView, AdLike, AdClick, AdSaved
+from .interactions import InteractionContext
+from .preferences import normalize_categories
+from .images import get_image_backend, image_urls
+from .uploads import is_async, queue_upload, spool_image
 from django.utils.timezone import now
 from datetime import datetime
 from typing import Optional
-import cloudinary
 
 class AdvertisementSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+    categories = serializers.ListField(child=serializers.CharField(max_length=50), required=False)
 
     class Meta:
         model = Advertisement
-        fields = ['advertisement_id', 'title', 'content', 'image_url', 'created_at', 'is_active', 'created_by']
+        fields = ['advertisement_id', 'title', 'content', 'image_url', 'image_variants', 'created_at', 'is_active',
+                  'created_by', 'categories', 'image_status']
 
-    def get_image_url(self, obj):
-        if obj.image:
-            return cloudinary.CloudinaryImage(str(obj.image)).build_url()
-        return None
+    def validate_categories(self, value):
+        return normalize_categories(value)
+
+    def get_image_url(self, obj) -> Optional[str]:
+        return image_urls(obj)[0]
+
+    def get_image_variants(self, obj) -> dict:
+        return image_urls(obj)[1]
 
     def create(self, validated_data):
         request = self.context.get('request')
         image_file = request.FILES.get('image')
 
+        if image_file and is_async():
+            # the upload task fills in the image; until then the ad is 'processing'
+            path = spool_image(image_file)
+            ad = Advertisement.objects.create(image_status=Advertisement.ImageStatus.PROCESSING, **validated_data)
+            queue_upload(ad, path)
+            return ad
+
         if image_file:
-            upload_result = cloudinary.uploader.upload(image_file, folder='ads/')
-            validated_data['image'] = upload_result['public_id']
+            validated_data['image'] = get_image_backend().upload(image_file)
 
         return Advertisement.objects.create(**validated_data)
 
@@ -39,7 +55,16 @@ class AdvertisementTitleSerializer(serializers.ModelSerializer):
         model = Advertisement
         fields = ['title']
 
-class AdvertisementDetailSerializer(serializers.ModelSerializer):
+class InteractionStateMixin:
+    """Read like/save state from the shared `interactions` context instead of querying per field."""
+
+    def interaction_state(self, ad):
+        interactions = self.context.get('interactions')
+        if interactions is None:
+            interactions = self.context['interactions'] = InteractionContext(self.context['request'].user)
+        return interactions.state(ad)
+
+class AdvertisementDetailSerializer(InteractionStateMixin, serializers.ModelSerializer):
     liked = serializers.SerializerMethodField()
     liked_at = serializers.SerializerMethodField()
     saved = serializers.SerializerMethodField()
@@ -53,24 +78,16 @@ class AdvertisementDetailSerializer(serializers.ModelSerializer):
         ]
 
     def get_liked(self, ad) -> bool:
-        user = self.context['request'].user
-        like = AdLike.objects.filter(ad=ad, user=user).first()
-        return like.liked if like else False
+        return self.interaction_state(ad)['liked']
 
     def get_liked_at(self, ad) -> Optional[datetime]:
-        user = self.context['request'].user
-        like = AdLike.objects.filter(ad=ad, user=user).first()
-        return like.liked_at if like else None
+        return self.interaction_state(ad)['liked_at']
 
     def get_saved(self, ad) -> bool:
-        user = self.context['request'].user
-        save = AdSaved.objects.filter(ad=ad, user=user).first()
-        return save.saved if save else False
+        return self.interaction_state(ad)['saved']
 
     def get_saved_at(self, ad) -> Optional[datetime]:
-        user = self.context['request'].user
-        save = AdSaved.objects.filter(ad=ad, user=user).first()
-        return save.saved_at if save else None
+        return self.interaction_state(ad)['saved_at']
 
 class ViewAdSerializer(serializers.ModelSerializer):
     ad_id = serializers.UUIDField(write_only=True) # for input
@@ -123,7 +140,7 @@ class LikeAdSerializer(serializers.ModelSerializer):
         like.save()
         return like
 
-class LikedAdDetailSerializer(serializers.ModelSerializer):
+class LikedAdDetailSerializer(InteractionStateMixin, serializers.ModelSerializer):
     liked = serializers.SerializerMethodField()
     liked_at = serializers.SerializerMethodField()
     saved = serializers.SerializerMethodField()
@@ -135,22 +152,18 @@ class LikedAdDetailSerializer(serializers.ModelSerializer):
                   'created_at', 'is_active', 'liked', 'liked_at', 'saved', 'saved_at']
 
     def get_liked(self, ad):
-        user = self.context['request'].user
-        return AdLike.objects.filter(user=user, ad=ad, liked=True).exists()
+        return self.interaction_state(ad)['liked']
 
     def get_liked_at(self, ad):
-        user = self.context['request'].user
-        like = AdLike.objects.filter(user=user, ad=ad, liked=True).first()
-        return like.liked_at if like else None
+        state = self.interaction_state(ad)
+        return state['liked_at'] if state['liked'] else None
 
     def get_saved(self, ad):
-        user = self.context['request'].user
-        return AdSaved.objects.filter(user=user, ad=ad, saved=True).exists()
+        return self.interaction_state(ad)['saved']
 
     def get_saved_at(self, ad):
-        user = self.context['request'].user
-        save = AdSaved.objects.filter(user=user, ad=ad, saved=True).first()
-        return save.saved_at if save else None
+        state = self.interaction_state(ad)
+        return state['saved_at'] if state['saved'] else None
 
 class ClickAdSerializer(serializers.ModelSerializer):
     ad_id = serializers.UUIDField(write_only=True)  # Input only
@@ -203,7 +216,7 @@ class SaveAdSerializer(serializers.ModelSerializer):
         save.save()
         return save
 
-class SavedAdDetailSerializer(serializers.ModelSerializer):
+class SavedAdDetailSerializer(InteractionStateMixin, serializers.ModelSerializer):
     saved = serializers.SerializerMethodField()
     saved_at = serializers.SerializerMethodField()
     liked = serializers.SerializerMethodField()
@@ -215,22 +228,18 @@ class SavedAdDetailSerializer(serializers.ModelSerializer):
                   'created_at', 'is_active', 'saved', 'saved_at', 'liked', 'liked_at']
 
     def get_saved(self, ad):
-        user = self.context['request'].user
-        return AdSaved.objects.filter(user=user, ad=ad, saved=True).exists()
+        return self.interaction_state(ad)['saved']
 
     def get_saved_at(self, ad):
-        user = self.context['request'].user
-        save = AdSaved.objects.filter(user=user, ad=ad, saved=True).first()
-        return save.saved_at if save else None
+        state = self.interaction_state(ad)
+        return state['saved_at'] if state['saved'] else None
 
     def get_liked(self, ad):
-        user = self.context['request'].user
-        return AdLike.objects.filter(user=user, ad=ad, liked=True).exists()
+        return self.interaction_state(ad)['liked']
 
     def get_liked_at(self, ad):
-        user = self.context['request'].user
-        like = AdLike.objects.filter(user=user, ad=ad, liked=True).first()
-        return like.liked_at if like else None
+        state = self.interaction_state(ad)
+        return state['liked_at'] if state['liked'] else None
 
 class LikedSavedAdSerializer(serializers.Serializer):
     ad = AdvertisementSerializer()
@@ -249,3 +258,13 @@ class AdInteractionSerializer(serializers.Serializer):
     clicked_at = serializers.DateTimeField(allow_null=True)
     saved = serializers.BooleanField()
     saved_at = serializers.DateTimeField(allow_null=True)
+
+class InteractionEventSerializer(serializers.Serializer):
+    """One queued interaction event sent by the mobile app."""
+    type = serializers.ChoiceField(choices=['view', 'click', 'like', 'save'])
+    ad_id = serializers.UUIDField()
+    value = serializers.BooleanField(default=True)  # false to unlike / unsave
+
+class InteractionBatchResultSerializer(serializers.Serializer):
+    recorded = serializers.IntegerField()
+    unknown_ad_ids = serializers.ListField(child=serializers.UUIDField())
@@ -1,8 +1,13 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from .models import Advertisement
 from django.contrib.auth import get_user_model
 from core.notifications.models import Notification
+from core.users.models import UserPreferences
+from .preferences import invalidate_preferences
+from .ranking import ranking_index
+from .search import update_search_vector
+from .images import set_image_urls
 
 User = get_user_model()
 
@@ -16,3 +21,23 @@ def create_ad_notification(sender, instance, created, **kwargs):
                 user=user,
                 message=f"New advertisement posted: {instance.title}"
             ) """
+
+@receiver(post_save, sender=UserPreferences)
+@receiver(post_delete, sender=UserPreferences)
+def refresh_ad_preferences(sender, instance, **kwargs):
+    invalidate_preferences(instance.user_id)
+
+@receiver(post_save, sender=Advertisement)
+@receiver(post_delete, sender=Advertisement)
+def refresh_ad_ranking(sender, instance, **kwargs):
+    ranking_index.invalidate()
+
+@receiver(post_save, sender=Advertisement)
+def refresh_search_vector(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {'title', 'content'} & set(update_fields):
+        update_search_vector(Advertisement.objects.filter(pk=instance.pk))
+
+@receiver(pre_save, sender=Advertisement)
+def store_image_urls(sender, instance, **kwargs):
+    # saves limited by update_fields persist the URLs only when they list image_url/image_variants too
+    set_image_urls(instance)
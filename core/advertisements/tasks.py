@@ -1,5 +1,7 @@
 from celery import shared_task
 from .models import Advertisement
+from .buffer import flush_ad_views
+from .uploads import fail_upload, finish_upload
 from django.utils.timezone import now
 
 @shared_task
@@ -7,4 +9,24 @@ def deactivate_expired_ads():
     """Set advertisements as inactive if their end_date has passed."""
     expired_ads = Advertisement.objects.filter(end_date__lt=now(), is_active=True)
     expired_ads.update(is_active=False)
-    return f"Updated {expired_ads.count()} expired advertisements."
\ No newline at end of file
+    return f"Updated {expired_ads.count()} expired advertisements."
+
+@shared_task
+def flush_ad_view_buffer():
+    """Write buffered ad views to the database in bulk upserts."""
+    written = flush_ad_views()
+    return f"Flushed {written} buffered ad views."
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=30)
+def upload_ad_image(self, ad_id, path):
+    """Upload a spooled advertisement image with its variants and mark the ad ready."""
+    try:
+        uploaded = finish_upload(ad_id, path)
+    except Exception as exc:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=exc)
+        fail_upload(ad_id, path)
+        return f"Image upload of advertisement {ad_id} failed: {exc}"
+    if not uploaded:
+        return f"Advertisement {ad_id} was deleted before its image was uploaded."
+    return f"Uploaded image of advertisement {ad_id}."
@@ -1,12 +1,31 @@
 from rest_framework import status
 from rest_framework.test import APITestCase
 from core.beacons.models import Beacon
-from core.advertisements.models import Advertisement
+from core.advertisements.models import Advertisement, AdView, AdLike, AdClick, AdSaved
 from core.advertisements.serializers import AdvertisementSerializer
 from django.utils.timezone import now
 from datetime import timedelta
 from django.urls import reverse
 from core.beacons.tests import BaseAPITestCase
+from core.assignments.models import AdvertisementAssignment
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from core.advertisements.buffer import flush_ad_views, flush_timer, get_view_buffer
+from core.advertisements.tasks import flush_ad_view_buffer, upload_ad_image
+from core.advertisements.search import search_ads, search_query, similar_to
+from core.advertisements.images import build_image_urls, public_id
+from unittest import mock
+from django.contrib.postgres.search import SearchQuery
+from django.conf import settings
+from uuid import uuid4
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+import base64
+import io
+import json
+import os
+import tempfile
 
 class AdvertisementModelTest(APITestCase):
     def setUp(self):
@@ -106,3 +125,354 @@ class AdvertisementView(BaseAPITestCase):
         response = self.client.post(self.advertisements_url, invalid_date, format="json")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+class InteractionBatchViewTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="phone", email="phone@example.com", password="pass")
+        self.client.force_authenticate(self.user)
+        self.ad1 = Advertisement.objects.create(title="Ybs Soap", content="30% discount", created_by=self.user)
+        self.ad2 = Advertisement.objects.create(title="Coffee", content="Buy one get one", created_by=self.user)
+        self.url = reverse('ad-interactions-batch')
+
+    def test_batch_is_upserted(self):
+        AdLike.objects.create(user=self.user, ad=self.ad2, liked=True)
+        unknown = uuid4()
+        events = [
+            {"type": "view", "ad_id": str(self.ad1.pk)},
+            {"type": "view", "ad_id": str(self.ad1.pk)},
+            {"type": "click", "ad_id": str(self.ad1.pk)},
+            {"type": "like", "ad_id": str(self.ad2.pk), "value": False},
+            {"type": "save", "ad_id": str(self.ad2.pk)},
+            {"type": "view", "ad_id": str(unknown)},
+        ]
+        response = self.client.post(self.url, events, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(response.data, {"recorded": 4, "unknown_ad_ids": [unknown]})
+        self.assertTrue(AdView.objects.get(user=self.user, ad=self.ad1).viewed)
+        self.assertTrue(AdClick.objects.get(user=self.user, ad=self.ad1).clicked)
+        self.assertFalse(AdLike.objects.get(user=self.user, ad=self.ad2).liked)
+        self.assertTrue(AdSaved.objects.get(user=self.user, ad=self.ad2).saved)
+        self.assertEqual(AdView.objects.count(), 1)
+
+    def test_invalid_event(self):
+        response = self.client.post(self.url, [{"type": "share", "ad_id": str(self.ad1.pk)}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class AdInteractionViewTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="phone", email="phone@example.com", password="pass")
+        self.client.force_authenticate(self.user)
+        self.url = reverse('ad-interactions')
+
+    def create_ads(self, count):
+        ads = [Advertisement.objects.create(title=f"Ad {i}", content="content", created_by=self.user) for i in range(count)]
+        for ad in ads:
+            AdView.objects.create(user=self.user, ad=ad, viewed=True)
+            AdLike.objects.create(user=self.user, ad=ad)
+        return ads
+
+    def test_interaction_state(self):
+        ad = self.create_ads(1)[0]
+        response = self.client.get(self.url)
+        row = response.data['results'][0]
+        self.assertEqual(row['ad']['advertisement_id'], str(ad.pk))
+        self.assertTrue(row['viewed'])
+        self.assertTrue(row['liked'])
+        self.assertFalse(row['clicked'])
+        self.assertIsNone(row['saved_at'])
+
+    def test_query_count_is_independent_of_catalog_size(self):
+        # count + page + one query per interaction type
+        self.create_ads(2)
+        with self.assertNumQueries(6):
+            self.client.get(self.url, {'page_size': 10})
+
+        self.create_ads(25)
+        with self.assertNumQueries(6):
+            response = self.client.get(self.url, {'page_size': 10})
+        self.assertEqual(response.data['count'], 27)
+        self.assertEqual(len(response.data['results']), 10)
+
+class InteractionContextTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="phone", email="phone@example.com", password="pass")
+        self.client.force_authenticate(self.user)
+        self.ads = [Advertisement.objects.create(title=f"Ad {i}", content="content", created_by=self.user) for i in range(3)]
+        for ad in self.ads:
+            AdLike.objects.create(user=self.user, ad=ad)
+        AdSaved.objects.create(user=self.user, ad=self.ads[0])
+
+    def test_liked_ads_use_fixed_query_count(self):
+        # count + page + likes + saves
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('like-ad'), {'page_size': 10})
+
+        self.assertEqual(response.data['count'], 3)
+        rows = {row['advertisement_id']: row for row in response.data['results']}
+        self.assertTrue(rows[str(self.ads[0].pk)]['saved'])
+        self.assertFalse(rows[str(self.ads[1].pk)]['saved'])
+        self.assertIsNone(rows[str(self.ads[1].pk)]['saved_at'])
+        self.assertTrue(all(row['liked'] for row in rows.values()))
+
+    def test_detail_uses_fixed_query_count(self):
+        # ad + likes + saves
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('advertisement-detail-interactions', args=[self.ads[0].pk]))
+
+        self.assertTrue(response.data['liked'])
+        self.assertTrue(response.data['saved'])
+        self.assertIsNotNone(response.data['saved_at'])
+
+@override_settings(AD_VIEW_WRITE_MODE='buffered', AD_VIEW_BUFFER_BACKEND='memory',
+                   AD_VIEW_FLUSH_SIZE=3, AD_VIEW_FLUSH_INTERVAL=60)
+class AdViewBufferTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        flush_ad_views()
+        flush_timer.cancel()
+        self.addCleanup(flush_timer.cancel)
+        self.user = get_user_model().objects.create_user(username="phone", email="phone@example.com", password="pass")
+        self.client.force_authenticate(self.user)
+        self.ads = [Advertisement.objects.create(title=f"Ad {i}", content="content", created_by=self.user) for i in range(3)]
+        self.url = reverse('view-ad')
+
+    def test_views_are_written_when_buffer_fills(self):
+        for ad in self.ads[:2]:
+            response = self.client.post(self.url, {"ad_id": str(ad.pk)}, format="json")
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(AdView.objects.count(), 0)
+
+        self.client.post(self.url, {"ad_id": str(self.ads[2].pk)}, format="json")
+        self.assertEqual(AdView.objects.filter(user=self.user, viewed=True).count(), 3)
+
+    def test_timer_writes_views_without_further_requests(self):
+        with mock.patch('core.flushing.threading.Timer') as timer:
+            self.client.post(self.url, {"ad_id": str(self.ads[0].pk)}, format="json")
+        (interval, fire), _ = timer.call_args
+        self.assertEqual((interval, AdView.objects.count()), (60, 0))
+
+        with mock.patch('core.flushing.connections'):
+            fire()
+        self.assertTrue(AdView.objects.filter(user=self.user, ad=self.ads[0], viewed=True).exists())
+
+    def test_flush_task_upserts_and_drops_unknown_ads(self):
+        AdView.objects.create(user=self.user, ad=self.ads[0], viewed=False)
+        buffer = get_view_buffer()
+        buffer.push(self.user.pk, self.ads[0].pk)
+        buffer.push(self.user.pk, self.ads[0].pk)
+        buffer.push(self.user.pk, uuid4())
+
+        flush_ad_view_buffer()
+
+        self.assertTrue(AdView.objects.get(user=self.user, ad=self.ads[0]).viewed)
+        self.assertEqual(AdView.objects.count(), 1)
+        self.assertEqual(buffer.drain(10), [])
+
+class KeysetPaginationTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="phone", email="phone@example.com", password="pass")
+        self.client.force_authenticate(self.user)
+        other = get_user_model().objects.create_user(username="other", email="other@example.com", password="pass")
+        self.ads = [Advertisement.objects.create(title=f"Ad {i}", content="content", created_by=self.user) for i in range(5)]
+        viewed_at = now()
+        for i, ad in enumerate(self.ads):
+            view = AdView.objects.create(user=self.user, ad=ad, viewed=True)
+            # two views share a timestamp so the id tie-breaker is exercised
+            AdView.objects.filter(pk=view.pk).update(viewed_at=viewed_at - timedelta(minutes=min(i, 3)))
+            AdLike.objects.create(user=self.user, ad=ad)
+            AdLike.objects.create(user=other, ad=ad)
+
+    def walk(self, url, params):
+        pages, response = [], self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.data)
+            if not response.data['next']:
+                return pages
+            response = self.client.get(response.data['next'])
+
+    def test_walks_every_row_once_newest_first(self):
+        pages = self.walk(reverse('view-ad'), {'page_size': 2})
+        self.assertEqual([len(page['results']) for page in pages], [2, 2, 1])
+        titles = [row['ad']['title'] for page in pages for row in page['results']]
+        self.assertEqual(titles, ["Ad 0", "Ad 1", "Ad 2", "Ad 4", "Ad 3"])
+
+        previous = self.client.get(pages[-1]['previous']).data
+        self.assertEqual([row['ad']['title'] for row in previous['results']], ["Ad 2", "Ad 4"])
+        self.assertIsNotNone(previous['previous'])
+
+    def test_interaction_join_is_not_multiplied(self):
+        pages = self.walk(reverse('like-ad'), {'page_size': 2, 'count': 'false'})
+        ids = [row['advertisement_id'] for page in pages for row in page['results']]
+        self.assertEqual(sorted(ids), sorted(str(ad.pk) for ad in self.ads))
+        self.assertNotIn('count', pages[0])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('view-ad'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_well_formed_cursor_with_bad_values(self):
+        for url, position in [('view-ad', ["x", "y"]), ('view-ad', [None, 1]), ('like-ad', [now().isoformat(), "x"])]:
+            cursor = base64.urlsafe_b64encode(json.dumps({'p': position, 'r': False}).encode()).decode()
+            response = self.client.get(reverse(url), {'cursor': cursor})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, position)
+
+class AdvertisementSearchTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="phone", email="phone@example.com", password="pass")
+        self.client.force_authenticate(self.user)
+        self.soap = Advertisement.objects.create(title="Ybs Soap", content="30% discount", created_by=self.user)
+        self.coffee = Advertisement.objects.create(title="Coffee", content="Fresh soap-free roast", created_by=self.user)
+        self.bread = Advertisement.objects.create(title="Bread", content="Baked daily", created_by=self.user)
+        for ad in (self.soap, self.bread):
+            AdView.objects.create(user=self.user, ad=ad, viewed=True)
+
+    def test_query_keeps_only_words_as_prefix_terms(self):
+        self.assertEqual(search_query("soap & !disc|"),
+                         SearchQuery("soap:* & disc:*", search_type='raw', config=settings.ADVERTISEMENT_SEARCH_CONFIG))
+        self.assertIsNone(search_query("&& !"))
+
+    def test_list_endpoints_share_the_search(self):
+        response = self.client.get(reverse('ad-interactions'), {'search': 'soap'})
+        self.assertEqual({row['ad']['title'] for row in response.data['results']}, {"Ybs Soap", "Coffee"})
+
+        response = self.client.get(reverse('view-ad'), {'search': 'soap'})
+        self.assertEqual([row['ad']['title'] for row in response.data['results']], ["Ybs Soap"])
+
+    def test_matching_uses_title_and_content(self):
+        self.assertEqual(set(search_ads(Advertisement.objects.all(), "DISCOUNT")), {self.soap})
+        self.assertEqual(set(search_ads(AdView.objects.all(), "bread", prefix='ad__').values_list('ad', flat=True)),
+                         {self.bread.pk})
+        self.assertEqual(search_ads(Advertisement.objects.all(), "").count(), 3)
+
+    def test_title_filter_matches_partial_titles(self):
+        response = self.client.get(reverse('ads_paginated'), {'title': 'ybs so'})
+        self.assertEqual([ad['title'] for ad in response.data['results']], ["Ybs Soap"])
+        self.assertEqual(set(similar_to(Beacon.objects.all(), ['name'], 'x')), set())
+
+class AdvertisementImageUrlTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="marketer", email="marketer@example.com", password="pass")
+        self.client.force_authenticate(self.user)
+
+    def test_urls_are_stored_when_the_image_changes(self):
+        ad = Advertisement.objects.create(title="Soap", content="Discount", created_by=self.user, image="ads/soap")
+        ad.refresh_from_db()
+        self.assertIn("ads/soap", ad.image_url)
+        self.assertEqual(set(ad.image_variants), set(settings.AD_IMAGE_VARIANTS))
+        self.assertIn("w_150", ad.image_variants['thumbnail'])
+
+        ad.image = "ads/soap-v2"
+        ad.save()
+        ad.refresh_from_db()
+        self.assertIn("ads/soap-v2", ad.image_url)
+
+        ad.image = None
+        ad.save()
+        ad.refresh_from_db()
+        self.assertIsNone(ad.image_url)
+        self.assertEqual(ad.image_variants, {})
+
+    def test_serializing_never_calls_cloudinary(self):
+        ad = Advertisement.objects.create(title="Soap", content="Discount", created_by=self.user, image="ads/soap")
+        legacy = Advertisement.objects.create(title="Bread", content="Fresh", created_by=self.user, image="ads/bread")
+        Advertisement.objects.filter(pk=legacy.pk).update(image_url=None, image_variants={})
+        legacy.refresh_from_db()
+        build_image_urls(public_id(legacy.image))
+
+        with mock.patch('cloudinary.CloudinaryImage') as sdk:
+            data = AdvertisementSerializer([ad, legacy], many=True).data
+        sdk.assert_not_called()
+        self.assertIn("ads/soap", data[0]['image_url'])
+        self.assertIn("ads/bread", data[1]['image_url'])
+        self.assertIn("thumbnail", data[1]['image_variants'])
+
+class AsyncImageUploadTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="marketer", email="marketer@example.com", password="pass")
+        self.client.force_authenticate(self.user)
+        self.media = tempfile.TemporaryDirectory()
+        self.spool = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        self.addCleanup(self.spool.cleanup)
+        settings_override = override_settings(
+            AD_IMAGE_BACKEND='local', AD_IMAGE_UPLOAD_MODE='async',
+            MEDIA_ROOT=self.media.name, AD_IMAGE_SPOOL_DIR=self.spool.name,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def image(self, size=(800, 400)):
+        content = io.BytesIO()
+        Image.new('RGB', size, 'red').save(content, 'PNG')
+        return SimpleUploadedFile("soap.png", content.getvalue(), content_type="image/png")
+
+    def create(self):
+        with mock.patch('core.advertisements.tasks.upload_ad_image.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('advertisement_list'), {
+                    "title": "Soap", "content": "Discount", "created_by": self.user.pk, "is_active": True,
+                    "image": self.image(),
+                }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        delay.assert_called_once()
+        return response, delay.call_args.args
+
+    def test_create_spools_the_image_and_the_task_finishes_the_ad(self):
+        response, (ad_id, path) = self.create()
+        self.assertEqual(response.data['image_status'], 'processing')
+        self.assertIsNone(response.data['image_url'])
+        self.assertTrue(os.path.exists(path))
+
+        upload_ad_image(ad_id, path)
+
+        ad = Advertisement.objects.get(pk=ad_id)
+        self.assertEqual(ad.image_status, Advertisement.ImageStatus.READY)
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(ad.image_url.endswith(f"{public_id(ad.image)}/original.jpg"))
+        self.assertEqual(set(ad.image_variants), set(settings.AD_IMAGE_VARIANTS))
+        stored = os.path.join(self.media.name, public_id(ad.image))
+        with Image.open(os.path.join(stored, 'thumbnail.jpg')) as thumbnail:
+            self.assertEqual(thumbnail.size, (150, 150))
+        with Image.open(os.path.join(stored, 'medium.jpg')) as medium:
+            self.assertEqual(medium.size, (600, 300))
+
+    def test_beacon_payload_follows_the_upload(self):
+        beacon = Beacon.objects.create(name="Beacon 1", location_name="Bole")
+        _, (ad_id, path) = self.create()
+        AdvertisementAssignment.objects.create(beacon=beacon, advertisement_id=ad_id, end_date=now() + timedelta(days=1))
+        url = reverse('beacon-datav-iew', args=[beacon.pk])
+        [ad] = self.client.get(url).data['ads']
+        self.assertEqual((ad['image_status'], ad['image_url']), ('processing', None))
+
+        upload_ad_image(ad_id, path)
+
+        [ad] = self.client.get(url).data['ads']
+        self.assertEqual(ad['image_status'], 'ready')
+        self.assertTrue(ad['image_url'].endswith("/original.jpg"))
+
+    def test_unreadable_image_marks_the_ad_failed(self):
+        _, (ad_id, path) = self.create()
+        with open(path, 'wb') as spooled:
+            spooled.write(b"not an image")
+
+        upload_ad_image.apply(args=(ad_id, path))
+
+        self.assertEqual(Advertisement.objects.get(pk=ad_id).image_status, Advertisement.ImageStatus.FAILED)
+        self.assertFalse(os.path.exists(path))
+
+    def test_sync_mode_uploads_inside_the_request(self):
+        with override_settings(AD_IMAGE_UPLOAD_MODE='sync'):
+            response = self.client.post(reverse('advertisement_list'), {
+                "title": "Soap", "content": "Discount", "created_by": self.user.pk, "image": self.image(),
+            }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['image_status'], 'ready')
+        self.assertTrue(response.data['image_url'].endswith("/original.jpg"))
@@ -0,0 +1,54 @@
+import os
+from pathlib import Path
+from uuid import uuid4
+from django.conf import settings
+from django.db import transaction
+from .images import get_image_backend
+from .models import Advertisement
+
+def is_async():
+    return settings.AD_IMAGE_UPLOAD_MODE == 'async'
+
+def spool_image(upload):
+    """Copy an uploaded file into AD_IMAGE_SPOOL_DIR; the file only appears under its name once complete."""
+    directory = Path(settings.AD_IMAGE_SPOOL_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f'{uuid4().hex}{Path(upload.name or "").suffix.lower()}'
+    partial = path.with_name(path.name + '.part')
+    with open(partial, 'wb') as spooled:
+        for chunk in upload.chunks():
+            spooled.write(chunk)
+    os.replace(partial, path)
+    return path
+
+def queue_upload(ad, path):
+    """Hand a spooled image of a 'processing' ad to the upload task once the ad is committed."""
+    from .tasks import upload_ad_image
+    ad_id, path = str(ad.pk), str(path)
+    transaction.on_commit(lambda: upload_ad_image.delay(ad_id, path))
+
+def finish_upload(ad_id, path):
+    """Upload a spooled image with its variants, point the ad at it and mark it ready.
+
+    Returns False when the ad was deleted in the meantime. The spool file is removed
+    once the image is stored; it stays in place when the upload raises.
+    """
+    path = Path(path)
+    ad = Advertisement.objects.filter(pk=ad_id).first()
+    if ad is None:
+        path.unlink(missing_ok=True)
+        return False
+    ad.image = get_image_backend().upload(str(path), eager=True)
+    ad.image_status = Advertisement.ImageStatus.READY
+    # saved through the model so post_save drops the cached beacon payloads of the ad
+    ad.save(update_fields=['image', 'image_url', 'image_variants', 'image_status'])
+    path.unlink(missing_ok=True)
+    return True
+
+def fail_upload(ad_id, path):
+    """Give up on a spooled image: mark the ad failed and drop the file."""
+    ad = Advertisement.objects.filter(pk=ad_id).first()
+    if ad is not None:
+        ad.image_status = Advertisement.ImageStatus.FAILED
+        ad.save(update_fields=['image_status'])
+    Path(path).unlink(missing_ok=True)
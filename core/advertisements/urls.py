@@ -1,7 +1,7 @@
 from django.urls import path
 from .views import (AdvertisementList, AdvertisementDetail, ViewAdListView, LikeAdView, ClickAdView,
                     SaveAdView, AdvertisementListWithPagination, AdInteractionView, LikedSavedAdsView,
-                    AdvertisementDetailInteraction)
+                    AdvertisementDetailInteraction, InteractionBatchView)
 from core.assignments.views import AdvertisementBeaconsView
 
 urlpatterns = [
@@ -16,6 +16,7 @@ urlpatterns = [
     path('click-ad/', ClickAdView.as_view(), name='click-ad'),
     path('save-ad/', SaveAdView.as_view(), name='save-ads'),
     path('interactions/', AdInteractionView.as_view(), name='ad-interactions'),
+    path('interactions/batch/', InteractionBatchView.as_view(), name='ad-interactions-batch'),
     path('like-save/', LikedSavedAdsView.as_view(), name='ad-like-save')
 
 ]
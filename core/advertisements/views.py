@@ -2,8 +2,17 @@ from .models import Advertisement, AdView, AdLike, AdClick, AdSaved
 from .serializers import (AdvertisementSerializer, AdvertisementSimpleSerializer, AdvertisementTitleSerializer,
                           AdInteractionSerializer, LikedSavedAdSerializer, LikedAdDetailSerializer,
                           SavedAdDetailSerializer, AdvertisementDetailSerializer,
-                          ViewAdSerializer, LikeAdSerializer, ClickAdSerializer, SaveAdSerializer)
-from django.db.models import Q
+                          ViewAdSerializer, LikeAdSerializer, ClickAdSerializer, SaveAdSerializer,
+                          InteractionEventSerializer, InteractionBatchResultSerializer)
+from .interactions import record_interactions, interaction_rows, InteractionContext
+from .buffer import is_buffered, buffer_ad_view
+from .search import search_ads, similar_to
+import base64
+import json
+from datetime import datetime
+from uuid import UUID
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
 from drf_spectacular.types import OpenApiTypes
 from rest_framework import status, generics
 from rest_framework.exceptions import NotFound
@@ -11,10 +20,11 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.throttling import UserRateThrottle
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse, OpenApiExample
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 class AdvertisementRateLimit(UserRateThrottle):
     rate = '100/minute'  # Custom throttle rate for this view
@@ -48,6 +58,135 @@ class CustomPagination(PageNumberPagination):
                 "results": data  # Empty list if page is out of range
             }, status=200)  # Always return HTTP 200
 
+class KeysetPagination(BasePagination):
+    """Cursor pagination over the view's `keyset_ordering`, e.g. ('-timestamp', '-log_id').
+
+    The last ordering field must be unique. A page is selected with a WHERE on the values
+    of the boundary row instead of an OFFSET, so deep pages cost the same as the first one.
+    `?count=false` skips the COUNT(*) query.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.fields = [field.lstrip('-') for field in view.keyset_ordering]
+        position, self.reverse = self.decode_cursor(request, queryset)
+        self.count = queryset.count() if self.include_count(request) else None
+
+        ordering = list(view.keyset_ordering)
+        if self.reverse:
+            ordering = [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, position))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+        self.has_next = has_more if not self.reverse else position is not None
+        self.has_previous = has_more if self.reverse else position is not None
+        self.rows = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def include_count(self, request):
+        return request.query_params.get(self.count_query_param, 'true').lower() not in ('false', '0', 'no')
+
+    @staticmethod
+    def after(ordering, position):
+        """Rows strictly after `position` in `ordering`, as (a < x) OR (a = x AND b < y) ..."""
+        first = ordering[0]
+        bound = Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": position[0]})
+        condition = Q()
+        for i, field in enumerate(ordering):
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            term = {ordering[j].lstrip('-'): position[j] for j in range(i)}
+            term[f"{field.lstrip('-')}__{lookup}"] = position[i]
+            condition |= Q(**term)
+        return bound & condition  # the bound lets the index on the first field narrow the scan
+
+    def decode_cursor(self, request, queryset):
+        """(position, reverse) of the cursor parameter; its values are converted with the ordering fields."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            position, reverse = cursor['p'], bool(cursor['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.fields):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            position = [self.ordering_field(queryset, name).to_python(value) for name, value in zip(self.fields, position)]
+        except (ValidationError, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        if any(value is None for value in position):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    @staticmethod
+    def ordering_field(queryset, name):
+        """Model field (or annotation output field) behind an ordering name."""
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        return queryset.model._meta.get_field(name)
+
+    def encode_cursor(self, row, reverse):
+        position = []
+        for field in self.fields:
+            value = getattr(row, field)
+            position.append(value.isoformat() if isinstance(value, datetime) else str(value) if isinstance(value, UUID) else value)
+        cursor = base64.urlsafe_b64encode(json.dumps({'p': position, 'r': reverse}).encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self.encode_cursor(self.rows[-1], False) if self.has_next and self.rows else None
+
+    def get_previous_link(self):
+        return self.encode_cursor(self.rows[0], True) if self.has_previous and self.rows else None
+
+    def get_paginated_response(self, data):
+        response = {"next": self.get_next_link(), "previous": self.get_previous_link(), "results": data}
+        if self.count is not None:
+            response = {"count": self.count, **response}
+        return Response(response, status=200)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer', 'example': 123, 'description': 'Omitted with ?count=false'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {'name': self.cursor_query_param, 'required': False, 'in': 'query',
+             'description': 'Opaque cursor taken from the `next`/`previous` link.', 'schema': {'type': 'string'}},
+            {'name': self.page_size_query_param, 'required': False, 'in': 'query',
+             'description': 'Number of results per page.', 'schema': {'type': 'integer'}},
+            {'name': self.count_query_param, 'required': False, 'in': 'query',
+             'description': 'Set to `false` to skip the total count.', 'schema': {'type': 'boolean'}},
+        ]
+
 class AdvertisementList(ListCreateAPIView):
     """ List all advertisements or create a new one. """
     serializer_class = AdvertisementSerializer
@@ -58,12 +197,10 @@ class AdvertisementList(ListCreateAPIView):
 
         # Use a single query parameter 'search' for both title and content
         query = self.request.GET.get('search')
+        qs = search_ads(qs, query)
 
-        if query:
-            search_conditions = Q(title__icontains=query) | Q(content__icontains=query)
-            qs = qs.filter(search_conditions)
-
-        return qs
+        # 'title' matches partial or misspelled titles
+        return similar_to(qs, ['title'], self.request.GET.get('title'), rank=not query)
 
     @extend_schema(
         tags=["Advertisements"],
@@ -77,6 +214,13 @@ class AdvertisementList(ListCreateAPIView):
                 required=False,
                 description="Search term to filter advertisements by title or content.",
             ),
+            OpenApiParameter(
+                name="title",
+                type=str,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description="Partial or approximate advertisement title, closest matches first.",
+            ),
             OpenApiParameter(
                 name="page",
                 type=int,
@@ -229,12 +373,10 @@ class AdvertisementListWithPagination(ListCreateAPIView):
 
         # Use a single query parameter 'search' for both title and content
         query = self.request.GET.get('search')
+        qs = search_ads(qs, query)
 
-        if query:
-            search_conditions = Q(title__icontains=query) | Q(content__icontains=query)
-            qs = qs.filter(search_conditions)
-
-        return qs
+        # 'title' matches partial or misspelled titles
+        return similar_to(qs, ['title'], self.request.GET.get('title'), rank=not query)
 
     @extend_schema(
         tags=["Advertisements"],
@@ -248,6 +390,13 @@ class AdvertisementListWithPagination(ListCreateAPIView):
                 required=False,
                 description="Search advertisements by title or content.",
             ),
+            OpenApiParameter(
+                name="title",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description="Partial or approximate advertisement title, closest matches first.",
+            ),
             OpenApiParameter(
                 name="page",
                 type=OpenApiTypes.INT,
@@ -343,29 +492,27 @@ class ViewAdListView(ListCreateAPIView):
     """Allow users to view an ad and retrieve their viewed ads, with optional search functionality."""
     serializer_class = ViewAdSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-viewed_at', '-id')
 
     def get_queryset(self):
-        """Return the viewed ads of the authenticated user, optionally filtered by a search query."""
-        # Start with the queryset of ads viewed by the authenticated user
-        viewed_ads = Advertisement.objects.filter(adview__user=self.request.user)
+        """Return the views of the authenticated user, optionally filtered by a search query."""
+        # Start with the views of the authenticated user
+        viewed_ads = AdView.objects.filter(user=self.request.user).select_related('ad')
 
         # Retrieve the search query parameter
         search_query = self.request.GET.get('search', '')
 
-        if search_query:
-            # Filter advertisements by title or content containing the search term
-            viewed_ads = viewed_ads.filter(
-                Q(title__icontains=search_query) | Q(content__icontains=search_query)
-            )
-
-        return viewed_ads
+        # Filter by advertisement title or content matching the search term; newest first is kept
+        return search_ads(viewed_ads, search_query, prefix='ad__', rank=False)
 
     @extend_schema(
         tags=["Advertisements"],
         summary="List viewed ads",
         description=(
-                "Retrieves a list of advertisements that the authenticated user has viewed. "
-                "Supports optional filtering by a search query parameter to match advertisement titles or content."
+                "Retrieves a cursor-paginated list of advertisements that the authenticated user has viewed, "
+                "most recent first. Supports optional filtering by a search query parameter to match "
+                "advertisement titles or content."
         ),
         parameters=[
             OpenApiParameter(
@@ -432,17 +579,23 @@ class ViewAdListView(ListCreateAPIView):
         serializer = self.get_serializer(data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            if is_buffered():
+                # write-behind: the view is upserted with the next buffer flush
+                buffer_ad_view(request.user.pk, serializer.validated_data['ad_id'])
+            else:
+                serializer.save()
             return Response({"message": "Ad viewed successfully"}, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class LikeAdView(ListCreateAPIView):
     permission_classes = [IsAuthenticated]
-    pagination_class = CustomPagination
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-interacted_at', '-advertisement_id')
 
     def get_queryset(self):
-        return Advertisement.objects.filter(likes__user=self.request.user, likes__liked=True ).distinct()
+        return Advertisement.objects.filter(likes__user=self.request.user, likes__liked=True) \
+                                    .annotate(interacted_at=F('likes__liked_at'))
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -452,7 +605,8 @@ class LikeAdView(ListCreateAPIView):
     @extend_schema(
         tags=["Advertisements"],
         summary="List liked ads",
-        description="Retrieve a paginated list of advertisements that the authenticated user has liked.",
+        description="Retrieve a cursor-paginated list of advertisements that the authenticated user has liked, "
+                    "most recently liked first.",
         parameters=[
             OpenApiParameter(
                 name='search',
@@ -461,20 +615,6 @@ class LikeAdView(ListCreateAPIView):
                 type=OpenApiTypes.STR,
                 location=OpenApiParameter.QUERY
             ),
-            OpenApiParameter(
-                name='page',
-                description='Page number for pagination.',
-                required=False,
-                type=OpenApiTypes.INT,
-                location=OpenApiParameter.QUERY
-            ),
-            OpenApiParameter(
-                name='page_size',
-                description='Number of items per page.',
-                required=False,
-                type=OpenApiTypes.INT,
-                location=OpenApiParameter.QUERY
-            ),
         ],
         responses={
             200: LikedAdDetailSerializer(many=True),
@@ -483,17 +623,18 @@ class LikeAdView(ListCreateAPIView):
     )
     def get(self, request, *args, **kwargs):
         queryset = self.get_queryset()
-        search_query = request.GET.get('search', '')
-        if search_query:
-            queryset = queryset.filter(Q(title__icontains=search_query) | Q(content__icontains=search_query))
+        queryset = search_ads(queryset, request.GET.get('search', ''), rank=False)
 
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = self.get_serializer(page, many=True, context={'request': request})
+            context = {'request': request, 'interactions': InteractionContext(request.user, page)}
+            serializer = self.get_serializer(page, many=True, context=context)
             return self.get_paginated_response(serializer.data)
 
             # Fallback if pagination is not applied
-        serializer = self.get_serializer(queryset, many=True, context={'request': request})
+        ads = list(queryset)
+        context = {'request': request, 'interactions': InteractionContext(request.user, ads)}
+        serializer = self.get_serializer(ads, many=True, context=context)
         return Response(serializer.data)
 
     @extend_schema(
@@ -565,29 +706,27 @@ class ClickAdView(ListCreateAPIView):
     """Allow users to click an ad and retrieve their clicked ads, with optional search functionality."""
     serializer_class = ClickAdSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-clicked_at', '-id')
 
     def get_queryset(self):
-        """Return the viewed ads of the authenticated user, optionally filtered by a search query."""
-        # Start with the queryset of ads clicked by the authenticated user
-        clicked_ads = Advertisement.objects.filter(clicks__user=self.request.user)
+        """Return the clicks of the authenticated user, optionally filtered by a search query."""
+        # Start with the clicks of the authenticated user
+        clicked_ads = AdClick.objects.filter(user=self.request.user).select_related('ad')
 
         # Retrieve the search query parameter
         search_query = self.request.GET.get('search', '')
 
-        if search_query:
-            # Filter advertisements by title or content containing the search term
-            clicked_ads = clicked_ads.filter(
-                Q(title__icontains=search_query) | Q(content__icontains=search_query)
-            )
-
-        return clicked_ads
+        # Filter by advertisement title or content matching the search term; newest first is kept
+        return search_ads(clicked_ads, search_query, prefix='ad__', rank=False)
 
     @extend_schema(
         tags=["Advertisements"],
         summary="List clicked ads",
         description=(
-                "Retrieves a list of advertisements that the authenticated user has clicked. "
-                "Supports optional filtering by a search query parameter to match advertisement titles or content."
+                "Retrieves a cursor-paginated list of advertisements that the authenticated user has clicked, "
+                "most recent first. Supports optional filtering by a search query parameter to match "
+                "advertisement titles or content."
         ),
         parameters=[
             OpenApiParameter(
@@ -599,7 +738,7 @@ class ClickAdView(ListCreateAPIView):
             ),
         ],
         responses={
-            200: ViewAdSerializer(many=True),
+            200: ClickAdSerializer(many=True),
             401: {
                 'description': 'Unauthorized - Authentication credentials were not provided or are invalid.',
             },
@@ -662,10 +801,12 @@ class ClickAdView(ListCreateAPIView):
 
 class SaveAdView(ListCreateAPIView):
     permission_classes = [IsAuthenticated]
-    pagination_class = CustomPagination
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-interacted_at', '-advertisement_id')
 
     def get_queryset(self):
-        return Advertisement.objects.filter(saves__user=self.request.user, saves__saved=True ).distinct()
+        return Advertisement.objects.filter(saves__user=self.request.user, saves__saved=True) \
+                                    .annotate(interacted_at=F('saves__saved_at'))
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -675,7 +816,8 @@ class SaveAdView(ListCreateAPIView):
     @extend_schema(
         tags=["Advertisements"],
         summary="List saved ads",
-        description="Retrieve a paginated list of advertisements that the authenticated user has saved.",
+        description="Retrieve a cursor-paginated list of advertisements that the authenticated user has saved, "
+                    "most recently saved first.",
         parameters=[
             OpenApiParameter(
                 name='search',
@@ -684,20 +826,6 @@ class SaveAdView(ListCreateAPIView):
                 type=OpenApiTypes.STR,
                 location=OpenApiParameter.QUERY
             ),
-            OpenApiParameter(
-                name='page',
-                description='Page number for pagination.',
-                required=False,
-                type=OpenApiTypes.INT,
-                location=OpenApiParameter.QUERY
-            ),
-            OpenApiParameter(
-                name='page_size',
-                description='Number of ads per page.',
-                required=False,
-                type=OpenApiTypes.INT,
-                location=OpenApiParameter.QUERY
-            ),
         ],
         responses={
             200: SavedAdDetailSerializer(many=True),
@@ -706,17 +834,18 @@ class SaveAdView(ListCreateAPIView):
     )
     def get(self, request, *args, **kwargs):
         queryset = self.get_queryset()
-        search_query = request.GET.get('search', '')
-        if search_query:
-            queryset = queryset.filter(Q(title__icontains=search_query) | Q(content__icontains=search_query))
+        queryset = search_ads(queryset, request.GET.get('search', ''), rank=False)
 
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = self.get_serializer(page, many=True, context={'request': request})
+            context = {'request': request, 'interactions': InteractionContext(request.user, page)}
+            serializer = self.get_serializer(page, many=True, context=context)
             return self.get_paginated_response(serializer.data)
 
             # Fallback if pagination is not applied
-        serializer = self.get_serializer(queryset, many=True, context={'request': request})
+        ads = list(queryset)
+        context = {'request': request, 'interactions': InteractionContext(request.user, ads)}
+        serializer = self.get_serializer(ads, many=True, context=context)
         return Response(serializer.data)
 
     @extend_schema(
@@ -784,6 +913,45 @@ class SaveAdView(ListCreateAPIView):
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class InteractionBatchView(APIView):
+    """Record a batch of view, click, like and save events in one request."""
+    permission_classes = [IsAuthenticated]
+    max_batch_size = 1000
+
+    @extend_schema(
+        tags=["Advertisements"],
+        summary="Record a batch of ad interactions",
+        description=(
+                "Accepts an array of interaction events (`view`, `click`, `like`, `save`) queued by the app, "
+                "e.g. after an offline period. Use `value=false` to unlike or unsave. "
+                "Events for unknown ads are skipped and reported back in `unknown_ad_ids`."
+        ),
+        request=InteractionEventSerializer(many=True),
+        responses={
+            201: InteractionBatchResultSerializer,
+            400: OpenApiResponse(description="Validation error"),
+        },
+        examples=[
+            OpenApiExample(
+                'Request Example',
+                value=[
+                    {"type": "view", "ad_id": "e97d5b0e-1d7a-4a87-9a68-54876b6e9e23"},
+                    {"type": "like", "ad_id": "e97d5b0e-1d7a-4a87-9a68-54876b6e9e23"},
+                    {"type": "save", "ad_id": "3c9ef5e0-2d1b-47c2-9d60-2b76d6e3f404", "value": False},
+                ],
+                request_only=True
+            )
+        ]
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = InteractionEventSerializer(data=request.data, many=True, allow_empty=False,
+                                                max_length=self.max_batch_size)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        recorded, unknown_ad_ids = record_interactions(request.user, serializer.validated_data)
+        return Response({"recorded": recorded, "unknown_ad_ids": unknown_ad_ids}, status=status.HTTP_201_CREATED)
+
 class LikedSavedAdsView(APIView):
     permission_classes = [IsAuthenticated]
     pagination_class = CustomPagination
@@ -880,45 +1048,13 @@ class AdInteractionView(generics.ListAPIView):
     pagination_class = CustomPagination
 
     def get_queryset(self):
-        user = self.request.user
         search_query = self.request.GET.get('search', '')
-        ads = Advertisement.objects.all()
-
-        if search_query:
-            ads = ads.filter(
-                Q(title__icontains=search_query) | Q(content__icontains=search_query)
-            )
+        ads = Advertisement.objects.order_by('-created_at')
 
-        return ads
+        return search_ads(ads, search_query)
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        user = request.user
-        result = []
-
-        for ad in queryset:
-            view = AdView.objects.filter(user=user, ad=ad).first()
-            like = AdLike.objects.filter(user=user, ad=ad).first()
-            click = AdClick.objects.filter(user=user, ad=ad).first()
-            save = AdSaved.objects.filter(user=user, ad=ad).first()
-
-            data = {
-                'ad': AdvertisementSerializer(ad, context={'request': request}).data,
-                'viewed': view.viewed if view else False,
-                'viewed_at': view.viewed_at if view else None,
-                'liked': like.liked if like else False,
-                'liked_at': like.liked_at if like else None,
-                'clicked': click.clicked if click else False,
-                'clicked_at': click.clicked_at if click else None,
-                'saved': save.saved if save else False,
-                'saved_at': save.saved_at if save else None,
-            }
-
-            result.append(data)
-
-        page = self.paginate_queryset(result)
-        return self.get_paginated_response(page)
-
-
-
-
+        # Paginate in the DB first, then load interaction state for the page only
+        page = self.paginate_queryset(self.get_queryset())
+        rows = interaction_rows(request.user, page)
+        return self.get_paginated_response(AdInteractionSerializer(rows, many=True, context={'request': request}).data)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AssignmentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core.assignments'
+
+    def ready(self):
+        import core.assignments.signals
@@ -0,0 +1,85 @@
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from django.utils.timezone import now
+from core.assignments.models import AdvertisementAssignment
+from core.versioned import VersionedIndex
+
+VERSION_KEY = 'assignment_index_version:{}'
+
+Window = namedtuple('Window', ['assignment_id', 'advertisement_id', 'start_date', 'end_date'])
+
+class BeaconSchedule:
+    """Sorted boundary list over the assignment windows of one beacon.
+
+    Every distinct start/end date is a boundary. For each boundary and for each open
+    gap between two boundaries the set of covering windows is precomputed, so a
+    point lookup is a single bisect.
+    """
+
+    def __init__(self, windows):
+        self.windows = sorted(windows, key=lambda window: window.start_date)
+        self.starts = [window.start_date for window in self.windows]
+        self.boundaries = sorted({window.start_date for window in self.windows} |
+                                 {window.end_date for window in self.windows})
+        self.at_boundary = [set() for _ in self.boundaries]
+        self.after_boundary = [set() for _ in self.boundaries]
+
+        for position, window in enumerate(self.windows):
+            if window.end_date < window.start_date:
+                continue
+            first = bisect_left(self.boundaries, window.start_date)
+            last = bisect_left(self.boundaries, window.end_date)
+            for i in range(first, last + 1):
+                self.at_boundary[i].add(position)
+            for i in range(first, last):
+                self.after_boundary[i].add(position)
+
+    def covering(self, when):
+        """Windows with start_date <= when <= end_date."""
+        i = bisect_left(self.boundaries, when)
+        if i < len(self.boundaries) and self.boundaries[i] == when:
+            positions = self.at_boundary[i]
+        elif 0 < i < len(self.boundaries):
+            positions = self.after_boundary[i - 1]
+        else:
+            return []
+        return [self.windows[position] for position in sorted(positions)]
+
+    def overlapping(self, start, end):
+        """Windows that intersect [start, end], ordered by start_date."""
+        candidates = self.windows[:bisect_right(self.starts, end)]
+        return [window for window in candidates if window.end_date >= start]
+
+class AssignmentIndex:
+    """In-process BeaconSchedule per beacon, each rebuilt after that beacon's assignments change."""
+
+    def __init__(self):
+        self._schedules = {}
+
+    def load(self, beacon_id):
+        rows = AdvertisementAssignment.objects.filter(beacon_id=beacon_id).values_list(
+            'assignment_id', 'advertisement_id', 'start_date', 'end_date'
+        )
+        return BeaconSchedule(Window(*row) for row in rows)
+
+    def schedule(self, beacon_id):
+        if beacon_id not in self._schedules:
+            self._schedules[beacon_id] = VersionedIndex(VERSION_KEY.format(beacon_id))
+        return self._schedules[beacon_id].get(lambda: self.load(beacon_id))
+
+    def active(self, beacon_id, when=None):
+        """Assignments of the beacon that cover `when` (defaults to now)."""
+        return self.schedule(beacon_id).covering(when or now())
+
+    def active_advertisement_ids(self, beacon_id, when=None):
+        return {window.advertisement_id for window in self.active(beacon_id, when)}
+
+    def between(self, beacon_id, start, end):
+        """Assignments of the beacon that run at any point between start and end."""
+        return self.schedule(beacon_id).overlapping(start, end)
+
+    def invalidate(self, beacon_id):
+        VersionedIndex(VERSION_KEY.format(beacon_id)).invalidate()
+        self._schedules.pop(beacon_id, None)
+
+assignment_index = AssignmentIndex()
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-17 02:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisements', '0002_alter_advertisement_image'),
+        ('assignments', '0001_initial'),
+        ('beacons', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='advertisementassignment',
+            index=models.Index(fields=['beacon', 'start_date', 'end_date'], name='assignment_beacon_window_idx'),
+        ),
+    ]
@@ -15,3 +15,6 @@ class AdvertisementAssignment(models.Model):
     class Meta:
         unique_together = ('beacon', 'advertisement') # prevents duplicate assignments
         ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['beacon', 'start_date', 'end_date'], name='assignment_beacon_window_idx'),
+        ]
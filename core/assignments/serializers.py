@@ -31,6 +31,13 @@ class AdvertisementAssignmentSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("The end date must be after the start date.")
         return data """
 
+class AssignmentWindowSerializer(serializers.Serializer):
+    """Assignment window as served by the in-process assignment index."""
+    assignment_id = serializers.UUIDField()
+    advertisement = serializers.UUIDField(source='advertisement_id')
+    start_date = serializers.DateTimeField()
+    end_date = serializers.DateTimeField()
+
 class AdvertisementDateSerializer(serializers.ModelSerializer):
     class Meta:
         model = AdvertisementAssignment
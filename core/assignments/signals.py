@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from core.assignments.models import AdvertisementAssignment
+from core.assignments.index import assignment_index
+from core.beacons.cache import invalidate_beacon_ads
+
+@receiver(pre_save, sender=AdvertisementAssignment)
+def remember_assignment_beacon(sender, instance, **kwargs):
+    """Keep the stored beacon so moving an assignment also refreshes the old beacon."""
+    instance._previous_beacon_id = (
+        AdvertisementAssignment.objects.filter(pk=instance.pk).values_list('beacon_id', flat=True).first()
+    )
+
+@receiver(post_save, sender=AdvertisementAssignment)
+@receiver(post_delete, sender=AdvertisementAssignment)
+def refresh_assignment_beacon(sender, instance, **kwargs):
+    beacon_ids = {instance.beacon_id, getattr(instance, '_previous_beacon_id', None)} - {None}
+    invalidate_beacon_ads(*beacon_ids)
+    for beacon_id in beacon_ids:
+        assignment_index.invalidate(beacon_id)
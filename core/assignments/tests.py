@@ -1,3 +1,85 @@
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core.advertisements.models import Advertisement
+from core.assignments.index import BeaconSchedule, Window, assignment_index
+from core.assignments.models import AdvertisementAssignment
+from core.beacons.models import Beacon
 
-# Create your tests here.
+def day(n):
+    return datetime(2025, 3, n, tzinfo=timezone.utc)
+
+class BeaconScheduleTest(TestCase):
+    def setUp(self):
+        self.first = Window(uuid4(), uuid4(), day(1), day(10))
+        self.second = Window(uuid4(), uuid4(), day(5), day(20))
+        self.schedule = BeaconSchedule([self.second, self.first])
+
+    def test_point_lookup(self):
+        self.assertEqual(self.schedule.covering(day(3)), [self.first])
+        self.assertEqual(self.schedule.covering(day(7)), [self.first, self.second])
+        self.assertEqual(self.schedule.covering(day(15)), [self.second])
+        self.assertEqual(self.schedule.covering(day(25)), [])
+
+    def test_boundaries_are_inclusive(self):
+        self.assertEqual(self.schedule.covering(day(1)), [self.first])
+        self.assertEqual(self.schedule.covering(day(10)), [self.first, self.second])
+        self.assertEqual(self.schedule.covering(day(20)), [self.second])
+
+    def test_range_lookup(self):
+        self.assertEqual(self.schedule.overlapping(day(11), day(12)), [self.second])
+        self.assertEqual(self.schedule.overlapping(day(2), day(6)), [self.first, self.second])
+        self.assertEqual(self.schedule.overlapping(day(21), day(22)), [])
+
+class AssignmentIndexTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(username="marketer", email="marketer@example.com", password="pass")
+        self.beacon = Beacon.objects.create(name="Beacon 1", location_name="Bole")
+        self.ad = Advertisement.objects.create(title="Ybs Soap", content="30% discount", created_by=user)
+
+    def test_index_follows_assignment_changes(self):
+        self.assertEqual(assignment_index.active(self.beacon.pk, day(5)), [])
+
+        assignment = AdvertisementAssignment.objects.create(
+            beacon=self.beacon, advertisement=self.ad, start_date=day(1), end_date=day(10)
+        )
+        self.assertEqual(assignment_index.active_advertisement_ids(self.beacon.pk, day(5)), {self.ad.pk})
+
+        assignment.end_date = day(3)
+        assignment.save()
+        self.assertEqual(assignment_index.active(self.beacon.pk, day(5)), [])
+
+        assignment.delete()
+        self.assertEqual(assignment_index.between(self.beacon.pk, day(1), day(31)), [])
+
+class AdvertisementActiveTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(username="marketer", email="marketer@example.com", password="pass")
+        self.client.force_authenticate(user)
+        self.beacon = Beacon.objects.create(name="Beacon 1", location_name="Bole")
+        other = Beacon.objects.create(name="Beacon 2", location_name="Piassa")
+        self.ad = Advertisement.objects.create(title="Ybs Soap", content="30% discount", created_by=user)
+        self.running = AdvertisementAssignment.objects.create(
+            beacon=self.beacon, advertisement=self.ad, start_date=now() - timedelta(days=1), end_date=now() + timedelta(days=1)
+        )
+        AdvertisementAssignment.objects.create(
+            beacon=other, advertisement=self.ad, start_date=now() - timedelta(days=1), end_date=now() + timedelta(days=1)
+        )
+
+    def test_active_assignments_of_one_beacon(self):
+        response = self.client.get(reverse('active_advertisements'), {'beacon': self.beacon.pk})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['assignment_id'] for row in response.data], [str(self.running.pk)])
+        self.assertEqual(len(self.client.get(reverse('active_advertisements')).data), 2)
+
+    def test_invalid_beacon_id(self):
+        response = self.client.get(reverse('active_advertisements'), {'beacon': "notauuid"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
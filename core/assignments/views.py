@@ -1,13 +1,18 @@
 from core.beacons.models import Beacon
 from core.advertisements.models import Advertisement
 from core.assignments.models import AdvertisementAssignment
-from .serializers import AdvertisementAssignmentSerializer, AdvertisementBeaconsSerializer, AdvertisementDateSerializer, BeaconAdvertisementsSerializer
+from core.assignments.index import assignment_index
+from .serializers import (AdvertisementAssignmentSerializer, AdvertisementBeaconsSerializer, AdvertisementDateSerializer,
+                          BeaconAdvertisementsSerializer, AssignmentWindowSerializer)
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView, ListAPIView
+from rest_framework.views import APIView
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 from rest_framework.response import Response
 from rest_framework import status
-from datetime import datetime
-from django.utils.timezone import now
+from datetime import datetime, timedelta
+from uuid import UUID
+from django.utils.timezone import now, make_aware
 
 class AdvertisementAssignmentList(ListCreateAPIView):
     """API endpoint for listing and creating advertisement assignments."""
@@ -214,41 +219,98 @@ class AdvertisementAssignmentDetail(RetrieveUpdateDestroyAPIView):
         return self.destroy(request, *args, **kwargs)
 
 class AdvertisementActive(ListAPIView):
-    """List all active advertisements."""
+    """List all advertisement assignments running right now."""
     serializer_class = AdvertisementAssignmentSerializer
 
     def get_queryset(self):
-        """Return only active advertisements based on start and end dates."""
+        """Return only assignments whose start and end dates cover the current time.
+
+        With `beacon` (a UUID) the covering assignments come from the in-process
+        assignment index and are fetched by primary key.
+        """
+        beacon = self.request.GET.get('beacon')
+        if beacon:
+            windows = assignment_index.active(UUID(beacon))
+            return AdvertisementAssignment.objects.filter(pk__in=[window.assignment_id for window in windows])
         current_time = now()
-        return Advertisement.objects.filter(start_date__lte=current_time, end_date__gte=current_time)
+        return AdvertisementAssignment.objects.filter(start_date__lte=current_time, end_date__gte=current_time)
 
     @extend_schema(
         tags=["Assignments"],
         summary="Get active advertisements",
         description="""
-            Fetch all advertisements that are currently active based on their start and end dates.
+            Fetch all advertisement assignments that are currently running based on their start and end dates.
 
             **Example Request:**
             ```
-            GET /api/advertisements/active/
+            GET /api/v1/assignments/active/?beacon=123e4567-e89b-12d3-a456-426614174000
             ```
 
             **Responses:**
-            - `200 OK`: Returns a list of active advertisements.
+            - `200 OK`: Returns a list of active advertisement assignments.
+            - `400 Bad Request`: If `beacon` is not a valid UUID.
             - `404 Not Found`: If no active advertisements are available.
         """,
+        parameters=[
+            OpenApiParameter(name="beacon", type=OpenApiTypes.UUID, description="Only assignments of this beacon",
+                             required=False),
+        ],
         responses={
             200: AdvertisementAssignmentSerializer(many=True),
+            400: OpenApiResponse(description="Invalid beacon id"),
             404: OpenApiResponse(description="No active advertisements found")
         }
     )
     def get(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
+        try:
+            queryset = self.get_queryset()
+        except ValueError:
+            return Response({"error": "Invalid beacon id. Use a UUID."}, status=status.HTTP_400_BAD_REQUEST)
         if not queryset.exists():
             return Response({"message": "No active advertisements found."}, status=status.HTTP_404_NOT_FOUND)
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+class BeaconSchedule(APIView):
+    """Assignment windows of a beacon, answered from the in-process assignment index."""
+
+    @extend_schema(
+        tags=["Assignments"],
+        summary="Get the advertisement schedule of a beacon",
+        description="""
+            Returns the assignments of a beacon that run at any point between `start_date` and `end_date`.
+            Without a range the assignments running right now are returned.
+
+            **Example Request:**
+            ```
+            GET /api/v1/assignments/schedule/123e4567-e89b-12d3-a456-426614174000/?start_date=2025-03-01&end_date=2025-03-31
+            ```
+        """,
+        parameters=[
+            OpenApiParameter(name="start_date", type=str, description="Range start (YYYY-MM-DD)", required=False),
+            OpenApiParameter(name="end_date", type=str, description="Range end (YYYY-MM-DD, inclusive)", required=False),
+        ],
+        responses={
+            200: AssignmentWindowSerializer(many=True),
+            400: OpenApiResponse(description="Invalid date format"),
+        }
+    )
+    def get(self, request, pk):
+        start_date = request.GET.get('start_date')
+        end_date = request.GET.get('end_date')
+
+        if not start_date and not end_date:
+            windows = assignment_index.active(pk)
+        else:
+            try:
+                start = make_aware(datetime.strptime(start_date, "%Y-%m-%d")) if start_date else now()
+                end = make_aware(datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)) if end_date else start
+            except ValueError:
+                return Response({"error": "Invalid date format. Use YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+            windows = assignment_index.between(pk, start, end)
+
+        return Response(AssignmentWindowSerializer(windows, many=True).data)
+
 class AdvertisementBeaconsView(ListAPIView):
     """ API endpoint to list advertisement along with their assigned beacons. """
     queryset = Advertisement.objects.prefetch_related("advertisement_assignments__beacon").all()
@@ -0,0 +1,21 @@
+from django.db import migrations
+from core.logs.partitions import BEACON_MESSAGES, convert_to_partitioned
+
+
+def partition_messages(apps, schema_editor):
+    # native range partitioning is Postgres only; other databases keep the plain table
+    if schema_editor.connection.vendor == 'postgresql':
+        convert_to_partitioned(schema_editor, BEACON_MESSAGES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('beacon_messages', '0001_initial'),
+        ('beacons', '0001_initial'),
+    ]
+
+    operations = [
+        # not reversed: the partitioned table keeps working with the earlier model state
+        migrations.RunPython(partition_messages, migrations.RunPython.noop),
+    ]
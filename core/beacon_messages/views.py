@@ -1,4 +1,5 @@
 from core.beacon_messages.models import BeaconMessage
+from core.advertisements.views import KeysetPagination
 from .serializers import BeaconMessageSerializer
 from datetime import datetime
 from rest_framework.exceptions import ValidationError
@@ -8,6 +9,8 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter
 class MessageList(generics.ListCreateAPIView):
     """Create and List beacon_messages from beacons"""
     serializer_class = BeaconMessageSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-sent_at', '-message_id')
 
     def get_queryset(self):
         qs = BeaconMessage.objects.select_related('beacon').all()  # Optimize query
@@ -25,7 +28,8 @@ class MessageList(generics.ListCreateAPIView):
     @extend_schema(
         tags=["Messages"],
         summary="List all beacon_messages sent by beacons",
-        description="Retrieve a list of all existing beacon_messages. Optionally, filter by 'sent_at' date parameter.",
+        description="Retrieve a cursor-paginated list of all existing beacon_messages, newest first. "
+                    "Optionally, filter by 'sent_at' date parameter; pass `count=false` to skip the total count.",
         parameters=[
             OpenApiParameter(name="sent_at", description="Filter by sent date (YYYY-MM-DD)", required=False, type=str),
         ],
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Beacon
+from .models import Beacon, BeaconTelemetry, BeaconTelemetryBucket
 
 # Register your models here.
 admin.site.register(Beacon)
+admin.site.register(BeaconTelemetry)
+admin.site.register(BeaconTelemetryBucket)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BeaconsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core.beacons'
+
+    def ready(self):
+        import core.beacons.signals
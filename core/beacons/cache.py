@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.cache import cache
+from core.beacons.models import Beacon
+from core.advertisements.models import Advertisement
+from core.advertisements.serializers import AdvertisementSerializer
+from core.assignments.index import assignment_index
+
+BEACON_ADS_KEY = 'beacon_ads:{}'
+
+def beacon_ads_key(beacon_id):
+    return BEACON_ADS_KEY.format(beacon_id)
+
+def cached_beacon_ads(beacon_id):
+    """Serialized active ads assigned to a beacon, or None if the beacon does not exist."""
+    key = beacon_ads_key(beacon_id)
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+
+    if not Beacon.objects.filter(beacon_id=beacon_id).exists():
+        return None
+
+    ads = Advertisement.objects.filter(
+        advertisement_assignments__beacon_id=beacon_id,
+        is_active=True
+    ).distinct()
+    payload = list(AdvertisementSerializer(ads, many=True).data)
+    cache.set(key, payload, settings.BEACON_ADS_CACHE_TIMEOUT)
+    return payload
+
+def resolve_beacon_ads(beacon_id, when=None):
+    """Return the cached ads whose assignment window covers `when`, or None for an unknown beacon."""
+    payload = cached_beacon_ads(beacon_id)
+    if payload is None:
+        return None
+
+    scheduled = {str(ad_id) for ad_id in assignment_index.active_advertisement_ids(beacon_id, when)}
+    return [ad for ad in payload if ad['advertisement_id'] in scheduled]
+
+def invalidate_beacon_ads(*beacon_ids):
+    """Drop the cached ad payload of the given beacons."""
+    if beacon_ids:
+        cache.delete_many([beacon_ads_key(beacon_id) for beacon_id in beacon_ids])
@@ -0,0 +1,63 @@
+from collections import defaultdict, namedtuple
+from core.beacons.models import Beacon
+from core.beacons.cache import resolve_beacon_ads
+from core.versioned import VersionedIndex
+
+VERSION_KEY = 'beacon_key_index_version'
+
+ScannedBeacon = namedtuple('ScannedBeacon', ['beacon_id', 'name', 'major', 'minor'])
+
+def pack(major, minor):
+    """Pack (major, minor) into one int key; the stored values fit in 32 bits each."""
+    return major << 32 | minor & 0xFFFFFFFF
+
+class BeaconKeyIndex:
+    """In-process map from packed (major, minor) to the beacons advertising it, rebuilt after a beacon changes."""
+
+    def __init__(self):
+        self._keys = VersionedIndex(VERSION_KEY)
+
+    def load(self):
+        rows = Beacon.objects.filter(major__isnull=False, minor__isnull=False).values_list(
+            'beacon_id', 'name', 'major', 'minor'
+        )
+        keys = defaultdict(list)
+        for row in rows:
+            beacon = ScannedBeacon(*row)
+            keys[pack(beacon.major, beacon.minor)].append(beacon)
+        return dict(keys)
+
+    def beacons(self):
+        return self._keys.get(self.load)
+
+    def lookup(self, major, minor):
+        return self.beacons().get(pack(major, minor), [])
+
+    def invalidate(self):
+        self._keys.invalidate()
+
+beacon_keys = BeaconKeyIndex()
+
+def resolve_scans(scans):
+    """Match scanned (major, minor, rssi) sightings to beacons and their active ads.
+
+    Repeated sightings of the same beacon keep the strongest signal. Matches are ordered
+    strongest first. Returns the matched beacons and the sightings nobody advertises.
+    """
+    strongest = {}
+    for scan in scans:
+        key = (scan['major'], scan['minor'])
+        rssi = scan.get('rssi')
+        if key not in strongest or (rssi is not None and (strongest[key] is None or rssi > strongest[key])):
+            strongest[key] = rssi
+
+    matched, unmatched = [], []
+    for (major, minor), rssi in strongest.items():
+        beacons = beacon_keys.lookup(major, minor)
+        if not beacons:
+            unmatched.append({'major': major, 'minor': minor, 'rssi': rssi})
+        for beacon in beacons:
+            matched.append({**beacon._asdict(), 'rssi': rssi, 'ads': resolve_beacon_ads(beacon.beacon_id) or []})
+
+    matched.sort(key=lambda beacon: beacon['rssi'] if beacon['rssi'] is not None else float('-inf'), reverse=True)
+    return matched, unmatched
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-17 03:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('beacons', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='beacon',
+            index=models.Index(fields=['major', 'minor'], name='beacon_major_minor_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.4 on 2026-10-17 03:09
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('beacons', '0002_major_minor_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='beacon',
+            name='last_seen_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='BeaconTelemetry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('signal_strength', models.FloatField(blank=True, null=True)),
+                ('battery_status', models.FloatField(blank=True, null=True)),
+                ('recorded_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('beacon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='telemetry', to='beacons.beacon')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['beacon', 'recorded_at'], name='telemetry_beacon_time_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.4 on 2026-10-17 03:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('beacons', '0003_beacon_telemetry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BeaconTelemetryBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.PositiveIntegerField(choices=[(300, '5 minutes'), (3600, '1 hour')])),
+                ('bucket_start', models.DateTimeField()),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('signal_count', models.PositiveIntegerField(default=0)),
+                ('signal_sum', models.FloatField(default=0)),
+                ('signal_min', models.FloatField(blank=True, null=True)),
+                ('signal_max', models.FloatField(blank=True, null=True)),
+                ('battery_count', models.PositiveIntegerField(default=0)),
+                ('battery_sum', models.FloatField(default=0)),
+                ('battery_min', models.FloatField(blank=True, null=True)),
+                ('battery_max', models.FloatField(blank=True, null=True)),
+                ('beacon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='telemetry_buckets', to='beacons.beacon')),
+            ],
+            options={
+                'unique_together': {('beacon', 'resolution', 'bucket_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+COLUMNS = ['name', 'location_name']
+
+
+def add_trigram_indexes(apps, schema_editor):
+    # pg_trgm is Postgres only; other databases keep the B-tree indexes.
+    # UPPER(column::text) is the expression Django emits for icontains.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "beacons_beacon_{column}_trgm" '
+            f'ON "beacons_beacon" USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+        )
+
+
+def remove_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for column in COLUMNS:
+            schema_editor.execute(f'DROP INDEX IF EXISTS "beacons_beacon_{column}_trgm"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('beacons', '0004_telemetry_buckets'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(add_trigram_indexes, remove_trigram_indexes),
+    ]
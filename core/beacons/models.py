@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils.timezone import now
 from uuid import uuid4
 
 class Beacon(models.Model):
@@ -9,6 +10,7 @@ class Beacon(models.Model):
     location_name = models.CharField(max_length=100, db_index=True)
     signal_strength = models.FloatField(null=True, blank=True) # updated by mobile app
     battery_status = models.FloatField(null=True, blank=True) # updated by mobile app
+    last_seen_at = models.DateTimeField(null=True, blank=True) # time of the reading behind the two values above
     start_date = models.DateTimeField(auto_now_add=True)
     class Status(models.TextChoices):
         ACTIVE = 'Active', 'Active'
@@ -17,6 +19,9 @@ class Beacon(models.Model):
     latitude = models.FloatField(null=True, blank=True, default=9.1450)
     longitude = models.FloatField(null=True, blank=True, default=38.7525)
 
+    class Meta:
+        indexes = [models.Index(fields=['major', 'minor'], name='beacon_major_minor_idx')]
+
     def __str__(self):
         return f"{self.name} {self.location_name} ({self.status})"
 
@@ -27,3 +32,41 @@ class Beacon(models.Model):
         if new_state in [self.Status.ACTIVE, self.Status.INACTIVE]:
             self.status = new_state
             self.save()
+
+class BeaconTelemetry(models.Model):
+    """Append-only history of signal and battery readings reported by phones."""
+    beacon = models.ForeignKey(Beacon, on_delete=models.CASCADE, related_name='telemetry')
+    signal_strength = models.FloatField(null=True, blank=True)
+    battery_status = models.FloatField(null=True, blank=True)
+    recorded_at = models.DateTimeField(default=now, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['beacon', 'recorded_at'], name='telemetry_beacon_time_idx')]
+
+    def __str__(self):
+        return f"{self.beacon_id} at {self.recorded_at}"
+
+class BeaconTelemetryBucket(models.Model):
+    """Min/sum/max of the readings of one beacon over a fixed interval, kept by the downsampling task."""
+    FIVE_MINUTES = 300
+    HOURLY = 3600
+    RESOLUTION_CHOICES = [(FIVE_MINUTES, '5 minutes'), (HOURLY, '1 hour')]
+
+    beacon = models.ForeignKey(Beacon, on_delete=models.CASCADE, related_name='telemetry_buckets')
+    resolution = models.PositiveIntegerField(choices=RESOLUTION_CHOICES)  # seconds
+    bucket_start = models.DateTimeField()
+    samples = models.PositiveIntegerField(default=0)
+    signal_count = models.PositiveIntegerField(default=0)
+    signal_sum = models.FloatField(default=0)
+    signal_min = models.FloatField(null=True, blank=True)
+    signal_max = models.FloatField(null=True, blank=True)
+    battery_count = models.PositiveIntegerField(default=0)
+    battery_sum = models.FloatField(default=0)
+    battery_min = models.FloatField(null=True, blank=True)
+    battery_max = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('beacon', 'resolution', 'bucket_start')
+
+    def __str__(self):
+        return f"{self.beacon_id} at {self.bucket_start} ({self.resolution}s)"
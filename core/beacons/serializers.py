@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.utils.timezone import now, timedelta
 from rest_framework import serializers
 from .models import Beacon
 
@@ -5,6 +7,7 @@ class BeaconSerializer(serializers.ModelSerializer):
     class Meta:
         model = Beacon
         fields = '__all__'
+        read_only_fields = ['last_seen_at']
 
     def validate_minor(self, value):
         if value is None or value < 0:
@@ -56,3 +59,105 @@ class BeaconStatusSerializer(serializers.ModelSerializer):
         return value
 
 
+
+class NearbyQuerySerializer(serializers.Serializer):
+    """Query parameters of the nearest-beacon search."""
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lon = serializers.FloatField(min_value=-180, max_value=180)
+    radius = serializers.FloatField(min_value=1, required=False)  # metres
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+    include_ads = serializers.BooleanField(default=False)
+
+    def validate_radius(self, value):
+        if value > settings.BEACON_NEARBY_MAX_RADIUS:
+            raise serializers.ValidationError(f"Radius cannot exceed {settings.BEACON_NEARBY_MAX_RADIUS} metres.")
+        return value
+
+class BoundingBoxQuerySerializer(serializers.Serializer):
+    """Query parameters of the bounding box search."""
+    min_lat = serializers.FloatField(min_value=-90, max_value=90)
+    min_lon = serializers.FloatField(min_value=-180, max_value=180)
+    max_lat = serializers.FloatField(min_value=-90, max_value=90)
+    max_lon = serializers.FloatField(min_value=-180, max_value=180)
+
+    def validate(self, data):
+        if data['min_lat'] > data['max_lat'] or data['min_lon'] > data['max_lon']:
+            raise serializers.ValidationError("min_lat/min_lon must not exceed max_lat/max_lon.")
+        return data
+
+class NearbyBeaconSerializer(serializers.Serializer):
+    beacon_id = serializers.UUIDField()
+    name = serializers.CharField()
+    latitude = serializers.FloatField()
+    longitude = serializers.FloatField()
+    distance = serializers.FloatField(help_text="Metres from the requested point")
+    ads = serializers.ListField(child=serializers.DictField(), required=False,
+                                help_text="Active ads of the beacon, only with include_ads=true")
+
+class ScanSerializer(serializers.Serializer):
+    """One iBeacon sighting reported by the phone."""
+    major = serializers.IntegerField(min_value=0, max_value=65535)
+    minor = serializers.IntegerField(min_value=0, max_value=65535)
+    rssi = serializers.IntegerField(min_value=-128, max_value=20, required=False)  # dBm
+
+class ResolvedBeaconSerializer(serializers.Serializer):
+    beacon_id = serializers.UUIDField()
+    name = serializers.CharField()
+    major = serializers.IntegerField()
+    minor = serializers.IntegerField()
+    rssi = serializers.IntegerField(allow_null=True)
+    ads = serializers.ListField(child=serializers.DictField())
+
+class ScanResolutionSerializer(serializers.Serializer):
+    beacons = ResolvedBeaconSerializer(many=True)
+    unmatched = ScanSerializer(many=True)
+
+class TelemetryReadingSerializer(serializers.Serializer):
+    """One signal/battery reading of a beacon taken by a phone."""
+    beacon = serializers.UUIDField()
+    signal_strength = serializers.FloatField(required=False, allow_null=True, min_value=-100, max_value=0)
+    battery_status = serializers.FloatField(required=False, allow_null=True, min_value=0, max_value=100)
+    recorded_at = serializers.DateTimeField(required=False)  # defaults to the time of the request
+
+class TelemetryBatchResultSerializer(serializers.Serializer):
+    recorded = serializers.IntegerField()
+    unknown_beacon_ids = serializers.ListField(child=serializers.UUIDField())
+
+class HealthQuerySerializer(serializers.Serializer):
+    """Query parameters of the beacon health series; the window defaults to the last 7 days."""
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    resolution = serializers.ChoiceField(choices=['auto', '5m', '1h'], default='auto')
+
+    def validate(self, data):
+        data.setdefault('end', now())
+        data.setdefault('start', data['end'] - timedelta(days=7))
+        if data['start'] >= data['end']:
+            raise serializers.ValidationError("start must be before end.")
+        if data['end'] - data['start'] > timedelta(days=settings.TELEMETRY_QUERY_MAX_DAYS):
+            raise serializers.ValidationError(f"The window cannot exceed {settings.TELEMETRY_QUERY_MAX_DAYS} days.")
+        return data
+
+class MetricSummarySerializer(serializers.Serializer):
+    min = serializers.FloatField(allow_null=True)
+    avg = serializers.FloatField(allow_null=True)
+    max = serializers.FloatField(allow_null=True)
+
+class HealthPointSerializer(serializers.Serializer):
+    time = serializers.DateTimeField(help_text="Start of the bucket")
+    samples = serializers.IntegerField()
+    signal_strength = MetricSummarySerializer()
+    battery_status = MetricSummarySerializer()
+
+class HealthTrendSerializer(serializers.Serializer):
+    battery_change_per_day = serializers.FloatField(allow_null=True, help_text="Percent per day, negative while draining")
+    signal_change_per_day = serializers.FloatField(allow_null=True, help_text="dBm per day")
+    battery_days_left = serializers.FloatField(allow_null=True, help_text="Days until empty at the current drain rate")
+
+class BeaconHealthSerializer(serializers.Serializer):
+    beacon_id = serializers.UUIDField()
+    resolution = serializers.IntegerField(help_text="Bucket length in seconds")
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+    points = HealthPointSerializer(many=True)
+    trend = HealthTrendSerializer()
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from core.beacons.models import Beacon
+from core.beacons.cache import invalidate_beacon_ads
+from core.beacons.spatial import beacon_index
+from core.beacons.lookup import beacon_keys
+from core.advertisements.models import Advertisement
+from core.assignments.models import AdvertisementAssignment
+
+@receiver(post_save, sender=Advertisement)
+@receiver(pre_delete, sender=Advertisement)
+def refresh_advertisement_beacons(sender, instance, **kwargs):
+    beacon_ids = AdvertisementAssignment.objects.filter(advertisement=instance).values_list('beacon_id', flat=True)
+    invalidate_beacon_ads(*beacon_ids)
+
+@receiver(post_save, sender=Beacon)
+@receiver(post_delete, sender=Beacon)
+def refresh_beacon(sender, instance, **kwargs):
+    invalidate_beacon_ads(instance.beacon_id)
+    beacon_index.invalidate()
+    beacon_keys.invalidate()
@@ -0,0 +1,101 @@
+import math
+from collections import defaultdict, namedtuple
+from django.conf import settings
+from core.beacons.models import Beacon
+from core.versioned import VersionedIndex
+
+VERSION_KEY = 'beacon_spatial_index_version'
+EARTH_RADIUS = 6371008.8  # metres
+METRES_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+
+Point = namedtuple('Point', ['beacon_id', 'name', 'latitude', 'longitude'])
+
+def distance(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres (haversine)."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi, dlambda = phi2 - phi1, math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+class BeaconGrid:
+    """Beacons bucketed into square cells of `cell` degrees, keyed by (row, column).
+
+    A radius or box query only visits the cells overlapping its bounding box, so its
+    cost depends on the beacons nearby rather than on the total number of beacons.
+    """
+
+    def __init__(self, points, cell):
+        self.cell = cell
+        self.points = list(points)
+        self.cells = defaultdict(list)
+        for point in self.points:
+            self.cells[self.key(point.latitude, point.longitude)].append(point)
+
+    def key(self, latitude, longitude):
+        return math.floor(latitude / self.cell), math.floor(longitude / self.cell)
+
+    def in_box(self, min_lat, min_lon, max_lat, max_lon):
+        """Points inside the box (inclusive); the box may not cross the antimeridian."""
+        (row_lo, col_lo), (row_hi, col_hi) = self.key(min_lat, min_lon), self.key(max_lat, max_lon)
+        if (row_hi - row_lo + 1) * (col_hi - col_lo + 1) > len(self.cells):
+            candidates = self.points  # a box this large is cheaper to answer with a full scan
+        else:
+            candidates = (
+                point
+                for row in range(row_lo, row_hi + 1) for col in range(col_lo, col_hi + 1)
+                for point in self.cells.get((row, col), ())
+            )
+        return [
+            point for point in candidates
+            if min_lat <= point.latitude <= max_lat and min_lon <= point.longitude <= max_lon
+        ]
+
+    def within(self, latitude, longitude, radius):
+        """(distance, point) pairs within `radius` metres, nearest first."""
+        dlat = radius / METRES_PER_DEGREE
+        dlon = dlat / max(math.cos(math.radians(latitude)), 1e-6)
+        box = self.in_box(latitude - dlat, longitude - dlon, latitude + dlat, longitude + dlon)
+        found = [(distance(latitude, longitude, p.latitude, p.longitude), p) for p in box]
+        return sorted((pair for pair in found if pair[0] <= radius), key=lambda pair: pair[0])
+
+    def nearest(self, latitude, longitude, limit, max_radius):
+        """Up to `limit` nearest (distance, point) pairs no further than `max_radius` metres.
+
+        The search radius starts at one cell and doubles until enough beacons are found.
+        """
+        radius = self.cell * METRES_PER_DEGREE
+        while True:
+            radius = min(radius, max_radius)
+            found = self.within(latitude, longitude, radius)
+            if len(found) >= limit or radius >= max_radius:
+                return found[:limit]
+            radius *= 2
+
+class BeaconSpatialIndex:
+    """In-process BeaconGrid over all beacons with coordinates, rebuilt after a beacon changes."""
+
+    def __init__(self):
+        self._grid = VersionedIndex(VERSION_KEY)
+
+    def load(self):
+        rows = Beacon.objects.filter(latitude__isnull=False, longitude__isnull=False).values_list(
+            'beacon_id', 'name', 'latitude', 'longitude'
+        )
+        return BeaconGrid((Point(*row) for row in rows), settings.BEACON_INDEX_CELL_METRES / METRES_PER_DEGREE)
+
+    def grid(self):
+        return self._grid.get(self.load)
+
+    def within(self, latitude, longitude, radius):
+        return self.grid().within(latitude, longitude, radius)
+
+    def nearest(self, latitude, longitude, limit, max_radius):
+        return self.grid().nearest(latitude, longitude, limit, max_radius)
+
+    def in_box(self, min_lat, min_lon, max_lat, max_lon):
+        return self.grid().in_box(min_lat, min_lon, max_lat, max_lon)
+
+    def invalidate(self):
+        self._grid.invalidate()
+
+beacon_index = BeaconSpatialIndex()
@@ -0,0 +1,15 @@
+from celery import shared_task
+from .telemetry import flush_telemetry
+from .timeseries import refresh_telemetry_buckets
+
+@shared_task
+def flush_beacon_telemetry():
+    """Write the latest buffered telemetry readings to their beacons in one bulk update."""
+    updated = flush_telemetry()
+    return f"Updated telemetry of {updated} beacons."
+
+@shared_task
+def downsample_beacon_telemetry():
+    """Fold new telemetry readings into the 5-minute and hourly buckets."""
+    downsampled, pruned = refresh_telemetry_buckets()
+    return f"Downsampled {downsampled} readings, pruned {pruned} buckets."
@@ -0,0 +1,174 @@
+import json
+import threading
+import time
+from datetime import datetime
+from uuid import UUID
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+from django_redis import get_redis_connection
+from core.flushing import FlushTimer
+from .models import Beacon, BeaconTelemetry
+from .timeseries import add_late_readings
+
+REDIS_KEY = 'beacon_telemetry_latest'
+FIELDS = ('signal_strength', 'battery_status')
+
+# HSET each beacon's reading unless the stored one is newer; values start with a
+# fixed-width epoch so they compare as strings
+MERGE_SCRIPT = """
+for i = 1, #ARGV, 2 do
+    local current = redis.call('HGET', KEYS[1], ARGV[i])
+    if not current or current < ARGV[i + 1] then
+        redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+    end
+end
+return redis.call('HLEN', KEYS[1])
+"""
+
+def newest(readings):
+    """Keep the most recent reading per beacon id."""
+    latest = {}
+    for reading in readings:
+        current = latest.get(reading['beacon'])
+        if current is None or reading['recorded_at'] >= current['recorded_at']:
+            latest[reading['beacon']] = reading
+    return latest
+
+class MemoryTelemetryBuffer:
+    """Per-process latest reading per beacon, flushed inline by the request that fills it up
+    and by flush_timer once it is BEACON_TELEMETRY_FLUSH_INTERVAL old or the process exits.
+    """
+    shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latest = {}
+        self._since = None
+
+    def merge(self, readings):
+        with self._lock:
+            if not self._latest:
+                self._since = time.monotonic()
+            self._latest = newest([*self._latest.values(), *readings])
+            return len(self._latest)
+
+    def age(self):
+        since = self._since
+        return time.monotonic() - since if since is not None else 0
+
+    def drain(self):
+        with self._lock:
+            latest, self._latest, self._since = self._latest, {}, None
+            return list(latest.values())
+
+class RedisTelemetryBuffer:
+    """Latest reading per beacon in a Redis hash shared by all workers, drained by the Celery task."""
+    shared = True
+
+    def connection(self):
+        return get_redis_connection('default')
+
+    def merge(self, readings):
+        args = []
+        for reading in readings:
+            payload = {**reading, 'beacon': str(reading['beacon']), 'recorded_at': reading['recorded_at'].isoformat()}
+            args += [str(reading['beacon']), f"{reading['recorded_at'].timestamp():020.6f}|{json.dumps(payload)}"]
+        return self.connection().eval(MERGE_SCRIPT, 1, REDIS_KEY, *args)
+
+    def age(self):
+        # the periodic flush task bounds how long readings wait
+        return 0
+
+    def drain(self):
+        pipe = self.connection().pipeline()
+        pipe.hgetall(REDIS_KEY)
+        pipe.delete(REDIS_KEY)
+        entries, _ = pipe.execute()
+        readings = []
+        for value in entries.values():
+            reading = json.loads(value.decode().split('|', 1)[1])
+            reading['beacon'] = UUID(reading['beacon'])
+            reading['recorded_at'] = datetime.fromisoformat(reading['recorded_at'])
+            readings.append(reading)
+        return readings
+
+BUFFERS = {'memory': MemoryTelemetryBuffer, 'redis': RedisTelemetryBuffer}
+_buffers = {}
+
+def get_telemetry_buffer():
+    backend = settings.BEACON_TELEMETRY_BUFFER_BACKEND
+    if backend not in _buffers:
+        _buffers[backend] = BUFFERS[backend]()
+    return _buffers[backend]
+
+def ingest_telemetry(readings):
+    """Store a batch of readings and queue the newest one per beacon for the Beacon row.
+
+    Every reading is appended to BeaconTelemetry with one bulk insert; readings already
+    behind the downsampling checkpoint are folded into their buckets in the same
+    transaction. Readings of unknown beacons are skipped. Returns the number stored and the sorted unknown beacon ids.
+    """
+    received_at = now()
+    readings = [{**reading, 'recorded_at': reading.get('recorded_at') or received_at} for reading in readings]
+    beacon_ids = {reading['beacon'] for reading in readings}
+    known = set(Beacon.objects.filter(beacon_id__in=beacon_ids).values_list('beacon_id', flat=True))
+    readings = [reading for reading in readings if reading['beacon'] in known]
+
+    with transaction.atomic():
+        telemetry = BeaconTelemetry.objects.bulk_create([
+            BeaconTelemetry(beacon_id=reading['beacon'], recorded_at=reading['recorded_at'],
+                            **{field: reading.get(field) for field in FIELDS})
+            for reading in readings
+        ])
+        add_late_readings(telemetry)
+
+    buffer = get_telemetry_buffer()
+    size = buffer.merge(list(newest(readings).values())) if readings else 0
+    if size and not buffer.shared:
+        flush_timer.start()
+    if size >= settings.BEACON_TELEMETRY_FLUSH_SIZE or buffer.age() >= settings.BEACON_TELEMETRY_FLUSH_INTERVAL:
+        if buffer.shared:
+            from .tasks import flush_beacon_telemetry
+            flush_beacon_telemetry.delay()
+        else:
+            flush_telemetry()
+    return len(readings), sorted(beacon_ids - known, key=str)
+
+def flush_telemetry():
+    """Write the buffered latest readings to their Beacon rows with one bulk_update.
+
+    A reading older than the beacon's last_seen_at is dropped, so late batches never
+    overwrite fresher values. Returns the number of beacons updated.
+    """
+    buffer = get_telemetry_buffer()
+    readings = buffer.drain()
+    if not readings:
+        return 0
+    try:
+        return write_telemetry(readings)
+    except Exception:
+        buffer.merge(readings)
+        raise
+
+def write_telemetry(readings):
+    with transaction.atomic():
+        beacons = (
+            Beacon.objects.select_for_update().only('beacon_id', 'last_seen_at', *FIELDS)
+            .order_by('pk')  # stable lock order
+            .in_bulk([reading['beacon'] for reading in readings])
+        )
+        changed = []
+        for reading in readings:
+            beacon = beacons.get(reading['beacon'])
+            if beacon is None or (beacon.last_seen_at and beacon.last_seen_at > reading['recorded_at']):
+                continue
+            for field in FIELDS:
+                if reading.get(field) is not None:
+                    setattr(beacon, field, reading[field])
+            beacon.last_seen_at = reading['recorded_at']
+            changed.append(beacon)
+        Beacon.objects.bulk_update(changed, [*FIELDS, 'last_seen_at'])
+    return len(changed)
+
+flush_timer = FlushTimer(flush_telemetry, lambda: settings.BEACON_TELEMETRY_FLUSH_INTERVAL)
@@ -1,14 +1,25 @@
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 from rest_framework_simplejwt.tokens import AccessToken
-from core.beacons.models import Beacon
-from core.advertisements.models import Advertisement
+from core.beacons.models import Beacon, BeaconTelemetry, BeaconTelemetryBucket
+from core.advertisements.models import Advertisement, AdView
+from core.advertisements.buffer import write_ad_views
+from core.assignments.models import AdvertisementAssignment
+from core.users.models import UserPreferences
+from core.dashboards.models import AdDailyStats
 from core.logs.models import AdvertisementLog
 from core.beacons.serializers import BeaconSerializer
 from uuid import uuid4
 from datetime import date
 from django.utils.timezone import now, timedelta
 from django.contrib.auth.models import User
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from core.beacons.telemetry import flush_telemetry, flush_timer, ingest_telemetry
+from unittest import mock
+from core.dashboards.models import RollupCheckpoint
+from core.beacons.timeseries import add_late_readings, downsample, downsample_step, floor
 from django.urls import reverse
 
 class BeaconsModelTest(APITestCase):
@@ -185,3 +196,367 @@ class BeaconView(BaseAPITestCase):
 
         # Assert: Expecting 400 Bad Request
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, "required field missed")
+
+class BeaconDataViewTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="scanner", email="scanner@example.com", password="pass")
+        self.client.force_authenticate(self.user)
+        self.beacon = Beacon.objects.create(name="Beacon 1", location_name="Bole")
+        self.advertisement = Advertisement.objects.create(title="Ybs Soap", content="30% discount", created_by=self.user)
+        AdvertisementAssignment.objects.create(
+            beacon=self.beacon, advertisement=self.advertisement, end_date=now() + timedelta(days=10)
+        )
+        self.url = reverse('beacon-datav-iew', args=[self.beacon.pk])
+
+    def test_returns_active_ads(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([ad['title'] for ad in response.data['ads']], ["Ybs Soap"])
+
+    def test_unknown_beacon(self):
+        response = self.client.get(reverse('beacon-datav-iew', args=[uuid4()]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cached_scan_skips_database(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data['ads']), 1)
+
+    def test_changes_invalidate_cache(self):
+        self.client.get(self.url)
+        self.advertisement.is_active = False
+        self.advertisement.save()
+        self.assertEqual(self.client.get(self.url).data['ads'], [])
+
+        other = Advertisement.objects.create(title="Coffee", content="Buy one get one", created_by=self.user)
+        AdvertisementAssignment.objects.create(beacon=self.beacon, advertisement=other, end_date=now() + timedelta(days=1))
+        self.assertEqual([ad['title'] for ad in self.client.get(self.url).data['ads']], ["Coffee"])
+
+        self.beacon.delete()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_400_BAD_REQUEST)
+
+class FrequencyCapTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="shopper", email="shopper@example.com", password="pass")
+        self.client.force_authenticate(self.user)
+        self.preferences = UserPreferences.objects.create(user=self.user, ad_frequency=2)
+        self.beacon = Beacon.objects.create(name="Beacon 1", location_name="Bole", major=1, minor=12)
+        self.ads = []
+        for title in ["Soap", "Coffee", "Bread"]:
+            ad = Advertisement.objects.create(title=title, content="Discount", created_by=self.user)
+            AdvertisementAssignment.objects.create(beacon=self.beacon, advertisement=ad, end_date=now() + timedelta(days=10))
+            self.ads.append(ad)
+        self.url = reverse('beacon-datav-iew', args=[self.beacon.pk])
+
+    def titles(self, response):
+        return sorted(ad['title'] for ad in response.data['ads'])
+
+    def test_caps_distinct_ads_per_day_without_reading_views(self):
+        first = self.titles(self.client.get(self.url))
+        self.assertEqual(len(first), 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles(self.client.get(self.url)), first)
+
+        response = self.client.post(reverse('beacon-resolve'), [{"major": 1, "minor": 12}], format="json")
+        self.assertEqual(sorted(ad['title'] for ad in response.data['beacons'][0]['ads']), first)
+
+    def test_nearby_prefetch_does_not_use_up_the_cap(self):
+        self.beacon.latitude, self.beacon.longitude = 9.0, 38.75
+        self.beacon.save()
+        other = Beacon.objects.create(name="Beacon 2", location_name="Bole", latitude=9.0001, longitude=38.75)
+        ad = Advertisement.objects.create(title="Tea", content="Discount", created_by=self.user)
+        AdvertisementAssignment.objects.create(beacon=other, advertisement=ad, end_date=now() + timedelta(days=10))
+
+        response = self.client.get(reverse('beacon-nearby'), {'lat': 9.0, 'lon': 38.75, 'radius': 100, 'include_ads': 'true'})
+        self.assertEqual([len(beacon['ads']) for beacon in response.data], [2, 1])
+        self.assertEqual(len(self.titles(self.client.get(self.url))), 2)
+
+    def test_views_of_today_count_when_counter_is_missing(self):
+        AdView.objects.create(user=self.user, ad=self.ads[2], viewed=True)
+        self.assertIn("Bread", self.titles(self.client.get(self.url)))
+        self.assertEqual(len(self.client.get(self.url).data['ads']), 2)
+
+    def test_repeat_view_today_of_an_older_ad_counts(self):
+        view = AdView.objects.create(user=self.user, ad=self.ads[2], viewed=True)
+        AdView.objects.filter(pk=view.pk).update(viewed_at=now() - timedelta(days=3), last_viewed_at=now() - timedelta(days=3))
+        write_ad_views([(self.user.pk, self.ads[2].pk)])  # the buffered upsert of today's view
+        self.assertIn("Bread", self.titles(self.client.get(self.url)))
+
+    def test_preference_changes_apply_immediately(self):
+        self.client.get(self.url)
+        self.preferences.ad_frequency = 5
+        self.preferences.save()
+        self.assertEqual(len(self.client.get(self.url).data['ads']), 3)
+
+        self.preferences.delete()
+        other = get_user_model().objects.create_user(username="other", email="other@example.com", password="pass")
+        UserPreferences.objects.create(user=other, ad_frequency=0)
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(self.url).data['ads'], [])
+
+class AdRankingTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="foodie", email="foodie@example.com", password="pass")
+        self.client.force_authenticate(self.user)
+        self.beacon = Beacon.objects.create(name="Beacon 1", location_name="Bole")
+        self.ads = {}
+        for title, categories, views in [("Soap", ["hygiene"], 1), ("Coffee", ["food", "drinks"], 0),
+                                         ("Bread", ["Food"], 0), ("Tea", [], 9)]:
+            ad = Advertisement.objects.create(title=title, content="Discount", created_by=self.user, categories=categories)
+            AdvertisementAssignment.objects.create(beacon=self.beacon, advertisement=ad, end_date=now() + timedelta(days=10))
+            AdDailyStats.objects.create(advertisement=ad, date=date.today(), views=views)
+            self.ads[title] = ad
+        self.url = reverse('beacon-datav-iew', args=[self.beacon.pk])
+
+    def titles(self):
+        return [ad['title'] for ad in self.client.get(self.url).data['ads']]
+
+    def test_orders_by_preference_match_then_engagement(self):
+        UserPreferences.objects.create(user=self.user, ad_frequency=10, preferred_categories=["food", "Drinks"])
+        self.assertEqual(self.titles(), ["Coffee", "Bread", "Tea", "Soap"])
+
+    def test_without_preferences_orders_by_engagement(self):
+        self.assertEqual(self.titles()[:2], ["Tea", "Soap"])
+
+    def test_category_and_preference_changes_rerank(self):
+        preferences = UserPreferences.objects.create(user=self.user, ad_frequency=10, preferred_categories=["hygiene"])
+        self.assertEqual(self.titles()[0], "Soap")
+
+        self.ads["Tea"].categories = ["hygiene", "drinks"]
+        self.ads["Tea"].save()
+        preferences.preferred_categories = ["hygiene", "drinks"]
+        preferences.save()
+        self.assertEqual(self.titles()[:3], ["Tea", "Soap", "Coffee"])
+
+class BeaconNearbyTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="scanner", email="scanner@example.com", password="pass")
+        self.client.force_authenticate(self.user)
+        # roughly 100 m, 1 km and 20 km north of the origin
+        self.near = Beacon.objects.create(name="Near", location_name="Bole", latitude=9.0009, longitude=38.75)
+        self.mid = Beacon.objects.create(name="Mid", location_name="Bole", latitude=9.009, longitude=38.75)
+        self.far = Beacon.objects.create(name="Far", location_name="Adama", latitude=9.18, longitude=38.75)
+        ad = Advertisement.objects.create(title="Ybs Soap", content="30% discount", created_by=self.user)
+        AdvertisementAssignment.objects.create(beacon=self.near, advertisement=ad, end_date=now() + timedelta(days=10))
+
+    def test_radius_search_with_ads(self):
+        response = self.client.get(reverse('beacon-nearby'), {'lat': 9.0, 'lon': 38.75, 'radius': 2000, 'include_ads': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([beacon['name'] for beacon in response.data], ["Near", "Mid"])
+        self.assertAlmostEqual(response.data[0]['distance'], 100, delta=1)
+        self.assertEqual([ad['title'] for ad in response.data[0]['ads']], ["Ybs Soap"])
+
+    def test_nearest_widens_until_limit(self):
+        response = self.client.get(reverse('beacon-nearby'), {'lat': 9.0, 'lon': 38.75, 'limit': 3})
+        self.assertEqual([beacon['name'] for beacon in response.data], ["Near", "Mid"])  # Far is beyond the maximum
+
+        self.far.latitude = 9.02
+        self.far.save()
+        response = self.client.get(reverse('beacon-nearby'), {'lat': 9.0, 'lon': 38.75, 'limit': 3})
+        self.assertEqual([beacon['name'] for beacon in response.data], ["Near", "Mid", "Far"])
+
+    def test_bounding_box(self):
+        response = self.client.get(reverse('beacon-within'),
+                                   {'min_lat': 9.005, 'min_lon': 38.7, 'max_lat': 9.2, 'max_lon': 38.8})
+        self.assertEqual({beacon['name'] for beacon in response.data}, {"Mid", "Far"})
+
+    def test_invalid_query(self):
+        response = self.client.get(reverse('beacon-nearby'), {'lat': 95, 'lon': 38.75})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('beacon-nearby'), {'lat': 9, 'lon': 38.75, 'radius': 10 ** 6})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class BeaconResolveTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="scanner", email="scanner@example.com", password="pass")
+        self.client.force_authenticate(self.user)
+        self.url = reverse('beacon-resolve')
+        self.door = Beacon.objects.create(name="Door", location_name="Bole", major=1, minor=12)
+        self.till = Beacon.objects.create(name="Till", location_name="Bole", major=1, minor=14)
+        ad = Advertisement.objects.create(title="Ybs Soap", content="30% discount", created_by=self.user)
+        AdvertisementAssignment.objects.create(beacon=self.till, advertisement=ad, end_date=now() + timedelta(days=10))
+
+    def test_resolves_scan_batch_strongest_first(self):
+        scans = [
+            {"major": 1, "minor": 12, "rssi": -80},
+            {"major": 1, "minor": 14, "rssi": -70},
+            {"major": 1, "minor": 12, "rssi": -60},
+            {"major": 9, "minor": 9, "rssi": -50},
+        ]
+        response = self.client.post(self.url, scans, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(b['name'], b['rssi']) for b in response.data['beacons']], [("Door", -60), ("Till", -70)])
+        self.assertEqual([ad['title'] for ad in response.data['beacons'][1]['ads']], ["Ybs Soap"])
+        self.assertEqual(response.data['unmatched'], [{"major": 9, "minor": 9, "rssi": -50}])
+
+    def test_index_follows_beacon_changes(self):
+        self.door.minor = 99
+        self.door.save()
+        response = self.client.post(self.url, [{"major": 1, "minor": 99}], format="json")
+        self.assertEqual([b['name'] for b in response.data['beacons']], ["Door"])
+
+    def test_rejects_invalid_scans(self):
+        response = self.client.post(self.url, [{"major": 70000, "minor": 1}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+@override_settings(BEACON_TELEMETRY_BUFFER_BACKEND='memory', BEACON_TELEMETRY_FLUSH_SIZE=1000,
+                   BEACON_TELEMETRY_FLUSH_INTERVAL=3600)
+class BeaconTelemetryTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        flush_telemetry()
+        flush_timer.cancel()
+        self.addCleanup(flush_timer.cancel)
+        self.user = get_user_model().objects.create_user(username="gateway", email="gateway@example.com", password="pass")
+        self.client.force_authenticate(self.user)
+        self.url = reverse('beacon-telemetry')
+        self.door = Beacon.objects.create(name="Door", location_name="Bole", signal_strength=-80, battery_status=90)
+        self.till = Beacon.objects.create(name="Till", location_name="Bole")
+
+    def reading(self, beacon, minutes_ago, **values):
+        return {"beacon": str(beacon.beacon_id), "recorded_at": (now() - timedelta(minutes=minutes_ago)).isoformat(), **values}
+
+    def test_keeps_history_and_coalesces_latest_reading(self):
+        unknown = uuid4()
+        response = self.client.post(self.url, [
+            self.reading(self.door, 3, signal_strength=-70, battery_status=88),
+            self.reading(self.door, 1, signal_strength=-60, battery_status=87),
+            self.reading(self.door, 2, signal_strength=-65, battery_status=86),
+            self.reading(self.till, 5, battery_status=50),
+            {"beacon": str(unknown), "signal_strength": -50},
+        ], format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {"recorded": 4, "unknown_beacon_ids": [unknown]})
+        self.assertEqual(BeaconTelemetry.objects.filter(beacon=self.door).count(), 3)
+        self.door.refresh_from_db()
+        self.assertEqual(self.door.signal_strength, -80)  # still buffered
+
+        self.assertEqual(flush_telemetry(), 2)
+        self.door.refresh_from_db()
+        self.till.refresh_from_db()
+        self.assertEqual((self.door.signal_strength, self.door.battery_status), (-60, 87))
+        self.assertEqual(self.till.battery_status, 50)
+        self.assertIsNotNone(self.door.last_seen_at)
+
+    def test_late_reading_does_not_overwrite_newer_one(self):
+        self.client.post(self.url, [self.reading(self.door, 1, signal_strength=-60)], format="json")
+        flush_telemetry()
+        self.client.post(self.url, [self.reading(self.door, 10, signal_strength=-90)], format="json")
+        self.assertEqual(flush_telemetry(), 0)
+        self.door.refresh_from_db()
+        self.assertEqual(self.door.signal_strength, -60)
+        self.assertEqual(BeaconTelemetry.objects.filter(beacon=self.door).count(), 2)
+
+    @override_settings(BEACON_TELEMETRY_FLUSH_SIZE=2)
+    def test_flushes_once_enough_beacons_are_pending(self):
+        self.client.post(self.url, [self.reading(self.door, 1, battery_status=40)], format="json")
+        self.door.refresh_from_db()
+        self.assertEqual(self.door.battery_status, 90)
+        self.client.post(self.url, [self.reading(self.till, 1, battery_status=30)], format="json")
+        self.door.refresh_from_db()
+        self.assertEqual(self.door.battery_status, 40)
+
+    def test_timer_writes_readings_without_further_ingests(self):
+        with mock.patch('core.flushing.threading.Timer') as timer:
+            self.client.post(self.url, [self.reading(self.door, 1, battery_status=40)], format="json")
+        (interval, fire), _ = timer.call_args
+        self.assertEqual(interval, 3600)
+
+        with mock.patch('core.flushing.connections'):
+            fire()
+        self.door.refresh_from_db()
+        self.assertEqual(self.door.battery_status, 40)
+
+    def test_rejects_invalid_readings(self):
+        response = self.client.post(self.url, [self.reading(self.door, 1, battery_status=140)], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(BeaconTelemetry.objects.exists())
+
+@override_settings(BEACON_TELEMETRY_BUFFER_BACKEND='memory', BEACON_TELEMETRY_FLUSH_SIZE=1000,
+                   BEACON_TELEMETRY_FLUSH_INTERVAL=3600)
+class BeaconHealthTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        flush_telemetry()
+        self.addCleanup(flush_timer.cancel)
+        self.user = get_user_model().objects.create_user(username="ops", email="ops@example.com", password="pass")
+        self.client.force_authenticate(self.user)
+        self.beacon = Beacon.objects.create(name="Door", location_name="Bole")
+        self.url = reverse('beacon-health', args=[self.beacon.beacon_id])
+        # three days of hourly readings: battery drains 1% per hour, two readings per 5 minutes
+        self.origin = floor(now() - timedelta(days=4), 3600)
+        BeaconTelemetry.objects.bulk_create([
+            BeaconTelemetry(beacon=self.beacon, recorded_at=self.origin + timedelta(hours=hour, minutes=minute),
+                            battery_status=100 - hour, signal_strength=-60 - minute)
+            for hour in range(72) for minute in (1, 2)
+        ])
+
+    def test_downsamples_into_five_minute_and_hourly_buckets(self):
+        self.assertEqual(downsample(now()), 144)
+        hourly = BeaconTelemetryBucket.objects.get(
+            beacon=self.beacon, resolution=BeaconTelemetryBucket.HOURLY, bucket_start=self.origin
+        )
+        self.assertEqual((hourly.samples, hourly.signal_min, hourly.signal_max, hourly.signal_sum), (2, -62, -61, -123))
+        self.assertEqual(BeaconTelemetryBucket.objects.filter(resolution=BeaconTelemetryBucket.FIVE_MINUTES).count(), 72)
+        self.assertEqual(downsample(now()), 0)
+
+    def test_first_backfill_advances_a_day_at_a_time(self):
+        cutoff = now()
+        self.assertEqual(downsample_step(cutoff), 48)
+        checkpoint = RollupCheckpoint.objects.get(source='beacon_telemetry').processed_until
+        self.assertLess(checkpoint, self.origin + timedelta(days=1, minutes=1))
+        self.assertEqual(downsample(cutoff), 96)
+        self.assertIsNone(downsample_step(cutoff))
+
+    def test_empty_stretches_are_skipped_in_one_step(self):
+        BeaconTelemetry.objects.all().delete()
+        with self.assertNumQueries(12):  # one downsample_step that catches up, one that finds nothing to do
+            self.assertEqual(downsample(now()), 0)
+
+    def test_fresh_readings_skip_the_checkpoint_lock(self):
+        downsample(now() - timedelta(hours=1))
+        with self.assertNumQueries(0):
+            add_late_readings([BeaconTelemetry(beacon=self.beacon, recorded_at=now(), battery_status=10)])
+
+    def test_long_window_reads_hourly_buckets_with_trend(self):
+        downsample(now())
+        response = self.client.get(self.url, {"start": self.origin.isoformat(), "end": now().isoformat()})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['resolution'], 3600)
+        self.assertEqual(len(response.data['points']), 72)
+        first = response.data['points'][0]
+        self.assertEqual(first['signal_strength'], {"min": -62, "avg": -61.5, "max": -61})
+        self.assertEqual(response.data['trend']['battery_change_per_day'], -24)
+        self.assertEqual(response.data['trend']['battery_days_left'], 1.2)
+
+    def test_readings_newer_than_checkpoint_and_late_readings_are_counted_once(self):
+        downsample(self.origin + timedelta(hours=1))
+        # late reading behind the checkpoint, folded at ingest time
+        ingest_telemetry([{"beacon": self.beacon.beacon_id, "battery_status": 50,
+                           "recorded_at": self.origin + timedelta(minutes=3)}])
+
+        response = self.client.get(self.url, {"start": self.origin.isoformat(),
+                                              "end": (self.origin + timedelta(hours=2)).isoformat(), "resolution": "1h"})
+        self.assertEqual([p['samples'] for p in response.data['points']], [3, 2])
+        self.assertEqual(response.data['points'][0]['battery_status']['min'], 50)
+
+        downsample(now())
+        hourly = BeaconTelemetryBucket.objects.get(
+            beacon=self.beacon, resolution=BeaconTelemetryBucket.HOURLY, bucket_start=self.origin
+        )
+        self.assertEqual(hourly.samples, 3)
+
+    def test_rejects_invalid_window_and_unknown_beacon(self):
+        response = self.client.get(self.url, {"start": now().isoformat(), "end": self.origin.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('beacon-health', args=[uuid4()]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
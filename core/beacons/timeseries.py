@@ -0,0 +1,254 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncMinute
+from django.utils.timezone import now
+from core.dashboards.models import RollupCheckpoint
+from .models import BeaconTelemetry, BeaconTelemetryBucket
+
+CHECKPOINT = 'beacon_telemetry'
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+# summary field prefix -> BeaconTelemetry column
+METRICS = {'signal': 'signal_strength', 'battery': 'battery_status'}
+RESOLUTIONS = {'5m': BeaconTelemetryBucket.FIVE_MINUTES, '1h': BeaconTelemetryBucket.HOURLY}
+# readings folded per downsampling transaction
+DOWNSAMPLE_STEP = timedelta(days=1)
+SUMMARY_FIELDS = ['samples'] + [f'{prefix}_{part}' for prefix in METRICS for part in ('count', 'sum', 'min', 'max')]
+
+def floor(moment, seconds):
+    return EPOCH + timedelta(seconds=(moment - EPOCH) // timedelta(seconds=seconds) * seconds)
+
+def merge(a, b):
+    """Combine two summaries (dicts of SUMMARY_FIELDS)."""
+    merged = {'samples': a['samples'] + b['samples']}
+    for prefix in METRICS:
+        merged[f'{prefix}_count'] = a[f'{prefix}_count'] + b[f'{prefix}_count']
+        merged[f'{prefix}_sum'] = a[f'{prefix}_sum'] + b[f'{prefix}_sum']
+        lows = [v for v in (a[f'{prefix}_min'], b[f'{prefix}_min']) if v is not None]
+        highs = [v for v in (a[f'{prefix}_max'], b[f'{prefix}_max']) if v is not None]
+        merged[f'{prefix}_min'] = min(lows) if lows else None
+        merged[f'{prefix}_max'] = max(highs) if highs else None
+    return merged
+
+def fold(summaries, seconds):
+    """Merge {(beacon_id, start): summary} into buckets of `seconds`."""
+    folded = {}
+    for (beacon_id, start), summary in summaries.items():
+        key = (beacon_id, floor(start, seconds))
+        folded[key] = merge(folded[key], summary) if key in folded else summary
+    return folded
+
+def cascade(summaries):
+    """{resolution: buckets} for finer-grained summaries: raw -> 5 minutes -> hourly."""
+    five_minutes = fold(summaries, BeaconTelemetryBucket.FIVE_MINUTES)
+    return {
+        BeaconTelemetryBucket.FIVE_MINUTES: five_minutes,
+        BeaconTelemetryBucket.HOURLY: fold(five_minutes, BeaconTelemetryBucket.HOURLY),
+    }
+
+def summarize(readings):
+    """Per-minute summaries of a BeaconTelemetry queryset, aggregated by the database."""
+    aggregates = {'samples': Count('pk')}
+    for prefix, column in METRICS.items():
+        aggregates.update({
+            f'{prefix}_count': Count(column), f'{prefix}_sum': Sum(column),
+            f'{prefix}_min': Min(column), f'{prefix}_max': Max(column),
+        })
+    rows = (
+        readings.annotate(minute=TruncMinute('recorded_at', tzinfo=dt_timezone.utc))
+        .values('beacon_id', 'minute').annotate(**aggregates).order_by()
+    )
+    summaries = {}
+    for row in rows:
+        summary = {field: row[field] for field in SUMMARY_FIELDS}
+        for prefix in METRICS:
+            summary[f'{prefix}_sum'] = summary[f'{prefix}_sum'] or 0
+        summaries[(row['beacon_id'], row['minute'])] = summary
+    return summaries
+
+def summarize_objects(telemetry):
+    """Per-reading summaries of BeaconTelemetry instances that are not committed yet."""
+    summaries = {}
+    for reading in telemetry:
+        summary = {'samples': 1}
+        for prefix, column in METRICS.items():
+            value = getattr(reading, column)
+            summary.update({
+                f'{prefix}_count': int(value is not None), f'{prefix}_sum': value or 0,
+                f'{prefix}_min': value, f'{prefix}_max': value,
+            })
+        key = (reading.beacon_id, reading.recorded_at)
+        summaries[key] = merge(summaries[key], summary) if key in summaries else summary
+    return summaries
+
+def add_buckets(resolution, buckets):
+    """Merge {(beacon_id, bucket_start): summary} into the stored buckets of `resolution`."""
+    if not buckets:
+        return
+    current = BeaconTelemetryBucket.objects.filter(
+        resolution=resolution,
+        beacon_id__in={beacon_id for beacon_id, _ in buckets},
+        bucket_start__in={start for _, start in buckets},
+    ).values('beacon_id', 'bucket_start', *SUMMARY_FIELDS)
+    current = {(row.pop('beacon_id'), row.pop('bucket_start')): row for row in current}
+    rows = [
+        BeaconTelemetryBucket(
+            beacon_id=beacon_id, resolution=resolution, bucket_start=start,
+            **(merge(current[(beacon_id, start)], summary) if (beacon_id, start) in current else summary)
+        )
+        for (beacon_id, start), summary in buckets.items()
+    ]
+    BeaconTelemetryBucket.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['beacon', 'resolution', 'bucket_start'], update_fields=SUMMARY_FIELDS
+    )
+
+def add_summaries(summaries):
+    for resolution, buckets in cascade(summaries).items():
+        add_buckets(resolution, buckets)
+
+def downsample_step(cutoff):
+    """Fold at most DOWNSAMPLE_STEP of readings past the checkpoint, in one transaction.
+
+    The step starts at the next stored reading, so empty stretches (a fresh checkpoint,
+    a quiet beacon fleet) are skipped in one go. Returns the number of readings folded,
+    or None once the checkpoint has reached `cutoff`.
+    """
+    with transaction.atomic():
+        checkpoint, _ = RollupCheckpoint.objects.select_for_update().get_or_create(
+            source=CHECKPOINT, defaults={'processed_until': EPOCH}
+        )
+        start = checkpoint.processed_until
+        if start >= cutoff:
+            return None
+        following = BeaconTelemetry.objects.filter(recorded_at__gt=start, recorded_at__lte=cutoff).aggregate(
+            Min('recorded_at')
+        )['recorded_at__min']
+        if following is None:
+            until = cutoff
+        else:
+            start = following - timedelta(microseconds=1)
+            until = min(start + DOWNSAMPLE_STEP, cutoff)
+
+        summaries = summarize(BeaconTelemetry.objects.filter(recorded_at__gt=start, recorded_at__lte=until))
+        add_summaries(summaries)
+
+        checkpoint.processed_until = until
+        checkpoint.save(update_fields=['processed_until'])
+        return sum(summary['samples'] for summary in summaries.values())
+
+def downsample(cutoff):
+    """Fold readings recorded in (checkpoint, cutoff] into the buckets and advance the checkpoint.
+
+    The first backfill, or a catch-up after a pause, runs as one short transaction per
+    DOWNSAMPLE_STEP instead of locking the checkpoint for the whole table.
+    """
+    downsampled = 0
+    while True:
+        folded = downsample_step(cutoff)
+        if folded is None:
+            return downsampled
+        downsampled += folded
+
+def add_late_readings(telemetry):
+    """Fold just-inserted readings that are already behind the downsampling checkpoint.
+
+    Must run in the inserting transaction, like core.dashboards.rollups.add_late_events:
+    the checkpoint stays locked until commit, so every reading is counted exactly once.
+    Batches newer than TELEMETRY_DOWNSAMPLE_LAG skip the lock: the checkpoint trails now
+    by that lag, which is the room it leaves for in-flight transactions such as this one.
+    """
+    recorded = [reading.recorded_at for reading in telemetry]
+    if not recorded or min(recorded) > now() - timedelta(seconds=settings.TELEMETRY_DOWNSAMPLE_LAG):
+        return
+    checkpoint = RollupCheckpoint.objects.select_for_update().filter(source=CHECKPOINT).first()
+    if checkpoint is None:
+        return
+    add_summaries(summarize_objects(
+        reading for reading in telemetry if reading.recorded_at <= checkpoint.processed_until
+    ))
+
+def prune_buckets():
+    """Delete 5-minute buckets past TELEMETRY_5M_RETENTION_DAYS; hourly buckets are kept."""
+    cutoff = now() - timedelta(days=settings.TELEMETRY_5M_RETENTION_DAYS)
+    deleted, _ = BeaconTelemetryBucket.objects.filter(
+        resolution=BeaconTelemetryBucket.FIVE_MINUTES, bucket_start__lt=cutoff
+    ).delete()
+    return deleted
+
+def refresh_telemetry_buckets():
+    """Bring the buckets up to now minus TELEMETRY_DOWNSAMPLE_LAG and prune expired ones."""
+    downsampled = downsample(now() - timedelta(seconds=settings.TELEMETRY_DOWNSAMPLE_LAG))
+    return downsampled, prune_buckets()
+
+def pick_resolution(start, end):
+    """Finest resolution whose series over [start, end) stays short and is still retained."""
+    if end - start <= timedelta(days=2) and start >= now() - timedelta(days=settings.TELEMETRY_5M_RETENTION_DAYS):
+        return BeaconTelemetryBucket.FIVE_MINUTES
+    return BeaconTelemetryBucket.HOURLY
+
+def bucket_series(beacon_id, start, end, resolution):
+    """Buckets of one beacon over [start, end), oldest first, as {bucket_start: summary}.
+
+    Stored buckets are read as they are; readings newer than the checkpoint, which the
+    task has not folded in yet, are aggregated on the fly so the series reaches `end`.
+    """
+    start = floor(start, resolution)
+    stored = BeaconTelemetryBucket.objects.filter(
+        beacon_id=beacon_id, resolution=resolution, bucket_start__gte=start, bucket_start__lt=end
+    ).values('bucket_start', *SUMMARY_FIELDS)
+    series = {row.pop('bucket_start'): row for row in stored}
+
+    checkpoint = RollupCheckpoint.objects.filter(source=CHECKPOINT).values_list('processed_until', flat=True).first()
+    pending = BeaconTelemetry.objects.filter(beacon_id=beacon_id, recorded_at__gte=start, recorded_at__lt=end)
+    if checkpoint is not None:
+        pending = pending.filter(recorded_at__gt=checkpoint)
+    for (_, bucket_start), summary in fold(summarize(pending), resolution).items():
+        series[bucket_start] = merge(series[bucket_start], summary) if bucket_start in series else summary
+    return dict(sorted(series.items()))
+
+def describe(bucket_start, summary):
+    point = {'time': bucket_start, 'samples': summary['samples']}
+    for prefix, column in METRICS.items():
+        count = summary[f'{prefix}_count']
+        point[column] = {
+            'min': summary[f'{prefix}_min'],
+            'avg': round(summary[f'{prefix}_sum'] / count, 2) if count else None,
+            'max': summary[f'{prefix}_max'],
+        }
+    return point
+
+def change_per_day(points, column):
+    """Least-squares slope of the bucket averages, in units per day."""
+    pairs = [(p['time'].timestamp() / 86400, p[column]['avg']) for p in points if p[column]['avg'] is not None]
+    if len(pairs) < 2:
+        return None
+    mean_x = sum(x for x, _ in pairs) / len(pairs)
+    mean_y = sum(y for _, y in pairs) / len(pairs)
+    spread = sum((x - mean_x) ** 2 for x, _ in pairs)
+    if not spread:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in pairs) / spread
+
+def beacon_health(beacon_id, start, end, resolution=None):
+    """Signal and battery series of a beacon with their trends."""
+    resolution = resolution or pick_resolution(start, end)
+    points = [describe(*item) for item in bucket_series(beacon_id, start, end, resolution).items()]
+    battery_change = change_per_day(points, 'battery_status')
+    signal_change = change_per_day(points, 'signal_strength')
+    latest_battery = next((p['battery_status']['avg'] for p in reversed(points) if p['battery_status']['avg'] is not None), None)
+    days_left = None
+    if battery_change is not None and battery_change < 0 and latest_battery is not None:
+        days_left = round(latest_battery / -battery_change, 1)
+    return {
+        'beacon_id': beacon_id,
+        'resolution': resolution,
+        'start': start,
+        'end': end,
+        'points': points,
+        'trend': {
+            'battery_change_per_day': round(battery_change, 3) if battery_change is not None else None,
+            'signal_change_per_day': round(signal_change, 3) if signal_change is not None else None,
+            'battery_days_left': days_left,
+        },
+    }
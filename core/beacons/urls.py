@@ -1,12 +1,17 @@
 from django.urls import path
-from .views import BeaconList, BeaconDetail, BeaconActive, BeaconLocationList, BeaconStatus, BeaconDataView
+from .views import BeaconList, BeaconDetail, BeaconActive, BeaconLocationList, BeaconStatus, BeaconDataView, BeaconNearby, BeaconWithin, BeaconResolve, BeaconTelemetryView, BeaconHealth
 from core.assignments.views import BeaconAdvertisementsView
 
 urlpatterns = [
     path('', BeaconList.as_view(), name='beacon-list'),
     path('<uuid:pk>/', BeaconDetail.as_view(), name='beacon-details'),
+    path('<uuid:pk>/health/', BeaconHealth.as_view(), name='beacon-health'),
     path('active/', BeaconActive.as_view(), name='active-beacons'),
     path('location/', BeaconLocationList.as_view(), name='beacon-locations'),
+    path('nearby/', BeaconNearby.as_view(), name='beacon-nearby'),
+    path('within/', BeaconWithin.as_view(), name='beacon-within'),
+    path('resolve/', BeaconResolve.as_view(), name='beacon-resolve'),
+    path('telemetry/', BeaconTelemetryView.as_view(), name='beacon-telemetry'),
     path('status/', BeaconStatus.as_view(), name='beacon-status'),
     path('advertisements/', BeaconAdvertisementsView.as_view(), name='beacon-ads'),
     path('data/<uuid:pk>/', BeaconDataView.as_view(), name='beacon-datav-iew')
@@ -1,12 +1,24 @@
 from .models import Beacon
 from .serializers import BeaconLocationSerializer, BeaconSimpleSerializer, BeaconSerializer, BeaconStatusSerializer, BeaconDataUpdateSerializer
+from .serializers import NearbyQuerySerializer, BoundingBoxQuerySerializer, NearbyBeaconSerializer
+from .serializers import ScanSerializer, ScanResolutionSerializer
+from .serializers import TelemetryReadingSerializer, TelemetryBatchResultSerializer
+from .serializers import HealthQuerySerializer, BeaconHealthSerializer
 from rest_framework.response import Response
 from rest_framework import status
-from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse, OpenApiExample
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView, ListAPIView, RetrieveUpdateAPIView
 from rest_framework.views import APIView
 from core.advertisements.serializers import AdvertisementSerializer
-from core.advertisements.models import Advertisement
+from core.advertisements.frequency import frequency_cap
+from core.advertisements.ranking import ad_ranker
+from core.advertisements.search import similar_to
+from .cache import resolve_beacon_ads
+from .spatial import beacon_index
+from .lookup import resolve_scans
+from .telemetry import ingest_telemetry
+from .timeseries import beacon_health, RESOLUTIONS
+from django.conf import settings
 
 class BeaconList(ListCreateAPIView):
     """List all beacons or create a new one."""
@@ -17,11 +29,8 @@ class BeaconList(ListCreateAPIView):
         name = self.request.GET.get('name')
         location_name = self.request.GET.get('location_name')
 
-        if name:
-            qs = qs.filter(name__icontains=name)
-        if location_name:
-            qs = qs.filter(location_name__icontains=location_name)
-        return qs
+        qs = similar_to(qs, ['name'], name)
+        return similar_to(qs, ['location_name'], location_name, rank=not name)
 
     @extend_schema(
         tags=["Beacons"],
@@ -31,13 +40,13 @@ class BeaconList(ListCreateAPIView):
             OpenApiParameter(
                 name="name",
                 type=str,
-                description="Filter by beacon name (case-insensitive).",
+                description="Filter by beacon name (case-insensitive, partial or approximate; closest first).",
                 required=False
             ),
             OpenApiParameter(
                 name="location_name",
                 type=str,
-                description="Filter by location name (case-insensitive).",
+                description="Filter by location name (case-insensitive, partial or approximate; closest first).",
                 required=False
             ),
         ],
@@ -183,6 +192,187 @@ class BeaconLocationList(ListAPIView):
         return self.list(request, *args, **kwargs)
 
 
+class BeaconNearby(APIView):
+    """Find the beacons closest to a point, optionally with their active ads."""
+
+    @extend_schema(
+        tags=["Beacons"],
+        summary="Find Nearby Beacons",
+        description="""
+            Returns the beacons closest to `lat`/`lon`, nearest first, with their distance in metres.
+            Without `radius` the search widens up to the server maximum until `limit` beacons are found.
+            With `include_ads=true` each beacon carries its currently active ads, so the app can
+            prefetch them for the beacons around the phone in one request.
+
+            **Example Request:**
+            ```
+            GET /api/v1/beacons/nearby/?lat=9.031&lon=38.746&radius=500&include_ads=true
+            ```
+        """,
+        parameters=[NearbyQuerySerializer],
+        responses={
+            200: NearbyBeaconSerializer(many=True),
+            400: OpenApiResponse(description="Invalid coordinates, radius or limit"),
+        }
+    )
+    def get(self, request):
+        query = NearbyQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = query.validated_data
+
+        if 'radius' in params:
+            found = beacon_index.within(params['lat'], params['lon'], params['radius'])[:params['limit']]
+        else:
+            found = beacon_index.nearest(params['lat'], params['lon'], params['limit'],
+                                         settings.BEACON_NEARBY_MAX_RADIUS)
+
+        ranker, cap = ad_ranker(request.user), frequency_cap(request.user)
+        beacons = []
+        for distance, point in found:
+            beacon = {**point._asdict(), 'distance': round(distance, 1)}
+            if params['include_ads']:
+                # a prefetch delivers nothing yet: capped read-only, the resolve endpoints record deliveries
+                beacon['ads'] = cap.preview(ranker.rank(resolve_beacon_ads(point.beacon_id) or []))
+            beacons.append(beacon)
+        return Response(beacons)
+
+class BeaconWithin(APIView):
+    """List the beacons inside a bounding box."""
+
+    @extend_schema(
+        tags=["Beacons"],
+        summary="Find Beacons in a Bounding Box",
+        description="Returns the locations of all beacons inside the box, e.g. the area shown on a map.",
+        parameters=[BoundingBoxQuerySerializer],
+        responses={
+            200: BeaconLocationSerializer(many=True),
+            400: OpenApiResponse(description="Invalid bounding box"),
+        }
+    )
+    def get(self, request):
+        query = BoundingBoxQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        box = query.validated_data
+
+        points = beacon_index.in_box(box['min_lat'], box['min_lon'], box['max_lat'], box['max_lon'])
+        return Response([point._asdict() for point in points])
+
+class BeaconResolve(APIView):
+    """Resolve scanned iBeacon (major, minor) pairs to beacons and their ads."""
+    max_batch_size = 100
+
+    @extend_schema(
+        tags=["Beacons"],
+        summary="Resolve Scanned Beacons",
+        description="""
+            Accepts the (major, minor, rssi) sightings of one scan and returns the matching beacons,
+            strongest signal first, each with its active ads. Sightings that match no beacon are
+            returned in `unmatched`. This replaces downloading the beacon list to map scans to IDs.
+        """,
+        request=ScanSerializer(many=True),
+        responses={
+            200: ScanResolutionSerializer,
+            400: OpenApiResponse(description="Validation error"),
+        },
+        examples=[
+            OpenApiExample(
+                'Request Example',
+                value=[{"major": 1, "minor": 12, "rssi": -61}, {"major": 1, "minor": 14, "rssi": -80}],
+                request_only=True
+            )
+        ]
+    )
+    def post(self, request):
+        serializer = ScanSerializer(data=request.data, many=True, allow_empty=False, max_length=self.max_batch_size)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        beacons, unmatched = resolve_scans(serializer.validated_data)
+        ranker, cap = ad_ranker(request.user), frequency_cap(request.user)
+        for beacon in beacons:
+            beacon['ads'] = cap.filter(ranker.rank(beacon['ads']))
+        cap.save()
+        return Response({"beacons": beacons, "unmatched": unmatched})
+
+class BeaconTelemetryView(APIView):
+    """Record batched signal and battery readings of many beacons."""
+    max_batch_size = 5000
+
+    @extend_schema(
+        tags=["Beacons"],
+        summary="Record Beacon Telemetry",
+        description="""
+            Accepts an array of signal strength / battery readings, possibly of many beacons and taken
+            over a period of time. Every reading is kept in the telemetry history; the newest reading per
+            beacon is written to the beacon itself shortly after, together with other phones' readings.
+
+            Readings of unknown beacons are skipped and reported back in `unknown_beacon_ids`.
+        """,
+        request=TelemetryReadingSerializer(many=True),
+        responses={
+            201: TelemetryBatchResultSerializer,
+            400: OpenApiResponse(description="Validation error"),
+        },
+        examples=[
+            OpenApiExample(
+                'Request Example',
+                value=[
+                    {"beacon": "123e4567-e89b-12d3-a456-426614174000", "signal_strength": -67,
+                     "battery_status": 81, "recorded_at": "2025-03-08T12:30:00Z"},
+                ],
+                request_only=True
+            )
+        ]
+    )
+    def post(self, request):
+        serializer = TelemetryReadingSerializer(data=request.data, many=True, allow_empty=False,
+                                                max_length=self.max_batch_size)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        recorded, unknown_beacon_ids = ingest_telemetry(serializer.validated_data)
+        return Response({"recorded": recorded, "unknown_beacon_ids": unknown_beacon_ids},
+                        status=status.HTTP_201_CREATED)
+
+class BeaconHealth(APIView):
+    """Battery and signal history of one beacon."""
+
+    @extend_schema(
+        tags=["Beacons"],
+        summary="Get Beacon Health Trends",
+        description="""
+            Returns min/avg/max `battery_status` and `signal_strength` per time bucket between `start`
+            and `end` (default: the last 7 days), plus the battery drain and signal trend over the window.
+
+            Series are read from pre-aggregated 5-minute and hourly buckets rather than raw readings.
+            With `resolution=auto` windows of up to 2 days use 5-minute buckets, longer ones hourly buckets.
+
+            **Example Request:**
+            ```
+            GET /api/v1/beacons/123e4567-e89b-12d3-a456-426614174000/health/?start=2025-01-01T00:00:00Z&resolution=1h
+            ```
+        """,
+        parameters=[HealthQuerySerializer],
+        responses={
+            200: BeaconHealthSerializer,
+            400: OpenApiResponse(description="Invalid window or resolution"),
+            404: OpenApiResponse(description="Beacon not found"),
+        }
+    )
+    def get(self, request, pk):
+        query = HealthQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = query.validated_data
+
+        if not Beacon.objects.filter(beacon_id=pk).exists():
+            return Response({"error": "Beacon not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        health = beacon_health(pk, params['start'], params['end'], RESOLUTIONS.get(params['resolution']))
+        return Response(BeaconHealthSerializer(health).data)
+
 class BeaconStatus(RetrieveUpdateAPIView):
     """API to get and update beacon status"""
     queryset = Beacon.objects.all()
@@ -259,26 +449,25 @@ class BeaconDataView(APIView):
     @extend_schema(
         tags=['Beacons'],
         summary="Get Active Ads for a Beacon",
-        description="Receives a beacon ID and returns all active advertisements linked to it.",
-        request=OpenApiParameter(name="beacon_id", description="ID of the beacon", required=True, type=int),
+        description="Receives a beacon ID and returns all active advertisements linked to it. "
+                    "Results are served from a per-beacon cache that is refreshed whenever the beacon, "
+                    "its assignments or their advertisements change. Ads matching the user's preferred "
+                    "categories come first, then the most engaged ones. Users who set `ad_frequency` in "
+                    "their preferences get at most that many distinct ads per day.",
         responses={
             200: AdvertisementSerializer(many=True),
             400: {"error": "Invalid beacon ID"}
         }
     )
-    def get(self, request):
-        beacon_id = request.data.get("beacon_id")
-
-        # Validate beacon
-        try:
-            beacon = Beacon.objects.get(id=beacon_id)
-        except Beacon.DoesNotExist:
+    def get(self, request, pk):
+        # Active ads linked to this beacon via the Assignment table, cached per beacon
+        ads = resolve_beacon_ads(pk)
+        if ads is None:
             return Response({"error": "Invalid beacon ID"}, status=400)
 
-        # Fetch active ads linked to this beacon via Assignment table
-        ads = Advertisement.objects.filter(
-            assignment__beacon=beacon,  # Use the reverse relationship from Assignment
-            is_active=True  # Filter by global ad status
-        ).distinct()  # Avoid duplicates in case of multiple assignments
+        # best matches for the user first, at most their ad_frequency distinct ads per day
+        cap = frequency_cap(request.user)
+        ads = cap.filter(ad_ranker(request.user).rank(ads))
+        cap.save()
 
-        return Response({"ads": AdvertisementSerializer(ads, many=True).data})
\ No newline at end of file
+        return Response({"ads": ads})
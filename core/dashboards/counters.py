@@ -0,0 +1,60 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.db.models import Count, F, PositiveIntegerField, Value
+from django.db.models.functions import Greatest
+from django.utils.timezone import now
+from core.advertisements.interactions import INTERACTIONS
+from core.advertisements.models import Advertisement
+from .models import AdStats
+
+ROLLING_DAYS = 7
+# AdStats counter -> interaction type; a row counts while its flag is set
+COUNTERS = {'views': 'view', 'clicks': 'click', 'likes': 'like', 'saves': 'save'}
+FIELDS = [*COUNTERS, 'views_7d']
+
+def rolling_start():
+    return now() - timedelta(days=ROLLING_DAYS)
+
+def counted(kind):
+    model, flag, _ = INTERACTIONS[kind]
+    return model.objects.filter(**{flag: True})
+
+def interaction_changes(kind, interaction, delta):
+    """{counter: delta} for one interaction row starting (1) or stopping (-1) to count."""
+    counter = next(counter for counter, counter_kind in COUNTERS.items() if counter_kind == kind)
+    changes = {counter: delta}
+    if kind == 'view' and interaction.viewed_at and interaction.viewed_at >= rolling_start():
+        changes['views_7d'] = delta
+    return changes
+
+def change_counters(ad_id, changes):
+    """Apply {counter: delta} to one ad's counters in a single UPDATE, never going below zero."""
+    AdStats.objects.filter(advertisement_id=ad_id).update(**{
+        counter: Greatest(F(counter) + delta, Value(0), output_field=PositiveIntegerField())
+        for counter, delta in changes.items()
+    })
+
+def reconcile_ad_stats(batch_size=1000):
+    """Recount every ad's counters from the interaction tables and store the ones that drifted.
+
+    One grouped COUNT per counter; only rows whose values changed are written, and ads
+    without a row get one. Returns the number of rows written. An interaction saved
+    while this runs may be overwritten by the older count until the next run.
+    """
+    totals = defaultdict(dict)
+    sources = {counter: counted(kind) for counter, kind in COUNTERS.items()}
+    sources['views_7d'] = counted('view').filter(viewed_at__gte=rolling_start())
+    for counter, queryset in sources.items():
+        for ad_id, total in queryset.values_list('ad_id').annotate(total=Count('pk')).order_by():
+            totals[ad_id][counter] = total
+
+    current = {row.pop('advertisement_id'): row for row in AdStats.objects.values('advertisement_id', *FIELDS)}
+    rows = []
+    for ad_id in Advertisement.objects.values_list('pk', flat=True).iterator(chunk_size=batch_size):
+        expected = {field: totals[ad_id].get(field, 0) for field in FIELDS}
+        if current.get(ad_id) != expected:
+            rows.append(AdStats(advertisement_id=ad_id, **expected))
+    AdStats.objects.bulk_create(
+        rows, batch_size=batch_size, update_conflicts=True, unique_fields=['advertisement'], update_fields=FIELDS
+    )
+    return len(rows)
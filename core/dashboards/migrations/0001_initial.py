@@ -0,0 +1,51 @@
+# Generated by Django 5.1.4 on 2026-10-17 02:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('advertisements', '0003_index_interaction_timestamps'),
+        ('beacons', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupCheckpoint',
+            fields=[
+                ('source', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('processed_until', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AdDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True)),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('clicks', models.PositiveIntegerField(default=0)),
+                ('deliveries', models.PositiveIntegerField(default=0)),
+                ('advertisement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='advertisements.advertisement')),
+            ],
+            options={
+                'unique_together': {('advertisement', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='BeaconDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True)),
+                ('messages', models.PositiveIntegerField(default=0)),
+                ('deliveries', models.PositiveIntegerField(default=0)),
+                ('beacon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='beacons.beacon')),
+            ],
+            options={
+                'unique_together': {('beacon', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.4 on 2026-10-17 03:26
+
+import django.db.models.deletion
+from collections import defaultdict
+from datetime import timedelta
+from django.db import migrations, models
+from django.utils.timezone import now
+
+# AdStats counter -> (interaction model, flag); a row counts while its flag is set
+COUNTED = {
+    'views': ('AdView', 'viewed'),
+    'clicks': ('AdClick', 'clicked'),
+    'likes': ('AdLike', 'liked'),
+    'saves': ('AdSaved', 'saved'),
+}
+
+
+def count_engagement(apps, schema_editor):
+    Advertisement = apps.get_model('advertisements', 'Advertisement')
+    AdStats = apps.get_model('dashboards', 'AdStats')
+    sources = {
+        counter: apps.get_model('advertisements', model).objects.filter(**{flag: True})
+        for counter, (model, flag) in COUNTED.items()
+    }
+    sources['views_7d'] = sources['views'].filter(viewed_at__gte=now() - timedelta(days=7))
+    totals = defaultdict(dict)
+    for counter, queryset in sources.items():
+        for ad_id, total in queryset.values_list('ad_id').annotate(total=models.Count('pk')).order_by():
+            totals[ad_id][counter] = total
+
+    batch = []
+    for ad_id in Advertisement.objects.values_list('pk', flat=True).iterator(chunk_size=1000):
+        batch.append(AdStats(advertisement_id=ad_id, **totals[ad_id]))
+        if len(batch) == 1000:
+            AdStats.objects.bulk_create(batch)
+            batch = []
+    AdStats.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisements', '0009_advertisement_image_status'),
+        ('dashboards', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdStats',
+            fields=[
+                ('advertisement', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='advertisements.advertisement')),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('clicks', models.PositiveIntegerField(default=0)),
+                ('likes', models.PositiveIntegerField(default=0)),
+                ('saves', models.PositiveIntegerField(default=0)),
+                ('views_7d', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-views_7d'], name='adstats_views_7d_idx')],
+            },
+        ),
+        migrations.RunPython(count_engagement, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-17 03:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisements', '0009_advertisement_image_status'),
+        ('dashboards', '0002_adstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location_name', models.CharField(max_length=100)),
+                ('date', models.DateField(db_index=True)),
+                ('deliveries', models.PositiveIntegerField(default=0)),
+                ('advertisement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='location_stats', to='advertisements.advertisement')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['location_name', 'date'], name='locationstats_loc_date_idx')],
+                'unique_together': {('location_name', 'advertisement', 'date')},
+            },
+        ),
+    ]
@@ -1,3 +1,72 @@
 from django.db import models
+from core.advertisements.models import Advertisement
+from core.beacons.models import Beacon
 
-# Create your models here.
+class AdDailyStats(models.Model):
+    """Per advertisement per day event counts, maintained by the rollup task."""
+    advertisement = models.ForeignKey(Advertisement, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField(db_index=True)
+    views = models.PositiveIntegerField(default=0)
+    clicks = models.PositiveIntegerField(default=0)
+    deliveries = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('advertisement', 'date')
+
+    def __str__(self):
+        return f"{self.advertisement_id} on {self.date}"
+
+class AdStats(models.Model):
+    """Running engagement counters of one advertisement (see core.dashboards.counters).
+
+    Interactions saved through the ORM adjust them right away; the reconcile task
+    recounts them from the interaction tables, which also covers bulk upserts and
+    deletions, and ages views out of the 7-day window.
+    """
+    advertisement = models.OneToOneField(Advertisement, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    views = models.PositiveIntegerField(default=0)
+    clicks = models.PositiveIntegerField(default=0)
+    likes = models.PositiveIntegerField(default=0)
+    saves = models.PositiveIntegerField(default=0)
+    views_7d = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['-views_7d'], name='adstats_views_7d_idx')]
+
+    def __str__(self):
+        return f"{self.advertisement_id}: {self.views} views"
+
+class BeaconDailyStats(models.Model):
+    """Per beacon per day event counts, maintained by the rollup task."""
+    beacon = models.ForeignKey(Beacon, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField(db_index=True)
+    messages = models.PositiveIntegerField(default=0)
+    deliveries = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('beacon', 'date')
+
+    def __str__(self):
+        return f"{self.beacon_id} on {self.date}"
+
+class LocationDailyStats(models.Model):
+    """Per beacon location, advertisement and day delivery counts, maintained by the rollup task."""
+    location_name = models.CharField(max_length=100)
+    advertisement = models.ForeignKey(Advertisement, on_delete=models.CASCADE, related_name='location_stats')
+    date = models.DateField(db_index=True)
+    deliveries = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('location_name', 'advertisement', 'date')
+        indexes = [models.Index(fields=['location_name', 'date'], name='locationstats_loc_date_idx')]
+
+    def __str__(self):
+        return f"{self.advertisement_id} at {self.location_name} on {self.date}"
+
+class RollupCheckpoint(models.Model):
+    """High-water mark of a rollup source: events up to `processed_until` are counted."""
+    source = models.CharField(max_length=50, primary_key=True)
+    processed_until = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.source} until {self.processed_until}"
@@ -0,0 +1,175 @@
+import heapq
+from collections import Counter, defaultdict, namedtuple
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils.timezone import now, make_aware, localdate
+from core.advertisements.models import Advertisement, AdView, AdClick
+from core.beacon_messages.models import BeaconMessage
+from core.logs.models import AdvertisementLog
+from .models import AdDailyStats, BeaconDailyStats, LocationDailyStats, RollupCheckpoint
+
+# name, event model, event timestamp, event group lookups, rollup model, rollup key columns, rollup counter
+RollupSource = namedtuple('RollupSource', ['name', 'model', 'timestamp', 'group_by', 'rollup', 'key', 'counter'])
+
+ROLLUP_SOURCES = [
+    RollupSource('ad_views', AdView, 'viewed_at', ('ad_id',), AdDailyStats, ('advertisement_id',), 'views'),
+    RollupSource('ad_clicks', AdClick, 'clicked_at', ('ad_id',), AdDailyStats, ('advertisement_id',), 'clicks'),
+    RollupSource('ad_deliveries', AdvertisementLog, 'timestamp', ('advertisement_id',), AdDailyStats, ('advertisement_id',), 'deliveries'),
+    RollupSource('beacon_deliveries', AdvertisementLog, 'timestamp', ('beacon_id',), BeaconDailyStats, ('beacon_id',), 'deliveries'),
+    RollupSource('beacon_messages', BeaconMessage, 'sent_at', ('beacon_id',), BeaconDailyStats, ('beacon_id',), 'messages'),
+    RollupSource('location_deliveries', AdvertisementLog, 'timestamp', ('beacon__location_name', 'advertisement_id'),
+                 LocationDailyStats, ('location_name', 'advertisement_id'), 'deliveries'),
+]
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+def add_counts(source, counts):
+    """Add {(*key, day): total} to the source's rollup rows."""
+    if not counts:
+        return
+    filters = {f'{column}__in': {group[position] for group in counts} for position, column in enumerate(source.key)}
+    current = source.rollup.objects.filter(
+        **filters, date__in={group[-1] for group in counts}
+    ).values_list(*source.key, 'date', source.counter)
+    current = {tuple(row[:-1]): row[-1] for row in current}
+    rows = [
+        source.rollup(**dict(zip(source.key, group[:-1])), date=group[-1], **{source.counter: current.get(group, 0) + total})
+        for group, total in counts.items()
+    ]
+    source.rollup.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=[*source.key, 'date'], update_fields=[source.counter]
+    )
+
+def roll_up(source, cutoff):
+    """Add events in (checkpoint, cutoff] of one source to its daily rollup and advance the checkpoint."""
+    with transaction.atomic():
+        checkpoint, _ = RollupCheckpoint.objects.select_for_update().get_or_create(
+            source=source.name, defaults={'processed_until': EPOCH}
+        )
+        if checkpoint.processed_until >= cutoff:
+            return 0
+
+        counts = (
+            source.model.objects
+            .filter(**{f'{source.timestamp}__gt': checkpoint.processed_until, f'{source.timestamp}__lte': cutoff})
+            .annotate(day=TruncDate(source.timestamp))
+            .values_list(*source.group_by, 'day')
+            .annotate(total=Count('pk'))
+        )
+        counts = {tuple(row[:-1]): row[-1] for row in counts}
+
+        add_counts(source, counts)
+
+        checkpoint.processed_until = cutoff
+        checkpoint.save(update_fields=['processed_until'])
+        return sum(counts.values())
+
+def group_values(source, events):
+    """The group_by values of each event instance.
+
+    Lookups through a foreign key ('beacon__location_name') are resolved with one query
+    per lookup for all events together.
+    """
+    columns = []
+    for lookup in source.group_by:
+        if '__' not in lookup:
+            columns.append([getattr(event, lookup) for event in events])
+            continue
+        relation, field = lookup.split('__', 1)
+        foreign_key = source.model._meta.get_field(relation)
+        target = foreign_key.target_field.name
+        ids = {getattr(event, foreign_key.attname) for event in events}
+        values = dict(foreign_key.related_model.objects.filter(**{f'{target}__in': ids}).values_list(target, field))
+        columns.append([values.get(getattr(event, foreign_key.attname)) for event in events])
+    return list(zip(*columns))
+
+def add_late_events(model, events):
+    """Fold just-inserted events that are already behind their sources' checkpoints.
+
+    `events` are the inserted instances of `model`. Must run in the inserting
+    transaction: the checkpoint rows stay locked until it commits, so a concurrent
+    roll_up either counts the events itself or sees them folded here, never both.
+    """
+    for source in ROLLUP_SOURCES:
+        if source.model is not model:
+            continue
+        checkpoint = RollupCheckpoint.objects.select_for_update().filter(source=source.name).first()
+        if checkpoint is None:
+            continue
+        late = [event for event in events if getattr(event, source.timestamp) <= checkpoint.processed_until]
+        if not late:
+            continue
+        counts = Counter(
+            (*group, localdate(getattr(event, source.timestamp)))
+            for event, group in zip(late, group_values(source, late))
+        )
+        add_counts(source, counts)
+
+def refresh_rollups():
+    """Bring every rollup up to now minus DASHBOARD_ROLLUP_LAG (room for in-flight transactions)."""
+    cutoff = now() - timedelta(seconds=settings.DASHBOARD_ROLLUP_LAG)
+    return {source.name: roll_up(source, cutoff) for source in ROLLUP_SOURCES}
+
+def deliveries_since(start):
+    """Exact number of advertisement deliveries since `start`.
+
+    Whole days covered by the rollup are summed from AdDailyStats; only the partial
+    first day and the events newer than the checkpoint are counted from the log table.
+    """
+    checkpoint = RollupCheckpoint.objects.filter(source='ad_deliveries').values_list('processed_until', flat=True).first()
+    first_full_day = start.date() + timedelta(days=1)
+    first_full_day_start = make_aware(datetime.combine(first_full_day, time.min))
+    if checkpoint is None or checkpoint < first_full_day_start:
+        return AdvertisementLog.objects.filter(timestamp__gte=start).count()
+
+    partial_day = AdvertisementLog.objects.filter(timestamp__gte=start, timestamp__lt=first_full_day_start).count()
+    rolled_up = AdDailyStats.objects.filter(
+        date__gte=first_full_day, date__lte=checkpoint.date()
+    ).aggregate(total=Sum('deliveries'))['total'] or 0
+    newer = AdvertisementLog.objects.filter(timestamp__gt=checkpoint).count()
+    return partial_day + rolled_up + newer
+
+def location_stats(since, top, location=None):
+    """Deliveries per beacon location since the date `since`, with each location's `top` ads.
+
+    Read from the location rollup only, so the log table is never scanned; like the
+    other rollups it trails real time by the refresh interval. Ads carry their
+    engagement counters from AdStats, which are not split by location. Locations come
+    busiest first.
+    """
+    rows = LocationDailyStats.objects.filter(date__gte=since)
+    if location is not None:
+        rows = rows.filter(location_name=location)
+    totals = defaultdict(dict)
+    for name, ad_id, deliveries in rows.values_list('location_name', 'advertisement_id').annotate(
+        total=Sum('deliveries')
+    ).order_by():
+        totals[name][ad_id] = deliveries
+
+    best = {name: heapq.nlargest(top, ads.items(), key=lambda item: item[1]) for name, ads in totals.items()}
+    counters = ['views', 'clicks', 'likes', 'saves']
+    engagement = {
+        row['advertisement_id']: {
+            'advertisement_id': row['advertisement_id'], 'title': row['title'],
+            **{counter: row[f'stats__{counter}'] for counter in counters},
+        }
+        for row in Advertisement.objects.filter(pk__in={ad_id for ads in best.values() for ad_id, _ in ads}).values(
+            'advertisement_id', 'title', *[f'stats__{counter}' for counter in counters]
+        )
+    }
+
+    locations = [
+        {
+            'location_name': name,
+            'deliveries': sum(totals[name].values()),
+            'top_ads': [
+                {**engagement[ad_id], 'deliveries': deliveries}
+                for ad_id, deliveries in ads if ad_id in engagement
+            ],
+        }
+        for name, ads in best.items()
+    ]
+    return sorted(locations, key=lambda entry: (-entry['deliveries'], entry['location_name']))
@@ -0,0 +1,21 @@
+from rest_framework import serializers
+
+class LocationStatsQuerySerializer(serializers.Serializer):
+    """Query parameters of the per-location statistics."""
+    days = serializers.IntegerField(min_value=1, max_value=366, default=7)
+    top = serializers.IntegerField(min_value=1, max_value=50, default=5)
+    location = serializers.CharField(max_length=100, required=False)
+
+class LocationAdSerializer(serializers.Serializer):
+    advertisement_id = serializers.UUIDField()
+    title = serializers.CharField()
+    deliveries = serializers.IntegerField()
+    views = serializers.IntegerField(allow_null=True)
+    clicks = serializers.IntegerField(allow_null=True)
+    likes = serializers.IntegerField(allow_null=True)
+    saves = serializers.IntegerField(allow_null=True)
+
+class LocationStatsSerializer(serializers.Serializer):
+    location_name = serializers.CharField()
+    deliveries = serializers.IntegerField()
+    top_ads = LocationAdSerializer(many=True)
@@ -0,0 +1,36 @@
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+from core.advertisements.interactions import INTERACTIONS
+from core.advertisements.models import Advertisement
+from .counters import change_counters, interaction_changes
+from .models import AdStats
+
+# interaction model -> interaction type
+KINDS = {model: kind for kind, (model, _, _) in INTERACTIONS.items()}
+
+# Deletions are left to the reconcile task: a post_delete receiver would stop the
+# retention job's bulk deletes from running as single DELETE statements.
+
+@receiver(post_save, sender=Advertisement)
+def create_ad_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AdStats.objects.get_or_create(advertisement=instance)
+
+def remember_flag(sender, instance, **kwargs):
+    # whether the row counts in the database right now; None when the flag was not loaded
+    flag = INTERACTIONS[KINDS[sender]][1]
+    instance._counted = instance.__dict__.get(flag) if instance.pk else False
+
+def count_interaction(sender, instance, raw=False, **kwargs):
+    kind = KINDS[sender]
+    flag = INTERACTIONS[kind][1]
+    previous, current = getattr(instance, '_counted', None), bool(getattr(instance, flag))
+    if raw or previous is None or bool(previous) == current:
+        instance._counted = current
+        return
+    change_counters(instance.ad_id, interaction_changes(kind, instance, 1 if current else -1))
+    instance._counted = current
+
+for model in KINDS:
+    post_init.connect(remember_flag, sender=model, dispatch_uid=f'ad_stats_init_{model.__name__}')
+    post_save.connect(count_interaction, sender=model, dispatch_uid=f'ad_stats_save_{model.__name__}')
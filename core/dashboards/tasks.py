@@ -0,0 +1,22 @@
+from celery import shared_task
+from .counters import reconcile_ad_stats
+from .rollups import refresh_rollups
+from .trending import refresh_trending
+
+@shared_task
+def refresh_dashboard_rollups():
+    """Fold new events into the daily dashboard rollups."""
+    counts = refresh_rollups()
+    return f"Rolled up {sum(counts.values())} events."
+
+@shared_task
+def reconcile_ad_stat_counters():
+    """Recount the AdStats engagement counters from the interaction tables."""
+    written = reconcile_ad_stats()
+    return f"Corrected {written} ad stats rows."
+
+@shared_task
+def refresh_trending_ads():
+    """Recount the recent hours of engagement and store the trending top ads."""
+    scored = refresh_trending()
+    return f"Scored {scored} trending ads."
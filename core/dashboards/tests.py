@@ -1,3 +1,245 @@
-from django.test import TestCase
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APITestCase
+from core.advertisements.models import Advertisement, AdView, AdClick, AdLike, AdSaved
+from core.advertisements.interactions import record_interactions
+from core.beacons.models import Beacon
+from core.logs.models import AdvertisementLog
+from core.dashboards.models import AdDailyStats, AdStats, LocationDailyStats
+from core.logs.ingest import ingest_logs
+from core.dashboards.counters import reconcile_ad_stats
+from core.dashboards.trending import refresh_trending, trending_ids
+from core.assignments.models import AdvertisementAssignment
+from core.dashboards.rollups import refresh_rollups, deliveries_since
 
-# Create your tests here.
+class PopularAdsViewTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="marketer", email="marketer@example.com", password="pass")
+        self.client.force_authenticate(self.user)
+        self.url = reverse('hot_ads')
+
+    def test_ranked_by_recent_views_in_constant_queries(self):
+        ads = [Advertisement.objects.create(title=f"Ad {i}", content="content", created_by=self.user) for i in range(12)]
+        AdView.objects.create(user=self.user, ad=ads[5], viewed=True)
+
+        # count + page + one query per interaction type
+        with self.assertNumQueries(6):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 10)
+        self.assertEqual(response.data['results'][0]['ad']['title'], "Ad 5")
+        self.assertTrue(response.data['results'][0]['viewed'])
+
+@override_settings(DASHBOARD_ROLLUP_LAG=0)
+class DashboardRollupTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="marketer", email="marketer@example.com", password="pass")
+        self.client.force_authenticate(self.user)
+        self.beacon = Beacon.objects.create(name="Beacon 1", location_name="Bole")
+        self.ad = Advertisement.objects.create(title="Ybs Soap", content="30% discount", created_by=self.user)
+
+    def log(self, at):
+        entry = AdvertisementLog.objects.create(beacon=self.beacon, advertisement=self.ad)
+        AdvertisementLog.objects.filter(pk=entry.pk).update(timestamp=at)
+
+    def test_incremental_refresh_counts_each_event_once(self):
+        viewer = get_user_model().objects.create_user(username="viewer", email="viewer@example.com", password="pass")
+        AdView.objects.create(user=self.user, ad=self.ad, viewed=True)
+        AdClick.objects.create(user=self.user, ad=self.ad, clicked=True)
+        refresh_rollups()
+
+        AdView.objects.create(user=viewer, ad=self.ad, viewed=True)
+        counts = refresh_rollups()
+        self.assertEqual(counts['ad_views'], 1)
+        self.assertEqual(counts['ad_clicks'], 0)
+
+        stats = AdDailyStats.objects.get(advertisement=self.ad)
+        self.assertEqual((stats.views, stats.clicks), (2, 1))
+
+        response = self.client.get(reverse('impressions-per-day'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['total_views'], 2)
+        self.assertEqual(self.client.get(reverse('clicks-per-day')).data[0]['total_clicks'], 1)
+
+    def test_log_count_is_exact_across_rollup(self):
+        current = now()
+        self.log(current - timedelta(hours=30))  # outside the window
+        self.log(current - timedelta(hours=23))
+        self.log(current - timedelta(hours=1))
+        refresh_rollups()
+        AdvertisementLog.objects.create(beacon=self.beacon, advertisement=self.ad)  # newer than the checkpoint
+
+        self.assertEqual(deliveries_since(current - timedelta(days=1)), 3)
+        response = self.client.get(reverse('log_count'))
+        self.assertEqual(response.data['count'], 3)
+
+class AdStatsTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="marketer", email="marketer@example.com", password="pass")
+        self.viewer = get_user_model().objects.create_user(username="viewer", email="viewer@example.com", password="pass")
+        self.ad = Advertisement.objects.create(title="Ybs Soap", content="30% discount", created_by=self.user)
+
+    def counters(self):
+        stats = AdStats.objects.get(advertisement=self.ad)
+        return stats.views, stats.clicks, stats.likes, stats.saves, stats.views_7d
+
+    def test_saved_interactions_update_the_counters(self):
+        view = AdView.objects.create(user=self.user, ad=self.ad)  # not viewed yet
+        self.assertEqual(self.counters(), (0, 0, 0, 0, 0))
+        view.viewed = True
+        view.save()
+        AdClick.objects.create(user=self.user, ad=self.ad, clicked=True)
+        like = AdLike.objects.create(user=self.user, ad=self.ad)
+        AdSaved.objects.create(user=self.viewer, ad=self.ad)
+        self.assertEqual(self.counters(), (1, 1, 1, 1, 1))
+
+        like = AdLike.objects.get(pk=like.pk)
+        like.liked = False
+        like.save()
+        like.save()
+        self.assertEqual(self.counters(), (1, 1, 0, 1, 1))
+
+    def test_reconcile_covers_bulk_writes_deletes_and_the_window(self):
+        record_interactions(self.viewer, [{'type': 'view', 'ad_id': self.ad.pk}, {'type': 'like', 'ad_id': self.ad.pk}])
+        old = AdView.objects.create(user=self.user, ad=self.ad, viewed=True)
+        AdView.objects.filter(pk=old.pk).update(viewed_at=now() - timedelta(days=8))
+        AdClick.objects.create(user=self.user, ad=self.ad, clicked=True)
+        AdClick.objects.filter(ad=self.ad).delete()
+
+        self.assertEqual(reconcile_ad_stats(), 1)
+        self.assertEqual(self.counters(), (2, 0, 1, 0, 1))
+        self.assertEqual(reconcile_ad_stats(), 0)
+
+    def test_reconcile_creates_missing_rows(self):
+        AdStats.objects.all().delete()
+        AdView.objects.create(user=self.user, ad=self.ad, viewed=True)
+        reconcile_ad_stats()
+        self.assertEqual(self.counters(), (1, 0, 0, 0, 1))
+
+class TrendingAdsTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="marketer", email="marketer@example.com", password="pass")
+        self.client.force_authenticate(self.user)
+        self.viewers = [
+            get_user_model().objects.create_user(username=f"viewer{i}", email=f"viewer{i}@example.com", password="pass")
+            for i in range(3)
+        ]
+        self.soap, self.bread, self.tea = [
+            Advertisement.objects.create(title=title, content="Discount", created_by=self.user)
+            for title in ("Soap", "Bread", "Tea")
+        ]
+        bole = Beacon.objects.create(name="Beacon 1", location_name="Bole")
+        for ad in (self.soap, self.tea):
+            AdvertisementAssignment.objects.create(beacon=bole, advertisement=ad, end_date=now() + timedelta(days=1))
+
+        for viewer in self.viewers:
+            AdView.objects.create(user=viewer, ad=self.soap, viewed=True)  # 3
+        AdClick.objects.create(user=self.user, ad=self.bread, clicked=True)  # 5
+        like = AdLike.objects.create(user=self.user, ad=self.tea)  # 3, three days old: 0.375
+        AdLike.objects.filter(pk=like.pk).update(liked_at=now() - timedelta(days=3))
+
+    def test_decayed_ranking_overall_and_per_location(self):
+        self.assertIsNone(trending_ids())
+        self.assertEqual(refresh_trending(), 3)
+        self.assertEqual(trending_ids(), [str(self.bread.pk), str(self.soap.pk), str(self.tea.pk)])
+        self.assertEqual(trending_ids("Bole"), [str(self.soap.pk), str(self.tea.pk)])
+        self.assertEqual(trending_ids("Piassa"), [])
+
+        titles = [row['ad']['title'] for row in self.client.get(reverse('hot_ads')).data['results']]
+        self.assertEqual(titles, ["Bread", "Soap", "Tea"])
+        # ads without engagement fill the top 10 after the trending ones
+        Advertisement.objects.create(title="Milk", content="Fresh", created_by=self.user)
+        response = self.client.get(reverse('hot_ads'), {'page_size': 10})
+        self.assertEqual([row['ad']['title'] for row in response.data['results']], ["Bread", "Soap", "Tea", "Milk"])
+        response = self.client.get(reverse('hot_ads'), {'location': "Bole"})
+        self.assertEqual([row['ad']['title'] for row in response.data['results']], ["Soap", "Tea"])
+
+    def test_refresh_recounts_only_the_recent_hours(self):
+        refresh_trending()
+        # one grouped count per interaction type for the open hours, one for the locations
+        with self.assertNumQueries(5):
+            refresh_trending()
+
+        AdLike.objects.create(user=self.viewers[0], ad=self.bread)
+        refresh_trending()
+        self.assertEqual(trending_ids()[0], str(self.bread.pk))
+
+    @override_settings(TRENDING_TOP_K=1)
+    def test_search_reaches_ads_outside_the_top_ones(self):
+        refresh_trending()
+        self.assertEqual(trending_ids(), [str(self.bread.pk)])
+
+        response = self.client.get(reverse('hot_ads'), {'search': "Soap"})
+        self.assertEqual([row['ad']['title'] for row in response.data['results']], ["Soap"])
+        Advertisement.objects.create(title="Bread rolls", content="Discount", created_by=self.user)
+        response = self.client.get(reverse('hot_ads'), {'search': "Bread"})
+        self.assertEqual([row['ad']['title'] for row in response.data['results']], ["Bread", "Bread rolls"])
+
+    def test_location_falls_back_to_recent_views_before_the_first_refresh(self):
+        response = self.client.get(reverse('hot_ads'), {'location': "Bole"})
+        self.assertEqual([row['ad']['title'] for row in response.data['results']], ["Soap", "Tea"])
+
+@override_settings(DASHBOARD_ROLLUP_LAG=0)
+class LocationStatsTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="marketer", email="marketer@example.com", password="pass")
+        self.client.force_authenticate(self.user)
+        self.bole = [Beacon.objects.create(name=f"Bole {i}", location_name="Bole") for i in range(2)]
+        self.piassa = Beacon.objects.create(name="Piassa 1", location_name="Piassa")
+        self.soap = Advertisement.objects.create(title="Soap", content="Discount", created_by=self.user)
+        self.bread = Advertisement.objects.create(title="Bread", content="Fresh", created_by=self.user)
+
+    def deliver(self, beacon, ad, count=1):
+        for _ in range(count):
+            AdvertisementLog.objects.create(beacon=beacon, advertisement=ad)
+
+    def test_rollup_groups_deliveries_by_location(self):
+        self.deliver(self.bole[0], self.soap, 2)
+        self.deliver(self.bole[1], self.soap)
+        self.deliver(self.bole[1], self.bread)
+        self.deliver(self.piassa, self.bread)
+        self.assertEqual(refresh_rollups()['location_deliveries'], 5)
+
+        self.deliver(self.piassa, self.bread)
+        self.assertEqual(refresh_rollups()['location_deliveries'], 1)
+        rows = LocationDailyStats.objects.values_list('location_name', 'advertisement__title', 'deliveries')
+        self.assertEqual(sorted(rows), [("Bole", "Bread", 1), ("Bole", "Soap", 3), ("Piassa", "Bread", 2)])
+
+    def test_late_logs_are_folded_into_the_location_rollup(self):
+        refresh_rollups()
+        ingest_logs([{'beacon': self.piassa.pk, 'advertisement': self.soap.pk, 'timestamp': now() - timedelta(hours=1)}])
+        stats = LocationDailyStats.objects.get(location_name="Piassa")
+        self.assertEqual((stats.advertisement_id, stats.deliveries), (self.soap.pk, 1))
+        self.assertEqual(refresh_rollups()['location_deliveries'], 0)
+
+    def test_api_returns_top_ads_per_location_from_the_rollup(self):
+        self.deliver(self.bole[0], self.soap, 3)
+        self.deliver(self.bole[1], self.bread)
+        self.deliver(self.piassa, self.bread, 2)
+        AdView.objects.create(user=self.user, ad=self.soap, viewed=True)
+        refresh_rollups()
+
+        # rollup aggregate + top ads with their counters
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('location-stats'), {'top': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(row['location_name'], row['deliveries']) for row in response.data], [("Bole", 4), ("Piassa", 2)])
+        self.assertEqual(len(response.data[0]['top_ads']), 1)
+        self.assertEqual(response.data[0]['top_ads'][0]['title'], "Soap")
+        self.assertEqual(response.data[0]['top_ads'][0]['deliveries'], 3)
+        self.assertEqual(response.data[0]['top_ads'][0]['views'], 1)
+
+        response = self.client.get(reverse('location-stats'), {'location': "Piassa"})
+        self.assertEqual([row['location_name'] for row in response.data], ["Piassa"])
+        self.assertEqual(self.client.get(reverse('location-stats'), {'days': 0}).status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,122 @@
+import heapq
+from collections import defaultdict
+from datetime import timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.utils.timezone import now
+from core.advertisements.interactions import INTERACTIONS
+from core.assignments.models import AdvertisementAssignment
+from .counters import COUNTERS, counted
+
+SLOT_KEY = 'trending_slot:{}'
+TOP_KEY = 'trending_top'
+HOUR = timedelta(hours=1)
+
+def hour_of(moment):
+    return moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+class HourlyRing:
+    """Per-ad engagement counts of the last `hours` hours in the shared cache, one entry per hour.
+
+    Hour h is stored in slot h mod `hours` together with the hour it holds, so a slot
+    still holding an older hour reads as missing and the ring advances without a sweep.
+    Counts are {advertisement id: [views, clicks, likes, saves]}.
+    """
+
+    def __init__(self, hours):
+        self.hours = hours
+
+    def key(self, hour):
+        return SLOT_KEY.format(int(hour.timestamp()) // 3600 % self.hours)
+
+    def get_many(self, hours):
+        """{hour: counts, or None when the hour is not stored}."""
+        entries = cache.get_many([self.key(hour) for hour in hours])
+        slots = {}
+        for hour in hours:
+            entry = entries.get(self.key(hour))
+            slots[hour] = entry[1] if entry is not None and entry[0] == hour else None
+        return slots
+
+    def set_many(self, slots):
+        cache.set_many({self.key(hour): (hour, counts) for hour, counts in slots.items()}, None)
+
+def count_hours(start, end):
+    """{hour: counts} of every hour in [start, end), counted from the interaction tables."""
+    slots = {}
+    hour = start
+    while hour < end:
+        slots[hour] = {}
+        hour += HOUR
+    for position, kind in enumerate(COUNTERS.values()):
+        timestamp = INTERACTIONS[kind][2]
+        rows = (
+            counted(kind).filter(**{f'{timestamp}__gte': start, f'{timestamp}__lt': end})
+            .annotate(hour=TruncHour(timestamp, tzinfo=dt_timezone.utc))
+            .values_list('ad_id', 'hour').annotate(total=Count('pk')).order_by()
+        )
+        for ad_id, hour, total in rows:
+            counts = slots[hour].setdefault(str(ad_id), [0] * len(COUNTERS))
+            counts[position] = total
+    return slots
+
+def scores(slots, current):
+    """Decayed score per ad: weighted engagement, halved every TRENDING_HALF_LIFE_HOURS of age."""
+    weights = [settings.TRENDING_WEIGHTS[counter] for counter in COUNTERS]
+    totals = defaultdict(float)
+    for hour, counts in slots.items():
+        decay = 0.5 ** ((current - hour) / HOUR / settings.TRENDING_HALF_LIFE_HOURS)
+        for ad_id, values in counts.items():
+            totals[ad_id] += decay * sum(weight * value for weight, value in zip(weights, values))
+    return totals
+
+def top(totals, ad_ids=None, k=None):
+    """Ids of the k best scored ads (optionally among `ad_ids`), best first; a heap of size k."""
+    candidates = totals.items() if ad_ids is None else ((ad_id, totals[ad_id]) for ad_id in ad_ids if ad_id in totals)
+    return [ad_id for ad_id, _ in heapq.nlargest(k or settings.TRENDING_TOP_K, candidates, key=lambda item: item[1])]
+
+def location_ads(when):
+    """{location name: ids of the ads currently assigned to a beacon there}."""
+    ads = defaultdict(set)
+    rows = AdvertisementAssignment.objects.filter(start_date__lte=when, end_date__gte=when).values_list(
+        'beacon__location_name', 'advertisement_id'
+    )
+    for location, ad_id in rows:
+        ads[location].add(str(ad_id))
+    return ads
+
+def refresh_trending():
+    """Update the hourly ring and store the global and per-location top TRENDING_TOP_K.
+
+    Only the current and the previous hour are recounted on every run (plus hours
+    missing from the cache); older hours are final. Returns the number of ads scored.
+    """
+    moment = now()
+    current = hour_of(moment)
+    ring = HourlyRing(settings.TRENDING_WINDOW_HOURS)
+    hours = [current - offset * HOUR for offset in range(settings.TRENDING_WINDOW_HOURS)]
+    slots = ring.get_many(hours)
+
+    stale = [hour for hour, counts in slots.items() if counts is None or hour >= current - HOUR]
+    counted_slots = {hour: counts for hour, counts in count_hours(min(stale), current + HOUR).items() if hour in stale}
+    ring.set_many(counted_slots)
+    slots.update(counted_slots)
+
+    totals = scores(slots, current)
+    cache.set(TOP_KEY, {
+        'computed_at': moment,
+        'global': top(totals),
+        'locations': {location: top(totals, ad_ids) for location, ad_ids in location_ads(moment).items()},
+    }, None)
+    return len(totals)
+
+def trending_ids(location=None):
+    """Ad ids trending overall or at `location`, best first; None before the first refresh."""
+    entry = cache.get(TOP_KEY)
+    if entry is None:
+        return None
+    if location is None:
+        return entry['global']
+    return entry['locations'].get(location, [])
@@ -1,9 +1,11 @@
 from django.urls import path
 from .views import BeaconCount, BeaconLocationCount, BeaconMessageCountView, LogCount, PopularAdsView, ClicksPerDayAPIView, ImpressionsPerDayAPIView
+from .views import LocationStatsView
 
 urlpatterns = [
     path('count/', BeaconCount.as_view(), name='beacon_count'),
     path('location-count/', BeaconLocationCount.as_view(), name='location_count'),
+    path('locations/', LocationStatsView.as_view(), name='location-stats'),
     path('message-count/', BeaconMessageCountView.as_view(), name='message_count'),
     path('log-count/', LogCount.as_view(), name='log_count'),
     path('hot-ads/', PopularAdsView.as_view(), name='hot_ads'),
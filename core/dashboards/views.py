@@ -1,5 +1,4 @@
-from django.db.models import Count, Q
-from django.db.models.functions import TruncDate
+from django.db.models import Case, F, Sum, Value, When
 from drf_spectacular.types import OpenApiTypes
 from rest_framework import status
 from rest_framework.response import Response
@@ -8,13 +7,18 @@ from core.beacons.models import Beacon
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
-from core.beacon_messages.models import BeaconMessage
 from core.beacon_messages.serializers import BeaconMessageCountSerializer
-from core.logs.models import AdvertisementLog
-from django.utils.timezone import now, timedelta
-from core.advertisements.models import Advertisement, AdView, AdClick, AdSaved, AdLike
-from core.advertisements.serializers import AdvertisementSerializer
+from django.utils.timezone import localdate, now, timedelta
+from core.advertisements.models import Advertisement
+from core.assignments.models import AdvertisementAssignment
+from core.advertisements.interactions import interaction_rows
+from core.advertisements.search import search_ads
+from core.advertisements.serializers import AdInteractionSerializer
 from core.advertisements.views import CustomPagination
+from .models import AdDailyStats, BeaconDailyStats
+from .rollups import deliveries_since, location_stats
+from .serializers import LocationStatsQuerySerializer, LocationStatsSerializer
+from .trending import trending_ids
 
 
 class BeaconCount(APIView):
@@ -99,6 +103,42 @@ class BeaconLocationCount(APIView):
 
         return Response({'total_locations': total_locations}, status=status.HTTP_200_OK)
 
+class LocationStatsView(APIView):
+    """Delivery volume and top advertisements per beacon location."""
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=['Analytics'],
+        summary="Get Per-Location Delivery Stats",
+        description="""
+            Returns, for every beacon location, the number of advertisement deliveries over the last
+            `days` days (default 7) and its `top` advertisements by deliveries (default 5), busiest
+            location first. Each advertisement carries its overall views, clicks, likes and saves;
+            interactions are not recorded per location.
+
+            Served from the per-location daily rollup, which trails real time by a few minutes.
+
+            **Example Request:**
+            ```
+            GET /api/v1/dashboards/locations/?days=30&top=3&location=Bole
+            ```
+        """,
+        parameters=[LocationStatsQuerySerializer],
+        responses={
+            200: LocationStatsSerializer(many=True),
+            400: OpenApiResponse(description="Invalid days or top"),
+        }
+    )
+    def get(self, request):
+        query = LocationStatsQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = query.validated_data
+
+        since = localdate() - timedelta(days=params['days'] - 1)
+        stats = location_stats(since, params['top'], params.get('location'))
+        return Response(LocationStatsSerializer(stats, many=True).data)
+
 class BeaconMessageCountView(generics.ListAPIView):
     """ API endpoint to get the total beacon_messages sent by each beacon per day. """
     serializer_class = BeaconMessageCountSerializer
@@ -107,13 +147,12 @@ class BeaconMessageCountView(generics.ListAPIView):
         """Filter beacon_messages based on the optional `date` query parameter."""
         date_filter = self.request.GET.get('date')
 
-        queryset = BeaconMessage.objects.all()
+        queryset = BeaconDailyStats.objects.filter(messages__gt=0)
         if date_filter:
-            queryset = queryset.filter(sent_at__date=date_filter)
+            queryset = queryset.filter(date=date_filter)
 
         return (
-            queryset.values('beacon__beacon_id', 'beacon__name', date=TruncDate('sent_at'))
-            .annotate(total_messages=Count('message_id'))
+            queryset.values('beacon__beacon_id', 'beacon__name', 'date', total_messages=F('messages'))
             .order_by('date')
         )
 
@@ -121,7 +160,8 @@ class BeaconMessageCountView(generics.ListAPIView):
         tags=['Analytics'],
         summary="Retrieve beacon message counts per day",
         description="Returns a list of beacons with the total number of beacon messages sent each day. "
-                    "Optionally, filter results by a specific date.",
+                    "Optionally, filter results by a specific date. Served from the daily rollup, "
+                    "which trails real time by a few minutes.",
         parameters=[
             OpenApiParameter(
                 name="date",
@@ -156,8 +196,8 @@ class LogCount(APIView):
     def get(self, request, *args, **kwargs):
         # Calculate 24 hours ago from the current time
         start_date = now() - timedelta(days=1)
-        # Count the advertisement logs created in the past 24 hours
-        recent_advertisements = AdvertisementLog.objects.filter(timestamp__gte=start_date).count()
+        # Count the advertisement logs created in the past 24 hours, whole days come from the rollup
+        recent_advertisements = deliveries_since(start_date)
 
         if not recent_advertisements:
             return Response({'message': 'No logs found'}, status=404)
@@ -167,9 +207,11 @@ class LogCount(APIView):
 @extend_schema(
         tags=["Analytics"],
         summary="Get Top 10 Popular Ads",
-        description="Returns the top 10 most viewed advertisements in the past 7 days, "
-                    "ranked by view count. You can optionally filter ads using the `search` query "
-                    "parameter, which matches both title and content.",
+        description="Returns the top 10 trending advertisements: views, clicks, likes and saves of the "
+                    "past week, weighted and decayed by age. The ranking is refreshed every few minutes; "
+                    "until it is available, ads are ranked by views in the past 7 days. You can optionally "
+                    "filter ads using the `search` query parameter, which matches both title and content, "
+                    "and restrict them to ads running at a beacon location with `location`.",
         parameters=[
             OpenApiParameter(
                 name="search",
@@ -177,6 +219,12 @@ class LogCount(APIView):
                 required=False,
                 type=str
             ),
+            OpenApiParameter(
+                name="location",
+                description="Beacon location name; only ads currently assigned to a beacon there",
+                required=False,
+                type=str
+            ),
         ],
         responses={
             200: OpenApiResponse(
@@ -186,59 +234,42 @@ class LogCount(APIView):
         }
     )
 class PopularAdsView(generics.ListAPIView):
-    """Fetch top 10 most viewed ads in the last 7 days."""
+    """Fetch the top 10 trending ads, overall or at one location."""
     permission_classes = [IsAuthenticated]
     pagination_class = CustomPagination
 
     def get_queryset(self):
-        last_week = now() - timedelta(days=7)
         qs = Advertisement.objects.all()
 
         # Optional search filtering
         query = self.request.GET.get('search')
-        if query:
-            qs = qs.filter(
-                Q(title__icontains=query) |
-                Q(content__icontains=query)
-            )
-
-        # Annotate with view count and order
-        popular_ads = qs.annotate(
-            engagement_score=Count(
-                'views',
-                filter=Q(views__viewed=True, views__viewed_at__gte=last_week)
-            )
-        ).order_by('-engagement_score', '-created_at')[:10]
-
-        return popular_ads
+        qs = search_ads(qs, query, rank=False)
+
+        location = self.request.GET.get('location')
+        ranked = trending_ids(location)
+        if ranked:
+            # precomputed by the trending task: only the top ads are fetched, by primary key
+            order = Case(*[When(pk=ad_id, then=Value(position)) for position, ad_id in enumerate(ranked)])
+            trending = list(qs.filter(pk__in=ranked).order_by(order)[:10])
+            # fewer than 10 ads with engagement, or a search matching ads outside the top ones:
+            # fill up from the recent views
+            return trending + list(self.recent(qs.exclude(pk__in=ranked), location)[:10 - len(trending)])
+        return self.recent(qs, location)[:10]
+
+    @staticmethod
+    def recent(qs, location):
+        """Ads by their stored 7-day view counter (AdStats), read through its index."""
+        if location:
+            current = now()
+            qs = qs.filter(pk__in=AdvertisementAssignment.objects.filter(
+                beacon__location_name=location, start_date__lte=current, end_date__gte=current
+            ).values('advertisement_id'))
+        return qs.order_by(F('stats__views_7d').desc(nulls_last=True), '-created_at')
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        user = request.user
-        result = []
-
-        for ad in queryset:
-            view = AdView.objects.filter(user=user, ad=ad).first()
-            like = AdLike.objects.filter(user=user, ad=ad).first()
-            click = AdClick.objects.filter(user=user, ad=ad).first()
-            save = AdSaved.objects.filter(user=user, ad=ad).first()
-
-            data = {
-                'ad': AdvertisementSerializer(ad, context={'request': request}).data,
-                'viewed': view.viewed if view else False,
-                'viewed_at': view.viewed_at if view else None,
-                'liked': like.liked if like else False,
-                'liked_at': like.liked_at if like else None,
-                'clicked': click.clicked if click else False,
-                'clicked_at': click.clicked_at if click else None,
-                'saved': save.saved if save else False,
-                'saved_at': save.saved_at if save else None,
-            }
-
-            result.append(data)
-
-        page = self.paginate_queryset(result)
-        return self.get_paginated_response(page)
+        page = self.paginate_queryset(self.get_queryset())
+        rows = interaction_rows(request.user, page)
+        return self.get_paginated_response(AdInteractionSerializer(rows, many=True, context={'request': request}).data)
 
 class ClicksPerDayAPIView(APIView):
     """
@@ -247,7 +278,8 @@ class ClicksPerDayAPIView(APIView):
     @extend_schema(
         tags=['Analytics'],
         summary="Retrieve Clicks Per Day",
-        description="Returns the number of advertisement clicks per day, grouped by date.",
+        description="Returns the number of advertisement clicks per day, grouped by date. "
+                    "Served from the daily rollup, which trails real time by a few minutes.",
         responses={200:
             {
                 "type": "array",
@@ -269,10 +301,10 @@ class ClicksPerDayAPIView(APIView):
         }
     )
     def get(self, request):
-        clicks_per_day = AdClick.objects.annotate(date=TruncDate('clicked_at')) \
-                                      .values('clicked_at') \
-                                      .annotate(total_clicks=Count('ad')) \
-                                      .order_by('-clicked_at')
+        clicks_per_day = AdDailyStats.objects.values(clicked_at=F('date')) \
+                                             .annotate(total_clicks=Sum('clicks')) \
+                                             .filter(total_clicks__gt=0) \
+                                             .order_by('-clicked_at')
 
         return Response(clicks_per_day)
 
@@ -283,7 +315,8 @@ class ImpressionsPerDayAPIView(APIView):
     @extend_schema(
         tags=['Analytics'],
         summary="Retrieve impressions Per Day",
-        description="Returns the number of advertisement views per day, grouped by date.",
+        description="Returns the number of advertisement views per day, grouped by date. "
+                    "Served from the daily rollup, which trails real time by a few minutes.",
         responses={200:
             {
                 "type": "array",
@@ -305,10 +338,10 @@ class ImpressionsPerDayAPIView(APIView):
         }
     )
     def get(self, request):
-        views_per_day = AdView.objects.annotate(date=TruncDate('viewed_at')) \
-                                      .values('viewed_at') \
-                                      .annotate(total_views=Count('ad')) \
-                                      .order_by('-date')
+        views_per_day = AdDailyStats.objects.values(viewed_at=F('date')) \
+                                            .annotate(total_views=Sum('views')) \
+                                            .filter(total_views__gt=0) \
+                                            .order_by('-viewed_at')
 
         return Response(views_per_day)
 
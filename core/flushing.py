@@ -0,0 +1,53 @@
+import atexit
+import logging
+import threading
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+class FlushTimer:
+    """Calls `flush` in a background thread `interval()` seconds after start(), and at exit.
+
+    Per-process write-behind buffers arm it when they stop being empty, so their
+    durability window holds even when no later request comes along to flush them and
+    the Celery beat task, running in another process, cannot see them.
+    """
+
+    def __init__(self, flush, interval):
+        self.flush = flush
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._timer = None
+        atexit.register(self.run)
+
+    def start(self):
+        """Arm the timer unless it is already armed."""
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.interval(), self.fire)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def cancel(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def fire(self):
+        with self._lock:
+            self._timer = None
+        try:
+            if not self.run():
+                self.start()  # the flush failed and put its items back: try again after another interval
+        finally:
+            connections.close_all()  # this thread's connections only
+
+    def run(self):
+        """Flush now. Returns False when the flush raised (the error is logged)."""
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Flushing %s failed', getattr(self.flush, '__qualname__', self.flush))
+            return False
+        return True
@@ -0,0 +1,47 @@
+import csv
+import json
+from django.conf import settings
+from core.logs.models import AdvertisementLog
+
+EXPORT_FIELDS = ['log_id', 'timestamp', 'beacon_id', 'beacon__name', 'advertisement_id', 'advertisement__title']
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+class Echo:
+    """File-like object for csv.writer that hands each line back instead of storing it."""
+
+    def write(self, value):
+        return value
+
+def export_rows(start=None, end=None, beacon_id=None):
+    """Yield log rows as tuples of EXPORT_FIELDS, `LOG_EXPORT_CHUNK_SIZE` rows per database fetch.
+
+    `start` is inclusive and `end` exclusive. Rows come from a server-side cursor, so only
+    one chunk is held in memory at a time.
+    """
+    qs = AdvertisementLog.objects.all()
+    if start:
+        qs = qs.filter(timestamp__gte=start)
+    if end:
+        qs = qs.filter(timestamp__lt=end)
+    if beacon_id:
+        qs = qs.filter(beacon_id=beacon_id)
+    return qs.order_by('log_id').values_list(*EXPORT_FIELDS).iterator(chunk_size=settings.LOG_EXPORT_CHUNK_SIZE)
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for log_id, timestamp, *rest in rows:
+        yield writer.writerow([log_id, timestamp.isoformat(), *rest])
+
+def stream_ndjson(rows):
+    for log_id, timestamp, beacon_id, beacon_name, advertisement_id, advertisement_title in rows:
+        yield json.dumps({
+            'log_id': log_id,
+            'timestamp': timestamp.isoformat(),
+            'beacon_id': str(beacon_id),
+            'beacon__name': beacon_name,
+            'advertisement_id': str(advertisement_id),
+            'advertisement__title': advertisement_title,
+        }) + '\n'
+
+STREAMERS = {'csv': stream_csv, 'ndjson': stream_ndjson}
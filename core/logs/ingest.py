@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+from core.advertisements.models import Advertisement
+from core.beacons.models import Beacon
+from core.dashboards.rollups import add_late_events
+from core.logs.models import AdvertisementLog
+from core.versioned import VersionedIndex
+
+VERSION_KEY = 'log_ingest_ids_version'
+
+class KnownIds:
+    """In-process beacon and advertisement ids validating log batches, reloaded after one is created or deleted."""
+
+    def __init__(self):
+        self._ids = VersionedIndex(VERSION_KEY)
+        self.beacons = frozenset()
+        self.advertisements = frozenset()
+
+    def load(self):
+        return (
+            frozenset(Beacon.objects.values_list('beacon_id', flat=True)),
+            frozenset(Advertisement.objects.values_list('advertisement_id', flat=True)),
+        )
+
+    def refresh(self):
+        self.beacons, self.advertisements = self._ids.get(self.load)
+        return self
+
+    def invalidate(self):
+        self._ids.invalidate()
+
+known_ids = KnownIds()
+
+def ingest_logs(entries):
+    """Bulk insert delivery logs given as {beacon, advertisement, timestamp} dicts.
+
+    Entries naming an unknown beacon or advertisement are skipped. The rest are written
+    with bulk_create in chunks of LOG_INGEST_BATCH_SIZE inside one transaction. Returns
+    the number of logs created and the sorted unknown beacon and advertisement ids.
+    """
+    ids = known_ids.refresh()
+    received_at = now()
+    logs = [
+        AdvertisementLog(beacon_id=entry['beacon'], advertisement_id=entry['advertisement'],
+                         timestamp=entry.get('timestamp') or received_at)
+        for entry in entries
+        if entry['beacon'] in ids.beacons and entry['advertisement'] in ids.advertisements
+    ]
+
+    with transaction.atomic():
+        AdvertisementLog.objects.bulk_create(logs, batch_size=settings.LOG_INGEST_BATCH_SIZE)
+        add_late_events(AdvertisementLog, logs)
+
+    unknown_beacons = {entry['beacon'] for entry in entries} - ids.beacons
+    unknown_ads = {entry['advertisement'] for entry in entries} - ids.advertisements
+    return len(logs), sorted(unknown_beacons, key=str), sorted(unknown_ads, key=str)
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import now
+from core.logs.partitions import (PARTITIONED_TABLES, add_months, month_of, partition_name, is_supported,
+                                  create_partition, expired_months, retire_partition)
+
+class Command(BaseCommand):
+    help = "Create upcoming monthly partitions of the log and message tables and retire expired ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=settings.PARTITION_MONTHS_AHEAD,
+                            help="Months after the current one to create partitions for.")
+        parser.add_argument('--retention-months', type=int, default=settings.PARTITION_RETENTION_MONTHS,
+                            help="Full months to keep before the current one; older partitions are retired.")
+        parser.add_argument('--drop', action='store_true',
+                            help="Drop expired partitions instead of only detaching them.")
+        parser.add_argument('--dry-run', action='store_true', help="Only print what would be done.")
+
+    def handle(self, *args, **options):
+        if not is_supported():
+            raise CommandError("Table partitioning requires PostgreSQL.")
+
+        current = month_of(now())
+        for spec in PARTITIONED_TABLES:
+            for offset in range(options['months_ahead'] + 1):
+                month = add_months(current, offset)
+                if options['dry_run']:
+                    self.stdout.write(f"Would ensure {partition_name(spec, month)}")
+                elif create_partition(spec, month):
+                    self.stdout.write(self.style.SUCCESS(f"Created {partition_name(spec, month)}"))
+
+            for month in expired_months(spec, options['retention_months']):
+                action = "Dropped" if options['drop'] else "Detached"
+                if options['dry_run']:
+                    self.stdout.write(f"Would retire {partition_name(spec, month)}")
+                    continue
+                retire_partition(spec, month, drop=options['drop'])
+                self.stdout.write(self.style.SUCCESS(f"{action} {partition_name(spec, month)}"))
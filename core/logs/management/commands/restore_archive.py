@@ -0,0 +1,29 @@
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from core.logs.retention import RETENTION_FIELDS, restore_archive
+
+class Command(BaseCommand):
+    help = "Re-ingest rows from archives written by the retention task."
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+',
+                            help="Archive files (*.ndjson.gz) or directories to search for them.")
+        parser.add_argument('--batch-size', type=int, default=None, help="Rows per INSERT statement.")
+
+    def handle(self, *args, **options):
+        files = []
+        for path in map(Path, options['paths']):
+            if path.is_dir():
+                files.extend(sorted(path.rglob('*.ndjson.gz')))
+            elif path.is_file():
+                files.append(path)
+            else:
+                raise CommandError(f"{path} does not exist.")
+
+        for path in files:
+            if path.parent.name not in RETENTION_FIELDS:
+                raise CommandError(f"{path} is not inside a <app_label>.<Model> archive directory.")
+
+        for path in files:
+            restored = restore_archive(path, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Restored {restored} rows from {path}"))
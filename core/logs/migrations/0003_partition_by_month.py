@@ -0,0 +1,22 @@
+from django.db import migrations
+from core.logs.partitions import ADVERTISEMENT_LOGS, convert_to_partitioned
+
+
+def partition_logs(apps, schema_editor):
+    # native range partitioning is Postgres only; other databases keep the plain table
+    if schema_editor.connection.vendor == 'postgresql':
+        convert_to_partitioned(schema_editor, ADVERTISEMENT_LOGS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0002_log_timestamp_default'),
+        ('beacons', '0001_initial'),
+        ('advertisements', '0004_user_interaction_time_indexes'),
+    ]
+
+    operations = [
+        # not reversed: the partitioned table keeps working with the earlier model state
+        migrations.RunPython(partition_logs, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils.timezone import now
 from core.beacons.models import Beacon
 from core.advertisements.models import Advertisement
 
@@ -6,7 +7,8 @@ class AdvertisementLog(models.Model):
     log_id = models.BigAutoField(primary_key=True)
     beacon = models.ForeignKey(Beacon, on_delete=models.CASCADE, to_field='beacon_id', related_name='logs')
     advertisement = models.ForeignKey(Advertisement, on_delete=models.CASCADE, to_field='advertisement_id', related_name='log')
-    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    # not auto_now_add: bulk ingestion keeps the delivery time reported by the phone
+    timestamp = models.DateTimeField(default=now, editable=False, db_index=True)
 
     def __str__(self):
         return f"Delivery: {self.advertisement.title} from {self.beacon.location_name} at {self.timestamp}"
@@ -0,0 +1,145 @@
+from collections import namedtuple
+from datetime import date
+from django.db import connection, transaction
+from django.utils.timezone import now
+
+# parent table, partition key, integer identity column to carry over (or None)
+PartitionedTable = namedtuple('PartitionedTable', ['table', 'column', 'identity'])
+
+ADVERTISEMENT_LOGS = PartitionedTable('logs_advertisementlog', 'timestamp', 'log_id')
+BEACON_MESSAGES = PartitionedTable('beacon_messages_beaconmessage', 'sent_at', None)
+PARTITIONED_TABLES = [ADVERTISEMENT_LOGS, BEACON_MESSAGES]
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+def month_of(day):
+    return date(day.year, day.month, 1)
+
+def partition_name(spec, month):
+    return f'{spec.table}_p{month:%Y_%m}'
+
+def default_partition_name(spec):
+    return f'{spec.table}_default'
+
+def bounds(month):
+    """Partition bounds as UTC timestamps, independent of the session time zone."""
+    return f'{month:%Y-%m-%d} 00:00:00+00', f'{add_months(month, 1):%Y-%m-%d} 00:00:00+00'
+
+def is_supported():
+    return connection.vendor == 'postgresql'
+
+def convert_to_partitioned(schema_editor, spec, months_ahead=3):
+    """Rebuild an existing table as a table partitioned by month on `spec.column`.
+
+    Postgres requires the partition key in the primary key, so the primary key becomes
+    (pk, column); the pk stays unique through its default/identity. Secondary indexes and
+    foreign keys are recreated under their original names, so later Django migrations
+    still find them. Rows are copied into monthly partitions spanning the existing data;
+    anything outside the created months lands in the default partition.
+    """
+    table, column = spec.table, spec.column
+    legacy = f'{table}_unpartitioned'
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i
+            WHERE i.indrelid = %s::regclass AND NOT i.indisprimary AND NOT i.indisunique
+        """, [table])
+        index_defs = [row[0] for row in cursor.fetchall()]
+        cursor.execute("""
+            SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype = 'f'
+        """, [table])
+        foreign_keys = cursor.fetchall()
+        cursor.execute("""
+            SELECT a.attname FROM pg_index i
+            JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+            WHERE i.indrelid = %s::regclass AND i.indisprimary
+        """, [table])
+        pk = cursor.fetchone()[0]
+        cursor.execute(f'SELECT min("{column}") FROM "{table}"')
+        oldest = cursor.fetchone()[0]
+
+        cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+        cursor.execute(f"""
+            CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS INCLUDING IDENTITY)
+            PARTITION BY RANGE ("{column}")
+        """)
+        cursor.execute(f'CREATE TABLE "{default_partition_name(spec)}" PARTITION OF "{table}" DEFAULT')
+
+    first = month_of(oldest) if oldest else month_of(now())
+    month, last = first, add_months(month_of(now()), months_ahead)
+    while month <= last:
+        create_partition(spec, month, schema_editor.connection)
+        month = add_months(month, 1)
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO "{table}" SELECT * FROM "{legacy}"')
+        if spec.identity:
+            cursor.execute(f"""
+                SELECT setval(pg_get_serial_sequence('"{table}"', '{spec.identity}'),
+                              COALESCE(max("{spec.identity}"), 0) + 1, false)
+                FROM "{table}"
+            """)
+        cursor.execute(f'DROP TABLE "{legacy}"')
+
+        cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_pkey" PRIMARY KEY ("{pk}", "{column}")')
+        for definition in index_defs:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition}')
+
+def create_partition(spec, month, conn=connection):
+    """Create the partition of `month` if missing. Returns True when it was created.
+
+    Rows of that month already sitting in the default partition are moved into the new
+    partition before it is attached, otherwise Postgres would refuse the new bounds.
+    """
+    name = partition_name(spec, month)
+    start, end = bounds(month)
+    default = default_partition_name(spec)
+    with transaction.atomic(using=conn.alias), conn.cursor() as cursor:
+        cursor.execute('SELECT to_regclass(%s)', [name])
+        if cursor.fetchone()[0] is not None:
+            return False
+
+        cursor.execute(f'CREATE TABLE "{name}" (LIKE "{spec.table}" INCLUDING DEFAULTS)')
+        cursor.execute(f"""
+            WITH moved AS (
+                DELETE FROM "{default}" WHERE "{spec.column}" >= %s AND "{spec.column}" < %s RETURNING *
+            )
+            INSERT INTO "{name}" SELECT * FROM moved
+        """, [start, end])
+        # DDL takes no bind parameters; the bounds are built from dates above
+        cursor.execute(f"""ALTER TABLE "{spec.table}" ATTACH PARTITION "{name}" FOR VALUES FROM ('{start}') TO ('{end}')""")
+    return True
+
+def partition_months(spec, conn=connection):
+    """Months that currently have an attached partition, oldest first."""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = %s::regclass
+        """, [spec.table])
+        names = [row[0] for row in cursor.fetchall()]
+    prefix = f'{spec.table}_p'
+    months = []
+    for name in names:
+        if name.startswith(prefix):
+            year, month = name[len(prefix):].split('_')
+            months.append(date(int(year), int(month), 1))
+    return sorted(months)
+
+def expired_months(spec, retention_months, today=None, conn=connection):
+    """Attached months that end before the retention window of `retention_months` months."""
+    cutoff = add_months(month_of(today or now()), -retention_months)
+    return [month for month in partition_months(spec, conn) if month < cutoff]
+
+def retire_partition(spec, month, drop=False, conn=connection):
+    """Detach the partition of `month` from its table, and drop it when `drop` is set."""
+    name = partition_name(spec, month)
+    with conn.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{spec.table}" DETACH PARTITION "{name}"')
+        if drop:
+            cursor.execute(f'DROP TABLE "{name}"')
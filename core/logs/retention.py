@@ -0,0 +1,112 @@
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.timezone import now
+
+# model label -> timestamp field deciding when a row expires
+RETENTION_FIELDS = {
+    'logs.AdvertisementLog': 'timestamp',
+    'beacon_messages.BeaconMessage': 'sent_at',
+    'notifications.Notification': 'created_at',
+    'beacons.BeaconTelemetry': 'recorded_at',
+}
+
+class ArchiveEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder cuts datetimes to milliseconds; archives keep full precision."""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+def archive_path(label, started, batch):
+    return Path(settings.ARCHIVE_DIR) / label / f'{started:%Y%m%dT%H%M%S}-{batch:05d}.ndjson.gz'
+
+def write_archive(path, rows):
+    """Write rows as gzip NDJSON; the file only appears under its name once complete."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + '.part')
+    with gzip.open(partial, 'wt', encoding='utf-8') as archive:
+        for row in rows:
+            archive.write(json.dumps(row, cls=ArchiveEncoder) + '\n')
+        archive.flush()
+        os.fsync(archive.fileno())
+    os.replace(partial, path)
+
+def archive_expired(label, days, batch_size=None, started=None):
+    """Archive and delete rows of `label` older than `days`, one bounded batch at a time.
+
+    Each batch of at most RETENTION_BATCH_SIZE rows is written to its own archive file
+    before exactly those primary keys are deleted in a short transaction, so no lock is
+    held for longer than one batch. Returns the number of rows archived.
+    """
+    model = apps.get_model(label)
+    field = RETENTION_FIELDS[label]
+    batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+    started = started or now()
+    columns = [f.attname for f in model._meta.concrete_fields]
+    expired = model.objects.filter(**{f'{field}__lt': started - timedelta(days=days)}).order_by('pk')
+
+    archived = batch = 0
+    while True:
+        rows = list(expired.values(*columns)[:batch_size])
+        if not rows:
+            return archived
+        write_archive(archive_path(label, started, batch), rows)
+        with transaction.atomic():
+            model.objects.filter(pk__in=[row[model._meta.pk.attname] for row in rows]).delete()
+        archived += len(rows)
+        batch += 1
+
+def apply_retention():
+    """Run archive_expired for every model with a retention period. Returns {label: rows archived}."""
+    return {
+        label: archive_expired(label, days)
+        for label, days in settings.RETENTION_DAYS.items() if days
+    }
+
+def read_archive(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as archive:
+        for line in archive:
+            if line.strip():
+                yield json.loads(line)
+
+def restore_rows(label, rows):
+    """Insert archived rows again. Rows whose key already exists are skipped."""
+    model = apps.get_model(label)
+    fields = model._meta.concrete_fields
+    objects = [model(**{f.attname: f.to_python(row[f.attname]) for f in fields}) for row in rows]
+    existing = set(model.objects.filter(pk__in=[obj.pk for obj in objects]).values_list('pk', flat=True))
+    model.objects.bulk_create(objects, ignore_conflicts=True)
+    # bulk_create stamps auto_now_add fields with the current time; put the archived values
+    # back on the inserted rows only, rows that already existed keep theirs
+    stamped = [f for f in fields if getattr(f, 'auto_now_add', False) or getattr(f, 'auto_now', False)]
+    inserted = [(obj, row) for obj, row in zip(objects, rows) if obj.pk not in existing]
+    if stamped and inserted:
+        for obj, row in inserted:
+            for f in stamped:
+                setattr(obj, f.attname, f.to_python(row[f.attname]))
+        model.objects.bulk_update([obj for obj, _ in inserted], [f.name for f in stamped])
+    return len(objects)
+
+def restore_archive(path, batch_size=None):
+    """Restore one archive file written by archive_expired. Returns the number of rows read."""
+    path = Path(path)
+    label = path.parent.name
+    batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+    restored, batch = 0, []
+    with transaction.atomic():
+        for row in read_archive(path):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                restored += restore_rows(label, batch)
+                batch = []
+        if batch:
+            restored += restore_rows(label, batch)
+    return restored
@@ -13,4 +13,15 @@ class AdvertisementLogSerializer(serializers.ModelSerializer):
 class AdvertisementLogPartialSerializer(serializers.ModelSerializer):
     class Meta:
         model = AdvertisementLog
-        fields = ['advertisement']
\ No newline at end of file
+        fields = ['advertisement']
+
+class LogEntrySerializer(serializers.Serializer):
+    """One delivery recorded by a phone and synced later."""
+    beacon = serializers.UUIDField()
+    advertisement = serializers.UUIDField()
+    timestamp = serializers.DateTimeField(required=False)  # defaults to the time of the request
+
+class LogBatchResultSerializer(serializers.Serializer):
+    created = serializers.IntegerField()
+    unknown_beacon_ids = serializers.ListField(child=serializers.UUIDField())
+    unknown_ad_ids = serializers.ListField(child=serializers.UUIDField())
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from core.advertisements.models import Advertisement
+from core.beacons.models import Beacon
+from core.logs.ingest import known_ids
+
+@receiver(post_save, sender=Beacon)
+@receiver(post_save, sender=Advertisement)
+def add_known_id(sender, instance, created, **kwargs):
+    if created:
+        known_ids.invalidate()
+
+@receiver(post_delete, sender=Beacon)
+@receiver(post_delete, sender=Advertisement)
+def drop_known_id(sender, instance, **kwargs):
+    known_ids.invalidate()
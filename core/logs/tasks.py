@@ -0,0 +1,18 @@
+from celery import shared_task
+from django.core.management import call_command
+from .partitions import is_supported
+from .retention import apply_retention
+
+@shared_task
+def maintain_partitions():
+    """Create upcoming monthly partitions and detach expired ones."""
+    if not is_supported():
+        return "Partitioning needs PostgreSQL, skipped."
+    call_command('manage_partitions')
+    return "Partitions maintained."
+
+@shared_task
+def archive_expired_rows():
+    """Archive raw event rows past their retention period to gzip NDJSON and delete them."""
+    counts = apply_retention()
+    return f"Archived {sum(counts.values())} expired rows."
@@ -1,12 +1,27 @@
-from datetime import timedelta
+import json
+import tempfile
+from pathlib import Path
+from datetime import date, timedelta
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from uuid import uuid4
 from django.utils.timezone import now
 from rest_framework import status
 from rest_framework.test import APITestCase
-from core.beacons import Beacon
+from core.beacons.models import Beacon
 from core.advertisements.models import Advertisement
 from core.logs.models import AdvertisementLog
 from core.logs.serializers import AdvertisementLogSerializer
-from core.beacons import BaseAPITestCase
+from core.dashboards.models import AdDailyStats
+from core.dashboards.rollups import refresh_rollups
+from core.logs.partitions import ADVERTISEMENT_LOGS, add_months, bounds, partition_name
+from core.logs.retention import apply_retention, archive_expired, read_archive
+from core.advertisements.models import AdView
+from core.notifications.models import Notification
+from core.beacons.tests import BaseAPITestCase
 from django.urls import reverse
 
 class AdvertisementLogModelTest(APITestCase):
@@ -71,3 +86,152 @@ class AdvertisementLog(BaseAPITestCase):
         }
         response = self.client.post(self.logs_url, invalid_log, format="json")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+@override_settings(LOG_EXPORT_CHUNK_SIZE=2)
+class LogExportTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(username="marketer", email="marketer@example.com", password="pass")
+        self.client.force_authenticate(user)
+        self.url = reverse('log_export')
+        self.beacon = Beacon.objects.create(name="Beacon 1", location_name="Bole")
+        self.other = Beacon.objects.create(name="Beacon 2", location_name="Piassa")
+        ad = Advertisement.objects.create(title="Ybs Soap", content="30% discount", created_by=user)
+        self.logs = [self.beacon.logs.create(advertisement=ad) for _ in range(5)]
+        self.other.logs.create(advertisement=ad)
+
+    def test_csv_export_streams_all_rows(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'log_id,timestamp,beacon_id,beacon__name,advertisement_id,advertisement__title')
+        self.assertEqual(len(lines), 7)
+
+    def test_ndjson_export_filters_by_beacon_and_date(self):
+        today = now().date()
+        response = self.client.get(self.url, {
+            'output': 'ndjson', 'beacon': str(self.beacon.pk),
+            'start_date': today.isoformat(), 'end_date': today.isoformat(),
+        })
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['log_id'] for row in rows], [log.log_id for log in self.logs])
+        self.assertEqual({row['beacon_id'] for row in rows}, {str(self.beacon.pk)})
+
+        response = self.client.get(self.url, {'start_date': (today + timedelta(days=1)).isoformat()})
+        self.assertEqual(len(b''.join(response.streaming_content).decode().splitlines()), 1)
+
+    def test_invalid_filters(self):
+        self.assertEqual(self.client.get(self.url, {'output': 'xml'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'start_date': '03/01'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'beacon': 'nope'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+@override_settings(LOG_INGEST_BATCH_SIZE=2, DASHBOARD_ROLLUP_LAG=0)
+class LogBatchTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(username="phone", email="phone@example.com", password="pass")
+        self.client.force_authenticate(user)
+        self.url = reverse('log_batch')
+        self.beacon = Beacon.objects.create(name="Beacon 1", location_name="Bole")
+        self.ad = Advertisement.objects.create(title="Ybs Soap", content="30% discount", created_by=user)
+
+    def entry(self, **overrides):
+        return {"beacon": str(self.beacon.pk), "advertisement": str(self.ad.pk), **overrides}
+
+    def test_inserts_known_entries_and_reports_unknown_ids(self):
+        delivered_at = now() - timedelta(hours=5)
+        unknown_beacon, unknown_ad = uuid4(), uuid4()
+        entries = [self.entry(timestamp=delivered_at.isoformat()) for _ in range(5)]
+        entries += [self.entry(beacon=str(unknown_beacon)), self.entry(advertisement=str(unknown_ad))]
+
+        response = self.client.post(self.url, entries, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {"created": 5, "unknown_beacon_ids": [unknown_beacon],
+                                         "unknown_ad_ids": [unknown_ad]})
+        self.assertEqual(self.beacon.logs.filter(timestamp=delivered_at).count(), 5)
+
+    def test_new_ids_are_known_immediately(self):
+        self.client.post(self.url, [self.entry()], format="json")
+        beacon = Beacon.objects.create(name="Beacon 2", location_name="Piassa")
+        response = self.client.post(self.url, [self.entry(beacon=str(beacon.pk))], format="json")
+        self.assertEqual(response.data['created'], 1)
+
+    def test_backdated_logs_reach_the_rollup(self):
+        refresh_rollups()
+        yesterday = now() - timedelta(days=1)
+        self.client.post(self.url, [self.entry(timestamp=yesterday.isoformat())] * 3, format="json")
+        refresh_rollups()
+
+        self.assertEqual(AdDailyStats.objects.get(advertisement=self.ad).deliveries, 3)
+
+    def test_rejects_invalid_payload(self):
+        self.assertEqual(self.client.post(self.url, [], format="json").status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, [{"beacon": "nope"}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class PartitionTest(TestCase):
+    def test_monthly_partition_layout(self):
+        self.assertEqual(add_months(date(2025, 11, 1), 3), date(2026, 2, 1))
+        self.assertEqual(add_months(date(2025, 1, 1), -1), date(2024, 12, 1))
+        self.assertEqual(partition_name(ADVERTISEMENT_LOGS, date(2025, 3, 1)), 'logs_advertisementlog_p2025_03')
+        self.assertEqual(bounds(date(2025, 12, 1)), ('2025-12-01 00:00:00+00', '2026-01-01 00:00:00+00'))
+
+    def test_command_requires_postgres(self):
+        with self.assertRaises(CommandError):
+            call_command('manage_partitions', dry_run=True)
+
+class RetentionTest(APITestCase):
+    def setUp(self):
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        self.archive_dir = Path(archive_dir.name)
+        self.enterContext(override_settings(ARCHIVE_DIR=archive_dir.name, RETENTION_BATCH_SIZE=2))
+        self.user = get_user_model().objects.create_user(username="phone", email="phone@example.com", password="pass")
+        self.beacon = Beacon.objects.create(name="Beacon 1", location_name="Bole")
+        self.ads = [Advertisement.objects.create(title=f"Ad {i}", content="content", created_by=self.user) for i in range(3)]
+        self.old = now() - timedelta(days=40)
+
+    def test_expired_logs_are_archived_in_batches_and_deleted(self):
+        for ad in self.ads:
+            self.beacon.logs.create(advertisement=ad, timestamp=self.old)
+        recent = self.beacon.logs.create(advertisement=self.ads[0])
+
+        self.assertEqual(archive_expired('logs.AdvertisementLog', days=30), 3)
+
+        files = sorted((self.archive_dir / 'logs.AdvertisementLog').glob('*.ndjson.gz'))
+        self.assertEqual([len(list(read_archive(path))) for path in files], [2, 1])
+        self.assertEqual(list(self.beacon.logs.values_list('log_id', flat=True)), [recent.log_id])
+
+    def test_restore_keeps_archived_timestamps(self):
+        for i in range(2):
+            notification = Notification.objects.create(user=self.user, message=f"Message {i}")
+            Notification.objects.filter(pk=notification.pk).update(created_at=self.old)
+        archive_expired('notifications.Notification', days=30)
+        self.assertFalse(Notification.objects.exists())
+
+        call_command('restore_archive', str(self.archive_dir))
+        call_command('restore_archive', str(self.archive_dir))  # restoring twice is harmless
+
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(set(Notification.objects.values_list('created_at', flat=True)), {self.old})
+
+    def test_restore_keeps_timestamps_of_existing_rows(self):
+        notification = Notification.objects.create(user=self.user, message="Message")
+        Notification.objects.filter(pk=notification.pk).update(created_at=self.old)
+        archive_expired('notifications.Notification', days=30)
+        Notification.objects.create(pk=notification.pk, user=self.user, message="Message")  # created again since
+        current = Notification.objects.get(pk=notification.pk).created_at
+
+        call_command('restore_archive', str(self.archive_dir))
+
+        self.assertEqual(Notification.objects.get(pk=notification.pk).created_at, current)
+
+    def test_interaction_state_is_not_expired(self):
+        view = AdView.objects.create(user=self.user, ad=self.ads[0], viewed=True)
+        AdView.objects.filter(pk=view.pk).update(viewed_at=self.old)
+
+        self.assertNotIn('advertisements.AdView', apply_retention())
+        self.assertTrue(AdView.objects.filter(pk=view.pk).exists())
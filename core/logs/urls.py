@@ -1,7 +1,9 @@
 from django.urls import path
-from .views import LogList, LogDetail
+from .views import LogList, LogDetail, LogExport, LogBatch
 
 urlpatterns = [
     path('', LogList.as_view(), name='log_list'),
+    path('export/', LogExport.as_view(), name='log_export'),
+    path('batch/', LogBatch.as_view(), name='log_batch'),
     path('<uuid:pk>/', LogDetail.as_view(), name='log_details')
 ]
\ No newline at end of file
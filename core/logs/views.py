@@ -1,13 +1,26 @@
 from core.logs.models import AdvertisementLog
-from .serializers import AdvertisementLogSerializer, AdvertisementLogPartialSerializer
+from .serializers import (AdvertisementLogSerializer, AdvertisementLogPartialSerializer,
+                          LogEntrySerializer, LogBatchResultSerializer)
+from .export import EXPORT_FORMATS, STREAMERS, export_rows
+from .ingest import ingest_logs
+from core.advertisements.views import KeysetPagination
+from django.http import StreamingHttpResponse
+from django.utils.timezone import make_aware
+from rest_framework import status
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
 from rest_framework.exceptions import ValidationError
-from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
-from datetime import datetime
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse, OpenApiExample
+from datetime import datetime, timedelta
+from uuid import UUID
 
 class LogList(ListCreateAPIView):
     """List all Advertisement Logs or create a new one."""
     serializer_class = AdvertisementLogSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-timestamp', '-log_id')
 
     def get_queryset(self):
         qs = AdvertisementLog.objects.select_related('advertisement', 'beacon').all()
@@ -18,8 +31,9 @@ class LogList(ListCreateAPIView):
             qs = qs.filter(log_id__contains=log_id)
         if created_at:
             try:
-                parsed_created_at = datetime.strptime(created_at, "%Y-%m-%d").date()
-                qs = qs.filter(created_at__gte=parsed_created_at)
+                # a bound on the partition key lets Postgres skip older partitions
+                parsed_created_at = make_aware(datetime.strptime(created_at, "%Y-%m-%d"))
+                qs = qs.filter(timestamp__gte=parsed_created_at)
             except ValueError:
                 raise ValidationError("Invalid date format. Use YYYY-MM-DD.")
         return qs
@@ -28,7 +42,8 @@ class LogList(ListCreateAPIView):
         tags=["Logs"],
         summary="Retrieve Advertisement Logs",
         description="""
-            Retrieve a paginated list of all advertisement logs, with optional filtering by `log_id` and `created_at`.
+            Retrieve a cursor-paginated list of all advertisement logs, newest first, with optional filtering
+            by `log_id` and `created_at`. Pass `count=false` to skip the total count on large tables.
             **Example Response:**
             ```json
             {
@@ -85,6 +100,48 @@ class LogList(ListCreateAPIView):
     def post(self, request, *args, **kwargs):
         return self.create(request, *args, **kwargs)
 
+class LogBatch(APIView):
+    """Record many advertisement deliveries in one request."""
+    max_batch_size = 10000
+
+    @extend_schema(
+        tags=["Logs"],
+        summary="Create Advertisement Logs in bulk",
+        description="""
+            Accepts an array of deliveries so a phone can sync a whole day of logs in one request.
+            Each entry names the beacon and advertisement and, optionally, when the delivery happened
+            (defaults to the time of the request).
+
+            Entries with an unknown beacon or advertisement are skipped and reported back in
+            `unknown_beacon_ids` / `unknown_ad_ids`; the others are inserted in batches.
+        """,
+        request=LogEntrySerializer(many=True),
+        responses={
+            201: LogBatchResultSerializer,
+            400: OpenApiResponse(description="Validation error"),
+        },
+        examples=[
+            OpenApiExample(
+                'Request Example',
+                value=[
+                    {"beacon": "123e4567-e89b-12d3-a456-426614174000",
+                     "advertisement": "e97d5b0e-1d7a-4a87-9a68-54876b6e9e23",
+                     "timestamp": "2025-03-08T12:30:00Z"},
+                ],
+                request_only=True
+            )
+        ]
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = LogEntrySerializer(data=request.data, many=True, allow_empty=False,
+                                        max_length=self.max_batch_size)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        created, unknown_beacon_ids, unknown_ad_ids = ingest_logs(serializer.validated_data)
+        return Response({"created": created, "unknown_beacon_ids": unknown_beacon_ids,
+                         "unknown_ad_ids": unknown_ad_ids}, status=status.HTTP_201_CREATED)
+
 class LogDetail(RetrieveUpdateDestroyAPIView):
     serializer_class = AdvertisementLogSerializer
     queryset = AdvertisementLog.objects.all()
@@ -181,3 +238,57 @@ class LogDetail(RetrieveUpdateDestroyAPIView):
     )
     def delete(self, request, *args, **kwargs):
         return self.destroy(request, *args, **kwargs)
+
+class LogExport(APIView):
+    """Stream advertisement logs as CSV or NDJSON."""
+
+    @extend_schema(
+        tags=["Logs"],
+        summary="Export Advertisement Logs",
+        description="""
+            Streams every advertisement log matching the filters, oldest first, for billing reconciliation.
+            Rows are read from the database in chunks and written out as they arrive, so exports of
+            millions of logs do not need to fit in memory.
+
+            **Columns:** `log_id`, `timestamp`, `beacon_id`, `beacon__name`, `advertisement_id`, `advertisement__title`
+
+            **Example Request:**
+            ```
+            GET /api/v1/logs/export/?output=ndjson&start_date=2025-03-01&end_date=2025-03-31&beacon=123e4567-e89b-12d3-a456-426614174000
+            ```
+        """,
+        parameters=[
+            OpenApiParameter(name="output", type=str, enum=list(EXPORT_FORMATS), description="`csv` (default) or `ndjson`", required=False),
+            OpenApiParameter(name="start_date", type=str, description="Range start (YYYY-MM-DD)", required=False),
+            OpenApiParameter(name="end_date", type=str, description="Range end (YYYY-MM-DD, inclusive)", required=False),
+            OpenApiParameter(name="beacon", type=OpenApiTypes.UUID, description="Only logs of this beacon", required=False),
+        ],
+        responses={
+            (200, 'text/csv'): OpenApiTypes.STR,
+            (200, 'application/x-ndjson'): OpenApiTypes.STR,
+            400: OpenApiResponse(description="Invalid filter or output format"),
+        }
+    )
+    def get(self, request):
+        output = request.GET.get('output', 'csv')
+        if output not in EXPORT_FORMATS:
+            return Response({"error": f"Unsupported output format. Use one of: {', '.join(EXPORT_FORMATS)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        start_date = request.GET.get('start_date')
+        end_date = request.GET.get('end_date')
+        beacon_id = request.GET.get('beacon')
+        try:
+            start = make_aware(datetime.strptime(start_date, "%Y-%m-%d")) if start_date else None
+            end = make_aware(datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)) if end_date else None
+        except ValueError:
+            return Response({"error": "Invalid date format. Use YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            beacon_id = UUID(beacon_id) if beacon_id else None
+        except ValueError:
+            return Response({"error": "Invalid beacon ID"}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = export_rows(start, end, beacon_id)
+        response = StreamingHttpResponse(STREAMERS[output](rows), content_type=EXPORT_FORMATS[output])
+        response['Content-Disposition'] = f'attachment; filename="advertisement_logs.{output}"'
+        return response
@@ -0,0 +1,24 @@
+from uuid import uuid4
+from django.core.cache import cache
+
+class VersionedIndex:
+    """An in-process value rebuilt by get() whenever its version token in the shared cache changes.
+
+    invalidate() stores a new token, so every worker rebuilds its copy on next use, not
+    only the one that made the change.
+    """
+
+    def __init__(self, version_key):
+        self.version_key = version_key
+        self._entry = None
+
+    def get(self, loader):
+        """The current value, calling loader() to build it when missing or out of date."""
+        version = cache.get(self.version_key)
+        if self._entry is None or self._entry[0] != version:
+            self._entry = (version, loader())
+        return self._entry[1]
+
+    def invalidate(self):
+        cache.set(self.version_key, uuid4().hex, None)
+        self._entry = None